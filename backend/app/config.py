@@ -0,0 +1,42 @@
+"""
+Application configuration for create_app.
+
+All asset paths are absolute (by default resolved from the repository layout, not
+from the working directory), so the app can be started from anywhere. Every field
+can be overridden through the environment (see from_env).
+"""
+import os
+from dataclasses import dataclass, field
+from typing import List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+APP_DIR = os.path.join(REPO_ROOT, "backend", "app")
+
+
+@dataclass
+class AppConfig:
+    mongo_url: str = "mongodb://localhost:27017"
+    frontend_dir: str = os.path.join(REPO_ROOT, "frontend")
+    pdf_dir: str = os.path.join(REPO_ROOT, "pdfs")
+    data_dir: str = REPO_ROOT  # Stage CSV datasets, served under /data
+    templates_dir: str = os.path.join(APP_DIR, "templates")
+    cors_origins: List[str] = field(default_factory=lambda: ["*"])  # In production, specify frontend domain
+    # Serve traffic as soon as the database is reachable; rebuild the leaderboard and
+    # preload pages in the background (the persisted leaderboard is served meanwhile)
+    defer_warmup: bool = True
+    drain_deadline: float = 20.0
+
+    @classmethod
+    def from_env(cls) -> "AppConfig":
+        config = cls()
+        config.mongo_url = os.environ.get("HACKATHON_MONGO_URL", config.mongo_url)
+        config.frontend_dir = os.path.abspath(os.environ.get("HACKATHON_FRONTEND_DIR", config.frontend_dir))
+        config.pdf_dir = os.path.abspath(os.environ.get("HACKATHON_PDF_DIR", config.pdf_dir))
+        config.data_dir = os.path.abspath(os.environ.get("HACKATHON_DATA_DIR", config.data_dir))
+        config.templates_dir = os.path.abspath(os.environ.get("HACKATHON_TEMPLATES_DIR", config.templates_dir))
+        if os.environ.get("HACKATHON_CORS_ORIGINS"):
+            config.cors_origins = [origin.strip() for origin in os.environ["HACKATHON_CORS_ORIGINS"].split(",")]
+        if os.environ.get("HACKATHON_DEFER_WARMUP"):
+            config.defer_warmup = os.environ["HACKATHON_DEFER_WARMUP"].lower() not in ("0", "false", "no")
+        config.drain_deadline = float(os.environ.get("HACKATHON_DRAIN_DEADLINE", config.drain_deadline))
+        return config
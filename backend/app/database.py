@@ -1,5 +1,6 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from typing import Optional
+from utils.events import current_event
 
 class Database:
     client: Optional[AsyncIOMotorClient] = None
@@ -7,14 +8,28 @@ class Database:
 db_instance = Database()
 
 async def get_database():
-    return db_instance.client.hackathon_db
+    """Database of the current event (see utils.events)"""
+    return current_event().database()
 
-async def connect_to_mongo():
+async def connect_to_mongo(url: str = "mongodb://localhost:27017"):
     """Connect to MongoDB on startup"""
-    db_instance.client = AsyncIOMotorClient("mongodb://localhost:27017")
+    db_instance.client = AsyncIOMotorClient(url)
     print("Connected to MongoDB")
 
 async def close_mongo_connection():
     """Close MongoDB connection on shutdown"""
     db_instance.client.close()
     print("Closed MongoDB connection")
+
+async def ensure_indexes(db):
+    """
+    Create the indexes the API relies on.
+    Leaderboard reads are keyset-paginated on (rank, team_name), so both
+    the global and the regional rank orderings need a matching index.
+    """
+    await db.teams.create_index("team_name", unique=True)
+    await db.teams.create_index([("last_updated", 1), ("_id", 1)])  # Leaderboard materializer polling fallback
+    await db.leaderboard.create_index("team_id", unique=True)
+    await db.leaderboard.create_index("team_name")
+    await db.leaderboard.create_index([("global_rank", 1), ("team_name", 1)])
+    await db.leaderboard.create_index([("region", 1), ("regional_rank", 1), ("team_name", 1)])
@@ -1,260 +1,148 @@
-from fastapi import FastAPI, Request, HTTPException
+import time
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
-from database import connect_to_mongo, close_mongo_connection, get_database
-from routers import teams, challenges, leaderboard
-from utils.leaderboard_updater import update_leaderboard
-from utils.url_validator import parse_challenge_url, count_correct_values
-from utils.auth import verify_password
-from utils.time_validator import is_challenge_open, format_utc_time
-from models import FinalSubmission
-from datetime import datetime
-
-app = FastAPI(title="Hackathon Platform API")
-templates = Jinja2Templates(directory="templates")
-
-# CORS middleware for frontend access
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, specify frontend domain
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Mount static files
-app.mount("/pdfs", StaticFiles(directory="../../pdfs"), name="pdfs")
-app.mount("/data", StaticFiles(directory="../../"), name="data")  # For CSV file
-app.mount("/css", StaticFiles(directory="../../frontend/css"), name="css")
-app.mount("/js", StaticFiles(directory="../../frontend/js"), name="js")
-
-# Include routers
-app.include_router(teams.router)
-app.include_router(challenges.router, prefix="/api")
-app.include_router(leaderboard.router)
-
-# Frontend Routes
-@app.get("/", response_class=HTMLResponse)
-async def root_redirect():
-    """Redirect root to register"""
-    return HTMLResponse(content='<script>window.location.href="/register"</script>')
-
-@app.get("/register", response_class=HTMLResponse)
-async def register_page():
-    """Serve registration page"""
-    with open("../../frontend/register.html", "r") as f:
-        return HTMLResponse(content=f.read())
-
-@app.get("/login", response_class=HTMLResponse)
-async def login_page():
-    """Serve login page"""
-    with open("../../frontend/login.html", "r") as f:
-        return HTMLResponse(content=f.read())
-
-@app.get("/leaderboard", response_class=HTMLResponse)
-async def leaderboard_page():
-    """Serve leaderboard page"""
-    with open("../../frontend/leaderboard_page.html", "r") as f:
-        return HTMLResponse(content=f.read())
-
-# URL-based Challenge Validation Route
-@app.get("/ERFT_stage{stage}_p1-{p1}_p2-{p2}_p3-{p3}", response_class=HTMLResponse)
-async def validate_challenge_url(request: Request, stage: int, p1: str, p2: str, p3: str, team: str = None, pwd: str = None):
+from typing import Optional
+from config import AppConfig
+from database import connect_to_mongo, close_mongo_connection
+from routers import teams, challenges, leaderboard, admin, stats, health, pages, session
+from utils.admission import AdmissionControl, AdmissionMiddleware
+from utils.lifecycle import Lifecycle, LifecycleMiddleware
+from utils.loop_watchdog import LoopWatchdog, LoopWatchdogMiddleware
+from utils.snapshot_publisher import SnapshotFiles, SNAPSHOT_ROOT
+from utils.signed_urls import SignedStaticFiles
+from utils.events import EventRegistry, EventMiddleware, DEFAULT_EVENT
+from utils.single_flight import SharedReadTimeout, read_timeout_response
+import os
+
+
+def create_app(config: Optional[AppConfig] = None) -> FastAPI:
     """
-    Direct URL validation - users visit this URL to validate their challenge answers.
-    Enforces sequential stage progression and regional time gates.
+    Build the application. Paths come from `config` (absolute, see AppConfig), so the
+    app does not depend on the working directory it is started from. Lifecycle, loop
+    watchdog, admission control and events are per app (app.state), so building an app leaves no
+    global state behind (the MongoDB client, one connection pool per process, is the exception).
     """
-    db = await get_database()
-    challenge_url = f"ERFT_stage{stage}_p1-{p1}_p2-{p2}_p3-{p3}"
-
-    # If no auth params, show auth form
-    if not team or not pwd:
-        return templates.TemplateResponse("auth_required.html", {
-            "request": request,
-            "challenge_url": challenge_url,
-            "stage": stage
-        })
-
-    # Authenticate team
-    team_doc = await db.teams.find_one({"team_name": team})
-    if not team_doc or not verify_password(pwd, team_doc["password_hash"]):
-        return templates.TemplateResponse("auth_required.html", {
-            "request": request,
-            "challenge_url": challenge_url,
-            "stage": stage,
-            "error": "Invalid credentials"
-        })
-
-    # Check if challenge is open for this region
-    challenge_open, start_time = await is_challenge_open(team_doc["region"], db)
-    if not challenge_open:
-        return templates.TemplateResponse("challenge_not_open.html", {
-            "request": request,
-            "region": team_doc["region"],
-            "start_time": format_utc_time(start_time) if start_time else "TBD"
-        })
-
-    # Get challenge
-    challenge = await db.challenges.find_one({"stage": stage})
-    if not challenge:
-        return HTMLResponse(content="<h1>Invalid challenge stage</h1>", status_code=404)
-
-    # Get current progress
-    stages_unlocked = team_doc.get("stages_unlocked", team_doc.get("current_stage", 0))
-
-    # Count correct values first (needed for all paths)
-    correct_count = count_correct_values(p1, p2, p3, challenge)
-
-    # Determine what stage would be unlocked by this URL
-    # Stage 2 URL unlocks stage 1, Stage 3 URL unlocks stage 2, etc.
-    stage_being_unlocked = stage - 1
-
-    # Sequential progression check:
-    # - If stages_unlocked = 0, they can unlock stage 1 (visit stage 2 URL)
-    # - If stages_unlocked = 1, they can unlock stage 2 (visit stage 3 URL)
-    # - etc.
-    # So: stage_being_unlocked should equal (stages_unlocked + 1) for next stage
-
-    # Check if trying to skip ahead
-    if stage_being_unlocked > stages_unlocked + 1:
-        # Trying to unlock a stage beyond the next one
-        return templates.TemplateResponse("sequential_error.html", {
-            "request": request,
-            "stages_unlocked": stages_unlocked,
-            "attempted_stage": stage
-        })
-
-    # Update latest submission URL
-    await db.teams.update_one(
-        {"_id": team_doc["_id"]},
-        {"$set": {"last_submission_url": challenge_url}}
+    config = config or AppConfig.from_env()
+
+    app = FastAPI(title="Hackathon Platform API")
+    app.state.config = config
+    app.state.templates = Jinja2Templates(directory=config.templates_dir)
+    app.state.pages = {}  # Frontend page cache, see routers.pages
+    app.state.lifecycle = lifecycle = Lifecycle()
+    app.state.watchdog = watchdog = LoopWatchdog.from_env()
+    app.state.admission = admission = AdmissionControl()
+    app.state.events = events = EventRegistry.from_env(
+        defer_warmup=config.defer_warmup,
+        admission=admission,
+        prerender=[("pages", lambda: pages.prerender(app))]  # Ahead of each regional opening
     )
+    lifecycle.record_phase("import", _import_seconds)
 
-    # Handle correct values - show same UI for first-time and revisits
-    if correct_count == 3:
-        is_first_time = (stage_being_unlocked == stages_unlocked + 1)
+    # Shared reads (challenge config, challenges, leaderboard) that time out on a slow MongoDB: 503, not 500
+    app.add_exception_handler(SharedReadTimeout, read_timeout_response)
 
-        # Only update DB on first-time completion
-        if is_first_time:
-            # Use timer_started_at if available, otherwise fall back to created_at
-            timer_start = team_doc.get("timer_started_at") or team_doc["created_at"]
-            completion_time = (datetime.utcnow() - timer_start).total_seconds()
-            new_total_time = team_doc["total_time"] + completion_time
+    # Loop watchdog: attributes event-loop stalls to the request whose handler caused them
+    app.add_middleware(LoopWatchdogMiddleware, monitor=watchdog)
 
-            # Update team document
-            await db.teams.update_one(
-                {"_id": team_doc["_id"]},
-                {"$set": {
-                    f"stage_times.stage_{stage_being_unlocked}": completion_time,
-                    "stages_unlocked": stage_being_unlocked,
-                    "total_time": new_total_time
-                }}
-            )
+    # Admission control: per-route-class concurrency limits, 503 + Retry-After when overloaded
+    app.add_middleware(AdmissionMiddleware, control=admission)
 
-            # Update leaderboard
-            await update_leaderboard(
-                db,
-                str(team_doc["_id"]),
-                team_doc["team_name"],
-                team_doc["region"],
-                stage_being_unlocked,
-                new_total_time
-            )
+    # Events: resolves the event (host or /e/{event} prefix) and scopes database and caches to it
+    app.add_middleware(EventMiddleware, registry=events)
 
-        # Show consistent UI for both first-time and revisits
-        is_final_stage = (stage_being_unlocked == 4)
+    # Lifecycle: tracks in-flight requests and rejects new ones while draining for shutdown
+    app.add_middleware(LifecycleMiddleware, manager=lifecycle)
 
-        return templates.TemplateResponse("validation_result.html", {
-            "request": request,
-            "all_correct": True,
-            "stage": stage,
-            "stage_unlocked": stage_being_unlocked,
-            "pdf_url": f"/pdfs/{challenge['pdf_filename']}",
-            "is_final_stage": is_final_stage
-        })
-
-    # Return partial feedback for incorrect values
-    return templates.TemplateResponse("validation_result.html", {
-        "request": request,
-        "all_correct": False,
-        "correct_count": correct_count,
-        "stage": stage
-    })
-
-# Final Submission Routes
-@app.get("/submit", response_class=HTMLResponse)
-async def submit_final_page():
-    """Serve final submission page"""
-    with open("../../frontend/final_submission.html", "r") as f:
-        return HTMLResponse(content=f.read())
-
-@app.post("/api/submit")
-async def submit_final(submission: FinalSubmission):
-    """
-    Submit final BitBucket URL after completing stage 5.
-    """
-    db = await get_database()
-
-    # Authenticate team
-    team_doc = await db.teams.find_one({"team_name": submission.team_name})
-    if not team_doc or not verify_password(submission.password, team_doc["password_hash"]):
-        raise HTTPException(status_code=401, detail="Invalid credentials")
-
-    # Verify team has completed all stages (needs 4/4 stages unlocked and stage 5 completed)
-    stages_unlocked = team_doc.get("stages_unlocked", 0)
-
-    if stages_unlocked < 4:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Team must complete all stages before final submission. Current: {stages_unlocked}/4 unlocked."
-        )
-
-    # Update team with BitBucket URL
-    await db.teams.update_one(
-        {"_id": team_doc["_id"]},
-        {"$set": {"bitbucket_url": submission.bitbucket_url}}
+    # CORS middleware for frontend access (added last so it also wraps 503 responses)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=config.cors_origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "X-Leaderboard-Version"],
     )
 
-    return {"message": "Final submission successful!", "bitbucket_url": submission.bitbucket_url}
-
-@app.on_event("startup")
-async def startup_event():
-    """
-    Connect to MongoDB and rebuild leaderboard from teams collection.
-    Ensures persistence after server restarts.
-    Now includes ALL teams (even those with 0 stages unlocked).
-    """
-    await connect_to_mongo()
-
-    print("Rebuilding leaderboard from teams collection...")
-    db = await get_database()
-
-    # Clear existing leaderboard
-    await db.leaderboard.delete_many({})
-
-    # Rebuild from ALL teams (including those with 0 stages)
-    teams_list = await db.teams.find().to_list(None)
-
-    for team in teams_list:
-        await update_leaderboard(
-            db,
-            str(team["_id"]),
-            team["team_name"],
-            team["region"],
-            team.get("stages_unlocked", team.get("current_stage", 0)),
-            team["total_time"]
-        )
-
-    print(f"✅ Leaderboard rebuilt successfully with {len(teams_list)} teams")
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Close MongoDB connection on shutdown"""
-    await close_mongo_connection()
-
-@app.get("/health")
-async def health():
-    """Health check for monitoring"""
-    return {"status": "ok"}
+    # Mount static files (stage assets need a signed URL once HACKATHON_ASSET_SECRET is set, see utils.signed_urls)
+    app.mount("/pdfs", SignedStaticFiles(prefix="/pdfs", directory=config.pdf_dir), name="pdfs")
+    app.mount("/data", SignedStaticFiles(prefix="/data", directory=config.data_dir), name="data")  # For CSV file
+    app.mount("/css", StaticFiles(directory=os.path.join(config.frontend_dir, "css")), name="css")
+    app.mount("/js", StaticFiles(directory=os.path.join(config.frontend_dir, "js")), name="js")
+
+    # Published leaderboard snapshots of the current event (can equally be served by nginx or a CDN from the same directory)
+    os.makedirs(SNAPSHOT_ROOT, exist_ok=True)
+    app.mount("/snapshots", SnapshotFiles(directory=SNAPSHOT_ROOT), name="snapshots")
+
+    # Include routers
+    app.include_router(teams.router)
+    app.include_router(challenges.router, prefix="/api")
+    app.include_router(session.router, prefix="/api")
+    app.include_router(leaderboard.router)
+    app.include_router(admin.router)
+    app.include_router(stats.router)
+    app.include_router(health.router)
+    app.include_router(pages.router)
+
+    @app.on_event("startup")
+    async def startup_event():
+        """
+        Connect to MongoDB and start the default event, then report ready.
+        Starting an event runs its leaderboard materializer, which rebuilds the leaderboard
+        from the teams collection (ALL teams, even those with 0 stages unlocked) so it
+        survives server restarts, then keeps it in sync with team writes in the background.
+        With config.defer_warmup the rebuild runs in the background too, so a new worker
+        serves (the persisted leaderboard) right away. Other events start on their first request.
+        """
+        started = time.perf_counter()
+        lifecycle.install_signal_handlers()
+        lifecycle.register_task(watchdog.start())
+
+        with lifecycle.phase("connect"):
+            await connect_to_mongo(config.mongo_url)
+
+        with lifecycle.phase("default_event"):
+            context = await events.activate(DEFAULT_EVENT)
+
+        # Once requests have drained: flush every active event's leaderboard, analytics and snapshots
+        lifecycle.register_flush("events", events.close_all)
+
+        # Warmups: tracked by /health/ready, none of them blocks serving
+        db = context.database()
+        lifecycle.start_warmup("mongo_pool", db.command("ping"))
+        lifecycle.start_warmup("pages", pages.load_pages(app))
+        lifecycle.start_warmup("leaderboard", context.materializer.rebuilt.wait())
+
+        lifecycle.record_phase("startup", time.perf_counter() - started)
+        lifecycle.mark_ready()
+        print(f"Ready: import {lifecycle.timings.get('import', 0):.2f}s, startup {lifecycle.timings['startup']:.2f}s")
+
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        """Drain in-flight requests, flush background work, then close MongoDB connection"""
+        await lifecycle.drain(config.drain_deadline)
+        await close_mongo_connection()
+
+    @app.get("/health")
+    async def health_check():
+        """Health check for monitoring"""
+        return {"status": "ok"}
+
+    return app
+
+
+_import_seconds = time.perf_counter() - _import_started
+_app: Optional[FastAPI] = None
+
+
+def __getattr__(name: str):
+    """`main:app`, built on first access: importing main (e.g. for `--factory main:create_app`) builds no app"""
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from datetime import datetime
 
 class TeamCreate(BaseModel):
@@ -14,6 +14,7 @@ class TeamResponse(BaseModel):
     total_time: float
     challenge_open: bool = False  # Whether challenge has started for this region
     start_time: Optional[str] = None  # UTC start time for display
+    asset_urls: Dict[str, str] = {}  # Asset path -> signed URL, for the assets the team can download now
 
 class ChallengeValidation(BaseModel):
     team_name: str
@@ -24,6 +25,7 @@ class ValidationResponse(BaseModel):
     correct_count: int
     message: str
     pdf_url: Optional[str] = None
+    pending: bool = False  # The stage unlock is journaled and not yet confirmed (MongoDB slow)
 
 class LeaderboardEntry(BaseModel):
     rank: str  # Can be number or "T" for tied
@@ -32,6 +34,21 @@ class LeaderboardEntry(BaseModel):
     stages_unlocked: int  # Renamed from stages_completed
     total_time: str  # Will show "-" for teams with 0 stages
 
+class LeaderboardChanges(BaseModel):
+    version: str  # Pass back as `since` on the next poll ("{epoch}-{n}", see utils.leaderboard_changes)
+    full: bool  # True when rows is a fresh first page instead of a delta
+    rows: List[LeaderboardEntry]
+
+class SessionCredentials(BaseModel):
+    team_name: str
+    password: str
+    window: int = Field(5, ge=1, le=50)  # Leaderboard rows to return above and below the team
+
+class SessionBootstrap(TeamResponse):
+    timer_started: bool = False  # Stage 1 materials already downloaded (no need to call /teams/start-timer)
+    global_window: List[LeaderboardEntry] = []  # Rows around the team on the global leaderboard
+    regional_window: List[LeaderboardEntry] = []  # Rows around the team on its region's leaderboard
+
 class Challenge(BaseModel):
     stage: int
     type: str  # "website" or "dataset"
@@ -41,6 +58,15 @@ class Challenge(BaseModel):
     correct_p3: str
     pdf_filename: str
 
+class BulkProvisionError(BaseModel):
+    row: int  # 1-based position in the uploaded list
+    team_name: Optional[str] = None
+    error: str
+
+class BulkProvisionResult(BaseModel):
+    created: int
+    errors: List[BulkProvisionError]
+
 class FinalSubmission(BaseModel):
     team_name: str
     password: str
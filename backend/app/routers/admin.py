@@ -0,0 +1,115 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from models import BulkProvisionResult
+from utils.auth import verify_admin_token
+from utils.team_provisioning import parse_teams, provision_teams, VALID_REGIONS
+from utils.team_cache import team_cache
+from utils.write_journal import write_journal
+from utils.single_flight import single_flight
+from utils.opening_scheduler import opening_scheduler
+from utils.results_export import parse_fields, build_pipeline, iter_csv, iter_ndjson, CURSOR_BATCH_SIZE
+from database import get_database
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Reject requests that don't carry the organizer token in X-Admin-Token"""
+    if not verify_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+@router.post("/teams/bulk", response_model=BulkProvisionResult)
+async def bulk_create_teams(request: Request):
+    """
+    Create many teams in one request.
+    Body is either CSV (Content-Type: text/csv, header row team_name,password,region)
+    or a JSON array of {"team_name", "password", "region"} objects.
+    Rows that fail (invalid region, duplicate name, ...) are reported individually;
+    the rest are still created.
+    """
+    content_type = request.headers.get("content-type", "")
+    fmt = "csv" if "csv" in content_type else "json"
+
+    body = await request.body()
+    try:
+        rows = parse_teams(body.decode("utf-8"), fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse team list: {e}")
+
+    db = await get_database()
+    return await provision_teams(db, rows)
+
+@router.get("/admission")
+async def get_admission_stats(request: Request):
+    """Current limits, in-flight and queued requests, and admitted/rejected counts per route class"""
+    return request.app.state.admission.stats()
+
+@router.get("/caches")
+async def get_cache_stats():
+    """Size and hit/miss counts of the in-process team state cache, and how many reads were coalesced"""
+    return {"team_cache": team_cache.stats(), "single_flight": single_flight.stats()}
+
+@router.get("/events")
+async def get_event_stats(request: Request):
+    """Events whose state is loaded in this worker, with their database and cache sizes"""
+    return request.app.state.events.stats()
+
+@router.get("/loop")
+async def get_loop_stats(request: Request):
+    """Event-loop lag percentiles and the stacks of recent stalls (see utils.loop_watchdog)"""
+    return request.app.state.watchdog.stats()
+
+@router.get("/journal")
+async def get_journal_stats():
+    """Whether team writes are being journaled locally (MongoDB slow or down), and replay progress"""
+    return write_journal.stats()
+
+@router.get("/openings")
+async def get_opening_stats(request: Request):
+    """Upcoming regional openings and their preparation phase, clients waiting on the push channel"""
+    return {**opening_scheduler.stats(), "admission": request.app.state.admission.stats()}
+
+async def _export(fmt: str, region: Optional[str], stage: Optional[int], fields: Optional[str]) -> StreamingResponse:
+    if region is not None and region not in VALID_REGIONS:
+        raise HTTPException(status_code=400, detail=f"Region must be one of {VALID_REGIONS}")
+    try:
+        selected = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    db = await get_database()
+    cursor = db.teams.aggregate(build_pipeline(selected, region, stage), batchSize=CURSOR_BATCH_SIZE)
+
+    if fmt == "csv":
+        body, media_type = iter_csv(cursor, selected), "text/csv"
+    else:
+        body, media_type = iter_ndjson(cursor, selected), "application/x-ndjson"
+
+    return StreamingResponse(body, media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="results.{fmt}"'
+    })
+
+@router.get("/export/results.csv")
+async def export_results_csv(
+    region: Optional[str] = None,
+    stage: Optional[int] = Query(None, ge=0, le=4),
+    fields: Optional[str] = None
+):
+    """
+    Stream team results as CSV: ranks, stage times, total time and submission URLs.
+    Filters: region, stage (teams with at least this many stages unlocked).
+    fields: comma-separated subset of columns (default: all).
+    """
+    return await _export("csv", region, stage, fields)
+
+@router.get("/export/results.ndjson")
+async def export_results_ndjson(
+    region: Optional[str] = None,
+    stage: Optional[int] = Query(None, ge=0, le=4),
+    fields: Optional[str] = None
+):
+    """
+    Stream team results as newline-delimited JSON, one team per line.
+    Same filters and fields as the CSV export.
+    """
+    return await _export("ndjson", region, stage, fields)
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, HTTPException
 from datetime import datetime
 from models import ChallengeValidation, ValidationResponse
-from utils.auth import verify_password
-from utils.url_validator import parse_challenge_url, count_correct_values
-from utils.leaderboard_updater import update_leaderboard
+from utils.auth import verify_password_async
+from utils.url_validator import parse_challenge_url, count_correct_values, find_challenge
+from utils.signed_urls import sign_url
+from utils.stage_analytics import analytics
+from utils.team_cache import team_cache, update_team_fields
 from database import get_database
 
 router = APIRouter(prefix="/challenges", tags=["challenges"])
@@ -17,11 +19,11 @@ async def validate_submission(validation: ChallengeValidation):
     db = await get_database()
 
     # 1. Authenticate team
-    team = await db.teams.find_one({"team_name": validation.team_name})
+    team = await team_cache.get(db, validation.team_name)
     if not team:
         raise HTTPException(status_code=401, detail="Invalid team credentials")
 
-    if not verify_password(validation.password, team["password_hash"]):
+    if not await verify_password_async(validation.password, team["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid team credentials")
 
     # 2. Parse URL
@@ -32,7 +34,7 @@ async def validate_submission(validation: ChallengeValidation):
     stage, p1, p2, p3 = parsed
 
     # 3. Get challenge from database
-    challenge = await db.challenges.find_one({"stage": stage})
+    challenge = await find_challenge(db, stage)
     if not challenge:
         raise HTTPException(status_code=404, detail=f"Challenge stage {stage} not found")
 
@@ -40,13 +42,13 @@ async def validate_submission(validation: ChallengeValidation):
     correct_count = count_correct_values(p1, p2, p3, challenge)
 
     # 5. Update latest submission URL in team document
-    await db.teams.update_one(
-        {"_id": team["_id"]},
-        {"$set": {"last_submission_url": validation.submitted_url}}
-    )
+    await update_team_fields(db, team, {"last_submission_url": validation.submitted_url})
 
     # 6. If all correct AND first time completing this stage
     stages_unlocked = team.get("stages_unlocked", team.get("current_stage", 0))
+    if correct_count < 3 and stages_unlocked < stage:
+        analytics.record_attempt(team["team_name"], team["region"], stage, False)
+
     if correct_count == 3 and stages_unlocked < stage:
         # Calculate time for this stage
         # Use timer_started_at if available, otherwise fall back to created_at
@@ -57,31 +59,22 @@ async def validate_submission(validation: ChallengeValidation):
         # Calculate new stages unlocked: stages 1-4 count, stage 5 doesn't increment
         new_stages_unlocked = min(stage, 4)  # Cap at 4 stages unlocked
 
-        # Update team document
-        await db.teams.update_one(
-            {"_id": team["_id"]},
-            {"$set": {
-                f"stage_times.stage_{stage}": completion_time,
-                "stages_unlocked": new_stages_unlocked,
-                "total_time": new_total_time if stage <= 4 else team["total_time"]  # Don't update time for stage 5
-            }}
-        )
+        # Update team document, unless another request already completed this stage
+        applied = await update_team_fields(db, team, {
+            f"stage_times.stage_{stage}": completion_time,
+            "stages_unlocked": new_stages_unlocked,
+            "total_time": new_total_time if stage <= 4 else team["total_time"],  # Don't update time for stage 5
+            "last_updated": datetime.utcnow()  # Leaderboard materializer re-ranks from this write
+        }, expected={"stages_unlocked": team.get("stages_unlocked")})
 
-        # Update leaderboard (only if stage 1-4, persists to database)
-        if stage <= 4:
-            await update_leaderboard(
-                db,
-                str(team["_id"]),
-                team["team_name"],
-                team["region"],
-                new_stages_unlocked,
-                new_total_time
-            )
+        if applied:
+            analytics.record_attempt(team["team_name"], team["region"], stage, True, completion_time)
 
         return ValidationResponse(
             correct_count=3,
-            message="All correct! Stage unlocked.",
-            pdf_url=f"/pdfs/{challenge['pdf_filename']}"
+            message="All correct! Stage unlocked." if applied is not None else "All correct! Your stage unlock is being saved.",
+            pdf_url=sign_url(f"/pdfs/{challenge['pdf_filename']}"),
+            pending=applied is None
         )
 
     # Return partial feedback
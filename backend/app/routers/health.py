@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Request
+import asyncio
+import time
+from utils.fast_json import json_response
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+@router.get("/live")
+async def liveness(request: Request):
+    """Liveness: the process is up and its event loop is serving requests"""
+    lifecycle = request.app.state.lifecycle
+    return {
+        "status": "ok",
+        "state": lifecycle.state,
+        "uptime_seconds": round(time.time() - lifecycle.started_at, 1),
+        "in_flight": lifecycle.in_flight,
+        "startup_timings": lifecycle.timings
+    }
+
+@router.get("/ready")
+async def readiness(request: Request):
+    """
+    Readiness: startup has finished (required warmups included), the process is not
+    draining and MongoDB answers a ping. Returns 503 otherwise, so load balancers stop
+    routing here during startup and shutdown. Background warmups are reported as well.
+    """
+    lifecycle = request.app.state.lifecycle
+    checks = {"state": lifecycle.state, "warmups": lifecycle.warmups}
+    ready = lifecycle.ready
+
+    if ready:
+        try:
+            db = request.app.state.events.default.database()
+            await asyncio.wait_for(db.command("ping"), timeout=1.0)
+            checks["mongo"] = "ok"
+        except Exception as e:
+            checks["mongo"] = f"unavailable: {e.__class__.__name__}"
+            ready = False
+
+    return json_response(
+        {"status": "ready" if ready else "not_ready", "checks": checks},
+        status_code=200 if ready else 503
+    )
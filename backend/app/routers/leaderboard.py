@@ -1,61 +1,196 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-from models import LeaderboardEntry
+from fastapi import APIRouter, HTTPException, Query
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+import asyncio
+import base64
+import json
+from models import LeaderboardEntry, LeaderboardChanges
 from database import get_database
+from utils.leaderboard_changes import change_log
+from utils.fast_json import json_response
+from utils.leaderboard_rows import to_row
+from utils.single_flight import single_flight
 
 router = APIRouter(prefix="/leaderboard", tags=["leaderboard"])
 
-def format_time(seconds: float) -> str:
-    """Format seconds to HH:MM:SS"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+VALID_REGIONS = ["EMEA", "AMRS", "APAC"]
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+READ_TIMEOUT = 5.0  # Per shared leaderboard read; waiting requests get 503 when it is exceeded
 
-@router.get("/global", response_model=List[LeaderboardEntry])
-async def get_global_leaderboard():
+def encode_cursor(rank: int, team_name: str) -> str:
+    """Encode the (rank, team_name) keyset position of a row as an opaque cursor"""
+    raw = json.dumps([rank, team_name]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def decode_cursor(cursor: str) -> tuple:
+    """Decode a cursor produced by encode_cursor, rejecting anything malformed"""
+    try:
+        rank, team_name = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return int(rank), str(team_name)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _after(rank_field: str, rank: int, team_name: str) -> dict:
+    """Keyset filter for rows strictly after (rank, team_name)"""
+    return {"$or": [
+        {rank_field: {"$gt": rank}},
+        {rank_field: rank, "team_name": {"$gt": team_name}}
+    ]}
+
+def _before(rank_field: str, rank: int, team_name: str) -> dict:
+    """Keyset filter for rows strictly before (rank, team_name)"""
+    return {"$or": [
+        {rank_field: {"$lt": rank}},
+        {rank_field: rank, "team_name": {"$lt": team_name}}
+    ]}
+
+async def _shared(key: Hashable, read: Callable[[], Awaitable[Any]]) -> Any:
     """
-    Get global leaderboard (all teams across all regions).
-    Teams with progress ranked first, then teams with 0 stages (tied, alphabetical).
+    Run a leaderboard read once for all concurrent identical requests (see utils.single_flight).
+    The result is shared between them, so it must not be modified.
+    """
+    try:
+        return await single_flight.do(key, read, timeout=READ_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Leaderboard temporarily unavailable", headers={"Retry-After": "1"})
+
+async def _read_page(query: dict, rank_field: str, limit: int, cursor: Optional[str]) -> Tuple[List[dict], Dict[str, str]]:
+    """Read one page of a leaderboard (see _query_page), shared by concurrent identical requests"""
+    key = ("leaderboard_page", rank_field, query.get("region"), limit, cursor)
+    return await _shared(key, lambda: _query_page(query, rank_field, limit, cursor))
+
+async def _query_page(query: dict, rank_field: str, limit: int, cursor: Optional[str]) -> Tuple[List[dict], Dict[str, str]]:
+    """
+    Read one page of a leaderboard ordered by (rank, team_name).
+    Walks the rank index from the cursor position, so deep pages cost the same as the first one.
+    Returns the rows and the response headers: the cursor for the next page (if any) in
+    X-Next-Cursor, and the change log version the page is at least as fresh as in X-Leaderboard-Version.
     """
     db = await get_database()
 
-    # Get all teams, sort by rank then alphabetically
-    teams = await db.leaderboard.find().sort([("global_rank", 1), ("team_name", 1)]).to_list(1000)
+    # Read the version before the rows so no later change can be missed by a poller
+    headers = {"X-Leaderboard-Version": change_log.token}
+
+    if cursor:
+        rank, team_name = decode_cursor(cursor)
+        query = {"$and": [query, _after(rank_field, rank, team_name)]}
+
+    # Fetch one extra row to know whether another page follows
+    teams = await db.leaderboard.find(query).sort([(rank_field, 1), ("team_name", 1)]).limit(limit + 1).to_list(limit + 1)
+
+    if len(teams) > limit:
+        teams = teams[:limit]
+        last = teams[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last[rank_field], last["team_name"])
+
+    return [to_row(team, rank_field) for team in teams], headers
 
-    return [
-        LeaderboardEntry(
-            rank="T" if team["global_rank"] == 999 else str(team["global_rank"]),
-            team_name=team["team_name"],
-            region=team["region"],
-            stages_unlocked=team.get("stages_unlocked", team.get("current_stage", 0)),
-            total_time="-" if team.get("stages_unlocked", team.get("current_stage", 0)) == 0 else format_time(team["total_time"])
-        )
-        for team in teams
-    ]
+@router.get("/global", response_model=List[LeaderboardEntry])
+async def get_global_leaderboard(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    """
+    Get global leaderboard (all teams across all regions).
+    Teams with progress ranked first, then teams with 0 stages (tied, alphabetical).
+    Paginated by cursor: pass the X-Next-Cursor header of a page to get the next one.
+    """
+    rows, headers = await _read_page({}, "global_rank", limit, cursor)
+    return json_response(rows, headers)
 
 @router.get("/regional/{region}", response_model=List[LeaderboardEntry])
-async def get_regional_leaderboard(region: str):
+async def get_regional_leaderboard(
+    region: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
     """
     Get regional leaderboard for a specific region (EMEA, AMRS, or APAC).
     Teams with progress ranked first, then teams with 0 stages (tied, alphabetical).
+    Paginated by cursor, same as the global leaderboard.
     """
     # Validate region
-    valid_regions = ["EMEA", "AMRS", "APAC"]
-    if region not in valid_regions:
-        raise HTTPException(status_code=400, detail=f"Region must be one of {valid_regions}")
+    if region not in VALID_REGIONS:
+        raise HTTPException(status_code=400, detail=f"Region must be one of {VALID_REGIONS}")
+
+    rows, headers = await _read_page({"region": region}, "regional_rank", limit, cursor)
+    return json_response(rows, headers)
+
+@router.get("/changes", response_model=LeaderboardChanges)
+async def get_leaderboard_changes(
+    since: str,
+    region: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    """
+    Get the leaderboard rows that changed after version `since` (global, or one region).
+    If `since` has fallen out of the change buffer or was issued by another worker, returns a
+    full first page instead (full=true), paginated like /global.
+    """
+    if region is not None and region not in VALID_REGIONS:
+        raise HTTPException(status_code=400, detail=f"Region must be one of {VALID_REGIONS}")
+
+    board = region or "global"
+    rank_field = "regional_rank" if region else "global_rank"
+    query = {"region": region} if region else {}
+
+    version = change_log.token
+    changed = change_log.changed_since(since, board)
+
+    if changed is None:
+        rows, headers = await _read_page(query, rank_field, limit, None)
+        return json_response({"version": version, "full": True, "rows": rows}, headers)
+
+    async def read_changed() -> List[dict]:
+        db = await get_database()
+        teams = await db.leaderboard.find(
+            {**query, "team_name": {"$in": list(changed)}}
+        ).sort([(rank_field, 1), ("team_name", 1)]).to_list(None)
+        return [to_row(team, rank_field) for team in teams]
+
+    # Pollers of the same board mostly ask from the same version, so their delta reads coalesce
+    rows = await _shared(("leaderboard_changes", board, since, version), read_changed) if changed else []
 
+    return json_response({"version": version, "full": False, "rows": rows})
+
+@router.get("/team/{team_name}/around", response_model=List[LeaderboardEntry])
+async def get_team_window(
+    team_name: str,
+    k: int = Query(10, ge=1, le=100),
+    regional: bool = False
+):
+    """
+    Get the k teams ranked directly above and below a team, plus the team itself.
+    Uses the global leaderboard unless regional=true, in which case the team's own region is used.
+    """
+    rows = await team_window(team_name, k, regional)
+    if rows is None:
+        raise HTTPException(status_code=404, detail="Team not found")
+    return json_response(rows)
+
+async def team_window(team_name: str, k: int, regional: bool = False) -> Optional[List[dict]]:
+    """Shared read of the rows around a team (see get_team_window), or None if there is no such team"""
+    rank_field = "regional_rank" if regional else "global_rank"
+    return await _shared(("leaderboard_around", team_name, k, rank_field), lambda: _read_window(team_name, k, rank_field, regional))
+
+async def _read_window(team_name: str, k: int, rank_field: str, regional: bool) -> Optional[List[dict]]:
+    """Rows of the k teams above and below a team, or None if there is no such team"""
     db = await get_database()
 
-    teams = await db.leaderboard.find({"region": region}).sort([("regional_rank", 1), ("team_name", 1)]).to_list(1000)
-
-    return [
-        LeaderboardEntry(
-            rank="T" if team["regional_rank"] == 999 else str(team["regional_rank"]),
-            team_name=team["team_name"],
-            region=team["region"],
-            stages_unlocked=team.get("stages_unlocked", team.get("current_stage", 0)),
-            total_time="-" if team.get("stages_unlocked", team.get("current_stage", 0)) == 0 else format_time(team["total_time"])
-        )
-        for team in teams
-    ]
+    team = await db.leaderboard.find_one({"team_name": team_name})
+    if not team:
+        return None
+
+    query = {"region": team["region"]} if regional else {}
+    position = (team[rank_field], team["team_name"])
+
+    above = await db.leaderboard.find(
+        {"$and": [query, _before(rank_field, *position)]}
+    ).sort([(rank_field, -1), ("team_name", -1)]).limit(k).to_list(k)
+
+    below = await db.leaderboard.find(
+        {"$and": [query, _after(rank_field, *position)]}
+    ).sort([(rank_field, 1), ("team_name", 1)]).limit(k).to_list(k)
+
+    window = list(reversed(above)) + [team] + below
+    return [to_row(row, rank_field) for row in window]
@@ -0,0 +1,221 @@
+from fastapi import APIRouter, Request, HTTPException
+from fastapi.responses import HTMLResponse
+from fastapi.templating import Jinja2Templates
+from database import get_database
+from utils.stage_analytics import analytics
+from utils.team_cache import team_cache, update_team_fields
+from utils.url_validator import count_correct_values, find_challenge
+from utils.signed_urls import sign_url
+from utils.auth import verify_password_async
+from utils.time_validator import is_challenge_open, format_utc_time
+from models import FinalSubmission
+from datetime import datetime
+import asyncio
+import os
+
+router = APIRouter(tags=["pages"])
+
+# Frontend pages, read from disk once per process and then served from memory
+PAGE_FILES = ["register.html", "login.html", "leaderboard_page.html", "final_submission.html"]
+
+def _templates(request: Request) -> Jinja2Templates:
+    return request.app.state.templates
+
+def _read_file(path: str) -> str:
+    with open(path, "r") as f:
+        return f.read()
+
+async def load_pages(app, filenames=PAGE_FILES):
+    """Read frontend pages into the app's page cache (off the event loop)"""
+    loop = asyncio.get_running_loop()
+    for filename in filenames:
+        path = os.path.join(app.state.config.frontend_dir, filename)
+        app.state.pages[filename] = await loop.run_in_executor(None, _read_file, path)
+
+# Templates of the time-gated challenge pages, compiled ahead of regional openings (see prerender)
+GATED_TEMPLATES = ["auth_required.html", "challenge_not_open.html", "sequential_error.html", "validation_result.html"]
+
+async def prerender(app):
+    """Load the frontend pages and compile the gated templates, so the first requests after an opening skip it"""
+    await load_pages(app)
+    loop = asyncio.get_running_loop()
+    for name in GATED_TEMPLATES:
+        # Jinja2 keeps compiled templates in the environment's cache
+        await loop.run_in_executor(None, app.state.templates.get_template, name)
+
+async def serve_page(request: Request, filename: str) -> HTMLResponse:
+    pages = request.app.state.pages
+    if filename not in pages:
+        await load_pages(request.app, [filename])
+    return HTMLResponse(content=pages[filename])
+
+# Frontend Routes
+@router.get("/", response_class=HTMLResponse)
+async def root_redirect():
+    """Redirect root to register"""
+    return HTMLResponse(content='<script>window.location.href="/register"</script>')
+
+@router.get("/register", response_class=HTMLResponse)
+async def register_page(request: Request):
+    """Serve registration page"""
+    return await serve_page(request, "register.html")
+
+@router.get("/login", response_class=HTMLResponse)
+async def login_page(request: Request):
+    """Serve login page"""
+    return await serve_page(request, "login.html")
+
+@router.get("/leaderboard", response_class=HTMLResponse)
+async def leaderboard_page(request: Request):
+    """Serve leaderboard page"""
+    return await serve_page(request, "leaderboard_page.html")
+
+# URL-based Challenge Validation Route
+@router.get("/ERFT_stage{stage}_p1-{p1}_p2-{p2}_p3-{p3}", response_class=HTMLResponse)
+async def validate_challenge_url(request: Request, stage: int, p1: str, p2: str, p3: str, team: str = None, pwd: str = None):
+    """
+    Direct URL validation - users visit this URL to validate their challenge answers.
+    Enforces sequential stage progression and regional time gates.
+    """
+    db = await get_database()
+    challenge_url = f"ERFT_stage{stage}_p1-{p1}_p2-{p2}_p3-{p3}"
+
+    # If no auth params, show auth form
+    if not team or not pwd:
+        return _templates(request).TemplateResponse("auth_required.html", {
+            "request": request,
+            "challenge_url": challenge_url,
+            "stage": stage
+        })
+
+    # Authenticate team
+    team_doc = await team_cache.get(db, team)
+    if not team_doc or not await verify_password_async(pwd, team_doc["password_hash"]):
+        return _templates(request).TemplateResponse("auth_required.html", {
+            "request": request,
+            "challenge_url": challenge_url,
+            "stage": stage,
+            "error": "Invalid credentials"
+        })
+
+    # Check if challenge is open for this region
+    challenge_open, start_time = await is_challenge_open(team_doc["region"], db)
+    if not challenge_open:
+        return _templates(request).TemplateResponse("challenge_not_open.html", {
+            "request": request,
+            "region": team_doc["region"],
+            "start_time": format_utc_time(start_time) if start_time else "TBD"
+        })
+
+    # Get challenge
+    challenge = await find_challenge(db, stage)
+    if not challenge:
+        return HTMLResponse(content="<h1>Invalid challenge stage</h1>", status_code=404)
+
+    # Get current progress
+    stages_unlocked = team_doc.get("stages_unlocked", team_doc.get("current_stage", 0))
+
+    # Count correct values first (needed for all paths)
+    correct_count = count_correct_values(p1, p2, p3, challenge)
+
+    # Determine what stage would be unlocked by this URL
+    # Stage 2 URL unlocks stage 1, Stage 3 URL unlocks stage 2, etc.
+    stage_being_unlocked = stage - 1
+
+    # Sequential progression check:
+    # - If stages_unlocked = 0, they can unlock stage 1 (visit stage 2 URL)
+    # - If stages_unlocked = 1, they can unlock stage 2 (visit stage 3 URL)
+    # - etc.
+    # So: stage_being_unlocked should equal (stages_unlocked + 1) for next stage
+
+    # Check if trying to skip ahead
+    if stage_being_unlocked > stages_unlocked + 1:
+        # Trying to unlock a stage beyond the next one
+        return _templates(request).TemplateResponse("sequential_error.html", {
+            "request": request,
+            "stages_unlocked": stages_unlocked,
+            "attempted_stage": stage
+        })
+
+    # Update latest submission URL
+    await update_team_fields(db, team_doc, {"last_submission_url": challenge_url})
+
+    is_first_time = (stage_being_unlocked == stages_unlocked + 1)
+
+    # Handle correct values - show same UI for first-time and revisits
+    applied = True
+    if correct_count == 3:
+        # Only update DB on first-time completion
+        if is_first_time:
+            # Use timer_started_at if available, otherwise fall back to created_at
+            timer_start = team_doc.get("timer_started_at") or team_doc["created_at"]
+            completion_time = (datetime.utcnow() - timer_start).total_seconds()
+            new_total_time = team_doc["total_time"] + completion_time
+
+            # Update team document, unless another request already unlocked this stage
+            applied = await update_team_fields(db, team_doc, {
+                f"stage_times.stage_{stage_being_unlocked}": completion_time,
+                "stages_unlocked": stage_being_unlocked,
+                "total_time": new_total_time,
+                "last_updated": datetime.utcnow()  # Leaderboard materializer re-ranks from this write
+            }, expected={"stages_unlocked": team_doc.get("stages_unlocked")})
+
+            if applied:
+                analytics.record_attempt(team_doc["team_name"], team_doc["region"], stage_being_unlocked, True, completion_time)
+
+        # Show consistent UI for both first-time and revisits
+        is_final_stage = (stage_being_unlocked == 4)
+
+        return _templates(request).TemplateResponse("validation_result.html", {
+            "request": request,
+            "all_correct": True,
+            "stage": stage,
+            "stage_unlocked": stage_being_unlocked,
+            "pdf_url": sign_url(f"/pdfs/{challenge['pdf_filename']}"),
+            "is_final_stage": is_final_stage,
+            "pending": applied is None  # Journaled while MongoDB is slow, not confirmed yet
+        })
+
+    # Feed per-stage analytics (revisits of already unlocked stages are not attempts)
+    if is_first_time and stage_being_unlocked >= 1:
+        analytics.record_attempt(team_doc["team_name"], team_doc["region"], stage_being_unlocked, False)
+
+    # Return partial feedback for incorrect values
+    return _templates(request).TemplateResponse("validation_result.html", {
+        "request": request,
+        "all_correct": False,
+        "correct_count": correct_count,
+        "stage": stage
+    })
+
+# Final Submission Routes
+@router.get("/submit", response_class=HTMLResponse)
+async def submit_final_page(request: Request):
+    """Serve final submission page"""
+    return await serve_page(request, "final_submission.html")
+
+@router.post("/api/submit")
+async def submit_final(submission: FinalSubmission):
+    """
+    Submit final BitBucket URL after completing stage 5.
+    """
+    db = await get_database()
+
+    # Authenticate team
+    team_doc = await team_cache.get(db, submission.team_name)
+    if not team_doc or not await verify_password_async(submission.password, team_doc["password_hash"]):
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    # Verify team has completed all stages (needs 4/4 stages unlocked and stage 5 completed)
+    stages_unlocked = team_doc.get("stages_unlocked", 0)
+
+    if stages_unlocked < 4:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Team must complete all stages before final submission. Current: {stages_unlocked}/4 unlocked."
+        )
+
+    # Update team with BitBucket URL
+    await update_team_fields(db, team_doc, {"bitbucket_url": submission.bitbucket_url})
+
+    return {"message": "Final submission successful!", "bitbucket_url": submission.bitbucket_url}
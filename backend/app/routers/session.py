@@ -0,0 +1,56 @@
+from fastapi import APIRouter, HTTPException
+from typing import List
+import asyncio
+from models import SessionCredentials, SessionBootstrap
+from utils.auth import verify_password_async
+from utils.time_validator import is_challenge_open, format_utc_time
+from utils.team_cache import team_cache
+from database import get_database
+from routers.teams import stage_asset_urls
+from routers.leaderboard import team_window
+
+router = APIRouter(prefix="/session", tags=["session"])
+
+async def _window(team_name: str, k: int, regional: bool) -> List[dict]:
+    """Leaderboard rows around the team; empty if the team is not ranked yet or the read is shed (503)"""
+    try:
+        return await team_window(team_name, k, regional) or []
+    except HTTPException:
+        return []
+
+@router.post("/bootstrap", response_model=SessionBootstrap)
+async def bootstrap_session(credentials: SessionCredentials):
+    """
+    Everything a team's page needs after login, in one response: progress, whether its region
+    is open, signed links to the assets it can download and its leaderboard neighbourhood.
+    The password check (bcrypt, on a worker thread) and the reads run concurrently.
+    """
+    db = await get_database()
+
+    team_doc = await team_cache.get(db, credentials.team_name)
+    if not team_doc:
+        raise HTTPException(status_code=404, detail="Team not found")
+    stages_unlocked = team_doc.get("stages_unlocked", team_doc.get("current_stage", 0))
+
+    verified, (challenge_open, start_time), asset_urls, global_window, regional_window = await asyncio.gather(
+        verify_password_async(credentials.password, team_doc["password_hash"]),
+        is_challenge_open(team_doc["region"], db),
+        stage_asset_urls(db, stages_unlocked),
+        _window(team_doc["team_name"], credentials.window, False),
+        _window(team_doc["team_name"], credentials.window, True)
+    )
+    if not verified:
+        raise HTTPException(status_code=401, detail="Invalid password")
+
+    return SessionBootstrap(
+        team_name=team_doc["team_name"],
+        region=team_doc["region"],
+        current_stage=stages_unlocked,
+        total_time=team_doc["total_time"],
+        challenge_open=challenge_open,
+        start_time=format_utc_time(start_time) if start_time else None,
+        asset_urls=asset_urls if challenge_open else {},
+        timer_started=team_doc.get("timer_started_at") is not None,
+        global_window=global_window,
+        regional_window=regional_window
+    )
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends, Response
+from routers.admin import require_admin
+from utils.stage_analytics import analytics
+
+router = APIRouter(tags=["stats"], dependencies=[Depends(require_admin)])
+
+@router.get("/stats")
+async def get_stage_stats():
+    """
+    Live per-stage statistics for organizers, per region and overall ("ALL"):
+    attempts, completions, median and p90 stage time (seconds), and average
+    failed attempts before success. Served from in-memory counters, no database reads.
+    """
+    return Response(content=analytics.payload(), media_type="application/json")
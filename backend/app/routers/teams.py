@@ -1,13 +1,33 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from datetime import datetime
+from typing import Any, Dict
 from models import TeamCreate, TeamResponse
-from utils.auth import hash_password, verify_password
+from utils.auth import hash_password_async, verify_password_async
 from utils.time_validator import is_challenge_open, format_utc_time
-from utils.leaderboard_updater import update_leaderboard
+from utils.team_provisioning import new_team_document, VALID_REGIONS
+from utils.team_cache import team_cache, update_team_fields
+from utils.url_validator import find_challenge
+from utils.signed_urls import sign_url
+from utils.opening_scheduler import opening_scheduler
 from database import get_database
 
 router = APIRouter(prefix="/teams", tags=["teams"])
 
+DATASET_FILENAME = "hackathon_fraud_payment.csv"  # Stage CSV dataset, served under /data
+FINAL_STAGE = 5
+
+async def stage_asset_urls(db: Any, stages_unlocked: int) -> Dict[str, str]:
+    """
+    Signed URLs of the assets a team can download now: the PDF of its current stage
+    (stage 1 before any unlock, stage 5 once all four are unlocked) and the dataset.
+    """
+    challenge = await find_challenge(db, min(stages_unlocked + 1, FINAL_STAGE))
+    paths = [f"/data/{DATASET_FILENAME}"]
+    if challenge and challenge.get("pdf_filename"):
+        paths.insert(0, f"/pdfs/{challenge['pdf_filename']}")
+    return {path: sign_url(path) for path in paths}
+
 @router.post("/create", response_model=TeamResponse)
 async def create_team(team: TeamCreate):
     """
@@ -22,42 +42,15 @@ async def create_team(team: TeamCreate):
         raise HTTPException(status_code=400, detail="Team name already exists")
 
     # Validate region
-    valid_regions = ["EMEA", "AMRS", "APAC"]
-    if team.region not in valid_regions:
-        raise HTTPException(status_code=400, detail=f"Region must be one of {valid_regions}")
+    if team.region not in VALID_REGIONS:
+        raise HTTPException(status_code=400, detail=f"Region must be one of {VALID_REGIONS}")
 
     # Create team document
-    team_doc = {
-        "team_name": team.team_name,
-        "password_hash": hash_password(team.password),
-        "region": team.region,
-        "created_at": datetime.utcnow(),
-        "timer_started_at": None,  # Will be set when Stage 1 PDF is accessed
-        "stages_unlocked": 0,  # 0 stages unlocked (haven't completed stage 1)
-        "stage_times": {
-            "stage_1": None,
-            "stage_2": None,
-            "stage_3": None,
-            "stage_4": None,
-            "stage_5": None
-        },
-        "total_time": 0.0,
-        "last_submission_url": "",
-        "bitbucket_url": None
-    }
-
-    # Insert into database
-    result = await db.teams.insert_one(team_doc)
-
-    # Add team to leaderboard immediately (with 0 stages unlocked)
-    await update_leaderboard(
-        db,
-        str(result.inserted_id),
-        team.team_name,
-        team.region,
-        0,  # 0 stages unlocked
-        0.0
-    )
+    team_doc = new_team_document(team.team_name, await hash_password_async(team.password), team.region)
+
+    # Insert into database (the leaderboard materializer adds the team to the leaderboard)
+    await db.teams.insert_one(team_doc)
+    team_cache.put(team_doc)
 
     # Check if challenge is open for this region
     challenge_open, start_time = await is_challenge_open(team.region, db)
@@ -68,7 +61,8 @@ async def create_team(team: TeamCreate):
         current_stage=0,
         total_time=0.0,
         challenge_open=challenge_open,
-        start_time=format_utc_time(start_time) if start_time else None
+        start_time=format_utc_time(start_time) if start_time else None,
+        asset_urls=await stage_asset_urls(db, 0) if challenge_open else {}
     )
 
 @router.post("/login", response_model=TeamResponse)
@@ -80,24 +74,26 @@ async def login_team(team: TeamCreate):
     db = await get_database()
 
     # Find team
-    team_doc = await db.teams.find_one({"team_name": team.team_name})
+    team_doc = await team_cache.get(db, team.team_name)
     if not team_doc:
         raise HTTPException(status_code=404, detail="Team not found")
 
     # Verify password
-    if not verify_password(team.password, team_doc["password_hash"]):
+    if not await verify_password_async(team.password, team_doc["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid password")
 
     # Check if challenge is open for this region
     challenge_open, start_time = await is_challenge_open(team_doc["region"], db)
+    stages_unlocked = team_doc.get("stages_unlocked", team_doc.get("current_stage", 0))
 
     return TeamResponse(
         team_name=team_doc["team_name"],
         region=team_doc["region"],
-        current_stage=team_doc.get("stages_unlocked", team_doc.get("current_stage", 0)),
+        current_stage=stages_unlocked,
         total_time=team_doc["total_time"],
         challenge_open=challenge_open,
-        start_time=format_utc_time(start_time) if start_time else None
+        start_time=format_utc_time(start_time) if start_time else None,
+        asset_urls=await stage_asset_urls(db, stages_unlocked) if challenge_open else {}
     )
 
 @router.post("/start-timer")
@@ -110,22 +106,40 @@ async def start_timer(team: TeamCreate):
     db = await get_database()
 
     # Find team
-    team_doc = await db.teams.find_one({"team_name": team.team_name})
+    team_doc = await team_cache.get(db, team.team_name)
     if not team_doc:
         raise HTTPException(status_code=404, detail="Team not found")
 
     # Verify password
-    if not verify_password(team.password, team_doc["password_hash"]):
+    if not await verify_password_async(team.password, team_doc["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid password")
 
     # Check if timer already started
     if team_doc.get("timer_started_at") is not None:
         return {"message": "Timer already started", "timer_started": True}
 
-    # Start the timer
-    await db.teams.update_one(
-        {"_id": team_doc["_id"]},
-        {"$set": {"timer_started_at": datetime.utcnow()}}
-    )
+    # Start the timer (only if no concurrent request started it first)
+    applied = await update_team_fields(db, team_doc, {"timer_started_at": datetime.utcnow()}, expected={"timer_started_at": None})
+    if applied is None:
+        # Journaled while MongoDB is slow: the timer starts once the write is replayed
+        return {"message": "Timer start is being saved", "timer_started": True, "pending": True}
 
     return {"message": "Timer started successfully", "timer_started": True}
+
+@router.get("/opening/stream")
+async def opening_stream(region: str, request: Request):
+    """
+    Push channel for teams waiting for their region to open (server-sent events), instead of
+    polling /teams/login: a `scheduled` event with the start time, then a `region_open` event once the
+    region has opened, delayed per client by a random jitter so logins spread out.
+    """
+    if region not in VALID_REGIONS:
+        raise HTTPException(status_code=400, detail=f"Region must be one of {VALID_REGIONS}")
+
+    db = await get_database()
+    _, start_time = await is_challenge_open(region, db)
+    return StreamingResponse(
+        opening_scheduler.stream(region, start_time, lambda: request.app.state.lifecycle.draining),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
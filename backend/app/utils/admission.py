@@ -0,0 +1,184 @@
+"""
+Admission control and load shedding.
+
+Requests are grouped into route classes, each with its own concurrency limit and
+bounded wait queue. When a class is saturated and its queue is full (or a request
+waits longer than the queue timeout) the request fails fast with 503 + Retry-After
+instead of piling up, so latency for admitted requests stays bounded.
+
+Lower-priority classes can also be shed while the server as a whole is busy
+(`shed_above`), which keeps capacity free for challenge validation.
+Health checks are never queued.
+"""
+import asyncio
+from collections import deque
+from typing import Callable, Dict, Optional
+from utils.fast_json import dumps
+
+
+class RouteClass:
+    """Concurrency limit with a bounded FIFO queue; the limit can be changed at runtime"""
+
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float, shed_above: Optional[int] = None):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.shed_above = shed_above  # Reject outright while total in-flight requests exceed this
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._waiters = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting in the queue if needed. Returns False if the request should be shed."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return True
+
+        if len(self._waiters) >= self.max_queue:
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # A released slot is handed straight to the waiter (see release), so active is already counted
+            await asyncio.wait_for(waiter, self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self):
+        """Free a slot, handing it to the oldest waiter if there is one"""
+        while self._waiters and self.active <= self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def set_limit(self, limit: int):
+        """Change the concurrency limit, admitting queued requests if it grew"""
+        self.limit = limit
+        while self._waiters and self.active < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.active += 1
+                waiter.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected
+        }
+
+
+def classify_path(path: str) -> Optional[str]:
+    """Map a request path to its route class (None = never limited)"""
+    if path.startswith("/health") or path == "/teams/opening/stream":
+        return None  # The opening push stream is long-lived and idle, see utils.opening_scheduler
+    if path.startswith("/ERFT_stage") or path.startswith("/api/challenges/") or path == "/api/submit":
+        return "validation"
+    if path.startswith("/teams/") or path == "/api/session/bootstrap":
+        return "auth"
+    if path.startswith("/leaderboard/"):
+        return "leaderboard"
+    if path.startswith("/admin") or path == "/stats":
+        return "admin"
+    return "pages"
+
+
+def default_route_classes() -> Dict[str, RouteClass]:
+    """Default limits: validation and team auth (bcrypt) first, leaderboard reads shed early"""
+    return {
+        "validation": RouteClass("validation", limit=64, max_queue=256, queue_timeout=10.0),
+        "auth": RouteClass("auth", limit=32, max_queue=256, queue_timeout=10.0),
+        "leaderboard": RouteClass("leaderboard", limit=32, max_queue=64, queue_timeout=2.0, shed_above=128),
+        "pages": RouteClass("pages", limit=64, max_queue=128, queue_timeout=5.0, shed_above=160),
+        "admin": RouteClass("admin", limit=4, max_queue=8, queue_timeout=30.0),
+    }
+
+
+class AdmissionControl:
+    """Route classes plus the shared in-flight count; one instance per app"""
+
+    def __init__(self, classes: Optional[Dict[str, RouteClass]] = None, retry_after: int = 5):
+        self.classes = classes or default_route_classes()
+        self.retry_after = retry_after
+        self._surges = 0
+        self._base_limits: Dict[str, int] = {}
+
+    def expand(self, factor: float, names=("auth", "validation", "pages")):
+        """Raise the limits of route classes by `factor` until restore(); overlapping expansions apply once"""
+        if self._surges == 0:
+            self._base_limits = {name: self.classes[name].limit for name in names if name in self.classes}
+            for name, limit in self._base_limits.items():
+                self.classes[name].set_limit(int(limit * factor))
+        self._surges += 1
+
+    def restore(self):
+        """End an expansion; the base limits come back when the last one ends"""
+        self._surges = max(0, self._surges - 1)
+        if self._surges == 0:
+            for name, limit in self._base_limits.items():
+                self.classes[name].set_limit(limit)
+            self._base_limits = {}
+
+    @property
+    def in_flight(self) -> int:
+        return sum(route_class.active for route_class in self.classes.values())
+
+    def stats(self) -> dict:
+        return {name: route_class.stats() for name, route_class in self.classes.items()}
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying AdmissionControl to every HTTP request"""
+
+    def __init__(self, app, control: AdmissionControl, classify: Callable[[str], Optional[str]] = classify_path):
+        self.app = app
+        self.control = control
+        self.classify = classify
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        name = self.classify(scope["path"])
+        route_class = self.control.classes.get(name) if name else None
+        if route_class is None:
+            return await self.app(scope, receive, send)
+
+        shed = route_class.shed_above is not None and self.control.in_flight >= route_class.shed_above
+        if shed or not await route_class.acquire():
+            route_class.rejected += 1
+            return await self._reject(send)
+
+        route_class.admitted += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route_class.release()
+
+    async def _reject(self, send):
+        body = dumps({"detail": "Server is busy, please retry shortly"})
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                (b"retry-after", str(self.control.retry_after).encode("ascii")),
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -1,4 +1,8 @@
+import asyncio
 import bcrypt
+import hmac
+import os
+from typing import Optional
 
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt"""
@@ -7,3 +11,21 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+async def hash_password_async(password: str) -> str:
+    """hash_password on a worker thread (bcrypt releases the GIL), keeping the event loop free"""
+    return await asyncio.to_thread(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on a worker thread, keeping the event loop free"""
+    return await asyncio.to_thread(verify_password, plain_password, hashed_password)
+
+def verify_admin_token(token: Optional[str]) -> bool:
+    """
+    Check an organizer token against the HACKATHON_ADMIN_TOKEN environment variable.
+    Admin endpoints stay disabled while the variable is unset.
+    """
+    expected = os.environ.get("HACKATHON_ADMIN_TOKEN")
+    if not expected or not token:
+        return False
+    return hmac.compare_digest(token.encode('utf-8'), expected.encode('utf-8'))
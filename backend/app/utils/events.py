@@ -0,0 +1,312 @@
+"""
+Multi-event tenancy: several hackathons served by one pool of workers.
+
+Every request is scoped to an event, resolved from the path (`/e/{event}/...`, the
+prefix is stripped before routing) or from the host (`{event}` + HACKATHON_EVENT_HOST_SUFFIX),
+and falling back to the default event. Each event has its own database and its own
+in-process state (team cache, leaderboard change log and materializer, analytics,
+snapshot publisher, write journal and single-flight reads), held by an EventContext.
+
+The process-wide names used throughout the app (`team_cache`, `change_log`, `analytics`,
+...) are EventScoped proxies that resolve to the current event's instance, so request
+handlers and background tasks need no event plumbing. Event state is started on first
+use, and at most HACKATHON_MAX_ACTIVE_EVENTS events are kept in memory: the least
+recently used idle event is flushed and dropped when another one is activated.
+"""
+import asyncio
+import os
+import re
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Sequence
+from utils.fast_json import dumps
+
+DEFAULT_EVENT = "default"
+EVENT_ID_PATTERN = re.compile(r"^[a-z0-9][a-z0-9-]{0,31}$")
+PATH_PREFIX = "/e/"
+
+_current_event: ContextVar[Optional["EventContext"]] = ContextVar("hackathon_event", default=None)
+
+
+def database_name(event_id: str) -> str:
+    """Database holding an event's collections"""
+    if event_id == DEFAULT_EVENT:
+        return os.environ.get("HACKATHON_DB_NAME", "hackathon_db")
+    return f"hackathon_{event_id}"
+
+
+class EventContext:
+    """In-process state of one event"""
+
+    def __init__(self, event_id: str, team_cache_size: int = 10000, prerender: Sequence = (), admission: Any = None):
+        # Imported here: these modules use EventScoped proxies from this module
+        from utils.team_cache import TeamCache
+        from utils.leaderboard_changes import LeaderboardChangeLog
+        from utils.leaderboard_materializer import LeaderboardMaterializer
+        from utils.leaderboard_partitions import PartitionedLeaderboard
+        from utils.stage_analytics import StageAnalytics
+        from utils.snapshot_publisher import SnapshotPublisher, SNAPSHOT_ROOT
+        from utils.write_journal import WriteJournal, JOURNAL_ROOT
+        from utils.single_flight import SingleFlight
+        from utils.opening_scheduler import OpeningScheduler
+
+        self.event_id = event_id
+        self.db_name = database_name(event_id)
+        self.team_cache = TeamCache(max_entries=team_cache_size)
+        self.change_log = LeaderboardChangeLog()
+        self.leaderboard_partitions = PartitionedLeaderboard()
+        self.materializer = LeaderboardMaterializer()
+        self.analytics = StageAnalytics()
+        self.snapshot_publisher = SnapshotPublisher(os.path.join(SNAPSHOT_ROOT, event_id))
+        self.write_journal = WriteJournal(os.path.join(JOURNAL_ROOT, event_id))
+        self.single_flight = SingleFlight()
+        self.opening_scheduler = OpeningScheduler.from_env(prerender, admission)
+        self.in_flight = 0
+        self.last_used = time.monotonic()
+        self._tasks: List[asyncio.Task] = []
+
+    def database(self) -> Any:
+        from database import db_instance
+        return db_instance.client[self.db_name]
+
+    def enter(self):
+        """Make this the current event for the running task (and tasks it creates)"""
+        return _current_event.set(self)
+
+    async def start(self, defer_warmup: bool = False):
+        """
+        Rebuild the leaderboard and start this event's background tasks.
+        With defer_warmup the rebuild runs in the background (see materializer.rebuilt).
+        """
+        from database import ensure_indexes
+
+        token = self.enter()
+        try:
+            db = self.database()
+            await ensure_indexes(db)
+            await self.write_journal.open()
+            await self.materializer.start(db, defer_rebuild=defer_warmup)
+            await self.analytics.load(db)
+
+            # Tasks inherit the current context, so they stay scoped to this event
+            self._tasks = [
+                asyncio.create_task(self.analytics.run_persistence(db)),
+                asyncio.create_task(self.team_cache.run_invalidation(db)),
+                asyncio.create_task(self.snapshot_publisher.run(db)),
+                asyncio.create_task(self.write_journal.run(db)),
+                asyncio.create_task(self.opening_scheduler.run(db)),
+            ]
+        finally:
+            _current_event.reset(token)
+
+    async def close(self):
+        """Stop background tasks and flush journaled writes, leaderboard, analytics and snapshots"""
+        token = self.enter()
+        try:
+            for task in self._tasks:
+                task.cancel()
+            if self._tasks:
+                await asyncio.wait(self._tasks)
+            self._tasks = []
+
+            db = self.database()
+            for name, flush in (
+                ("write journal", lambda: self.write_journal.flush(db)),
+                ("leaderboard", lambda: self.materializer.stop(db)),
+                ("analytics", lambda: self.analytics.persist(db)),
+                ("snapshots", lambda: self.snapshot_publisher.publish(db)),
+            ):
+                try:
+                    await flush()
+                except Exception as e:
+                    print(f"Failed to flush {name} of event {self.event_id}: {e!r}")
+        finally:
+            _current_event.reset(token)
+
+    def stats(self) -> dict:
+        return {
+            "database": self.db_name,
+            "in_flight": self.in_flight,
+            "idle_seconds": round(time.monotonic() - self.last_used, 1),
+            "leaderboard_version": self.change_log.token,
+            "team_cache": self.team_cache.stats(),
+            "single_flight": self.single_flight.stats(),
+            "openings": self.opening_scheduler.stats()["openings"],
+            "write_journal": {"degraded": self.write_journal.degraded, "pending": len(self.write_journal.pending)}
+        }
+
+
+class EventRegistry:
+    """Active events, started on first use and bounded in number (LRU)"""
+
+    def __init__(self, allowed: Optional[List[str]] = None, max_active: int = 8, team_cache_size: int = 10000,
+                 defer_warmup: bool = False, prerender: Sequence = (), admission: Any = None):
+        self.allowed = {DEFAULT_EVENT, *(allowed or [])}
+        self.max_active = max_active
+        self.team_cache_size = team_cache_size
+        self._active: "OrderedDict[str, EventContext]" = OrderedDict()
+        self._starting: Dict[str, asyncio.Task] = {}
+        self._closing: List[asyncio.Task] = []
+        self._default: Optional[EventContext] = None
+        self.defer_warmup = defer_warmup  # Start events without waiting for their leaderboard rebuild
+        self.prerender = list(prerender)  # Run ahead of each regional opening, see utils.opening_scheduler
+        self.admission = admission  # The app's AdmissionControl, expanded around regional openings
+
+    @classmethod
+    def from_env(cls, **kwargs) -> "EventRegistry":
+        allowed = [e.strip() for e in os.environ.get("HACKATHON_EVENTS", "").split(",") if e.strip()]
+        return cls(
+            allowed=[e for e in allowed if EVENT_ID_PATTERN.match(e)],
+            max_active=int(os.environ.get("HACKATHON_MAX_ACTIVE_EVENTS", "8")),
+            team_cache_size=int(os.environ.get("HACKATHON_TEAM_CACHE_SIZE", "10000")),
+            **kwargs
+        )
+
+    def is_known(self, event_id: str) -> bool:
+        return event_id in self.allowed
+
+    @property
+    def default(self) -> EventContext:
+        """The default event's context (also used outside requests, e.g. by scripts)"""
+        if self._default is None:
+            self._default = EventContext(DEFAULT_EVENT, self.team_cache_size, self.prerender, self.admission)
+        return self._default
+
+    async def activate(self, event_id: str) -> EventContext:
+        """The started context of an event, starting it (once, even under concurrency) if needed"""
+        context = self._active.get(event_id)
+        if context is not None:
+            self._active.move_to_end(event_id)
+            context.last_used = time.monotonic()
+            return context
+
+        starting = self._starting.get(event_id)
+        if starting is None:
+            starting = asyncio.create_task(self._start(event_id))
+            self._starting[event_id] = starting
+        return await asyncio.shield(starting)
+
+    async def _start(self, event_id: str) -> EventContext:
+        try:
+            context = self.default if event_id == DEFAULT_EVENT else EventContext(event_id, self.team_cache_size, self.prerender, self.admission)
+            await context.start(self.defer_warmup)
+            self._active[event_id] = context
+            self._evict()
+            return context
+        finally:
+            self._starting.pop(event_id, None)
+
+    def _evict(self):
+        """Close least recently used idle events beyond max_active (the default event is kept)"""
+        for event_id, context in list(self._active.items()):
+            if len(self._active) <= self.max_active:
+                break
+            if event_id == DEFAULT_EVENT or context.in_flight:
+                continue
+            del self._active[event_id]
+            print(f"Event {event_id}: idle, releasing in-process state")
+            task = asyncio.create_task(context.close())
+            self._closing.append(task)
+            task.add_done_callback(self._closing.remove)
+
+    async def close_all(self):
+        """Flush and stop every active event (shutdown)"""
+        contexts = list(self._active.values())
+        self._active.clear()
+        await asyncio.gather(*(context.close() for context in contexts), *self._closing)
+
+    def stats(self) -> dict:
+        return {
+            "max_active": self.max_active,
+            "active": {event_id: context.stats() for event_id, context in self._active.items()}
+        }
+
+
+events = EventRegistry.from_env()  # Process default, for code outside an app (scripts); each app has its own (app.state.events)
+
+
+def current_event() -> EventContext:
+    """Context of the event the running request (or task) belongs to"""
+    return _current_event.get() or events.default
+
+
+class EventScoped:
+    """Proxy to an attribute of the current event's context, e.g. EventScoped("team_cache")"""
+
+    def __init__(self, attribute: str):
+        self._attribute = attribute
+
+    def __getattr__(self, name: str):
+        return getattr(getattr(current_event(), self._attribute), name)
+
+    def __len__(self) -> int:
+        return len(getattr(current_event(), self._attribute))
+
+
+def resolve_event(path: str, host: str, host_suffix: str) -> tuple:
+    """
+    (event_id, remaining_path, prefix) for a request; event_id is None when the
+    request names an event that is not a valid id.
+    """
+    if path.startswith(PATH_PREFIX):
+        event_id, _, rest = path[len(PATH_PREFIX):].partition("/")
+        if not EVENT_ID_PATTERN.match(event_id):
+            return None, path, ""
+        return event_id, "/" + rest, PATH_PREFIX + event_id
+
+    hostname = host.split(":", 1)[0].lower()
+    if host_suffix and hostname.endswith(host_suffix) and hostname != host_suffix.lstrip("."):
+        event_id = hostname[:-len(host_suffix)]
+        return (event_id if EVENT_ID_PATTERN.match(event_id) else None), path, ""
+
+    return DEFAULT_EVENT, path, ""
+
+
+class EventMiddleware:
+    """Resolves the event of each request, strips a `/e/{event}` prefix and activates the event's state"""
+
+    def __init__(self, app, registry: EventRegistry, host_suffix: Optional[str] = None):
+        self.app = app
+        self.registry = registry
+        self.host_suffix = (host_suffix if host_suffix is not None else os.environ.get("HACKATHON_EVENT_HOST_SUFFIX", "")).lower()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+
+        host = dict(scope["headers"]).get(b"host", b"").decode("latin-1")
+        event_id, path, prefix = resolve_event(scope["path"], host, self.host_suffix)
+
+        if event_id is None or not self.registry.is_known(event_id):
+            return await self._not_found(send)
+
+        if prefix:
+            # Routed as if the prefix wasn't there; the prefix is kept in the scope for building links
+            scope = dict(scope, path=path, raw_path=path.encode("utf-8"), event_prefix=prefix)
+
+        # Health checks answer for the process, without starting an event
+        if scope["path"].startswith("/health") and event_id == DEFAULT_EVENT:
+            return await self.app(scope, receive, send)
+
+        context = await self.registry.activate(event_id)
+        token = context.enter()
+        context.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            context.in_flight -= 1
+            context.last_used = time.monotonic()
+            _current_event.reset(token)
+
+    async def _not_found(self, send):
+        body = dumps({"detail": "Unknown event"})
+        await send({
+            "type": "http.response.start",
+            "status": 404,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,35 @@
+"""
+Fast JSON responses for hot read paths.
+Rows are serialized straight to bytes, skipping pydantic model construction and
+FastAPI's response_model validation. Uses orjson when installed and falls back to the
+standard library with the same output as FastAPI's JSONResponse.
+"""
+import json
+from typing import Any, Dict, Optional
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt but optional
+    orjson = None
+
+def dumps(content: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+def json_response(content: Any, headers: Optional[Dict[str, str]] = None, status_code: int = 200) -> Response:
+    """Build a raw application/json Response from already-serializable content"""
+    return Response(
+        content=dumps(content),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json"
+    )
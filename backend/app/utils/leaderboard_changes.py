@@ -0,0 +1,91 @@
+"""
+Bounded log of leaderboard row changes, tagged with increasing versions.
+Lets pollers ask for "what changed since version v" instead of re-reading the whole board.
+
+Versions count per process, so clients get them as tokens "{epoch}-{version}" with an
+epoch drawn when the log is created: behind a load balancer a poller's next request may
+reach another worker (or a restarted one), whose versions mean something else, and its
+token is then recognised as foreign instead of being misread as a local version.
+"""
+import secrets
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Set
+from utils.events import EventScoped
+
+class LeaderboardChangeLog:
+    """
+    Ring buffer of (version, {board: team names}) entries.
+    A board is either "global" or a region code. Each recorded batch of changes
+    gets the next version number; the oldest batches fall off once max_versions is reached.
+    """
+
+    def __init__(self, max_versions: int = 500):
+        self.version = 0
+        self.epoch = secrets.token_hex(4)
+        self._floor = 0  # Oldest `since` value that can still be answered with a delta
+        self._entries = deque(maxlen=max_versions)
+        self._listeners: List[Callable[[int], None]] = []
+
+    @property
+    def token(self) -> str:
+        """The current version as handed to clients"""
+        return f"{self.epoch}-{self.version}"
+
+    def parse(self, token: str) -> Optional[int]:
+        """Version number of a token issued by this log, or None (another process, or malformed)"""
+        epoch, _, version = token.partition("-")
+        if epoch != self.epoch or not version.isdigit():
+            return None
+        return int(version)
+
+    def add_listener(self, listener: Callable[[int], None]):
+        """Call `listener(version)` whenever a new version is recorded (or the log is reset)"""
+        self._listeners.append(listener)
+
+    def _notify(self):
+        for listener in self._listeners:
+            listener(self.version)
+
+    def record(self, changes: Dict[str, Iterable[str]]) -> int:
+        """
+        Record one batch of changed rows and return its version.
+        Boards with no changed teams are dropped; an empty batch does not bump the version.
+        """
+        changes = {board: frozenset(names) for board, names in changes.items() if names}
+        if not changes:
+            return self.version
+
+        self.version += 1
+        self._entries.append((self.version, changes))
+        self._notify()
+        return self.version
+
+    def reset(self) -> int:
+        """Forget all deltas (e.g. after a full rebuild), forcing clients to re-snapshot"""
+        self.version += 1
+        self._entries.clear()
+        self._floor = self.version
+        self._notify()
+        return self.version
+
+    def changed_since(self, token: str, board: str) -> Optional[Set[str]]:
+        """
+        Team names whose row on `board` changed after the version of `token`.
+        Returns None when the version is no longer covered by the buffer or the token
+        comes from another process, meaning the caller needs a full snapshot.
+        """
+        since = self.parse(token)
+        if since is None:
+            return None
+
+        floor = self._entries[0][0] - 1 if self._entries else self._floor
+        if since < floor or since > self.version:
+            return None
+
+        changed = set()
+        for version, changes in self._entries:
+            if version > since:
+                changed.update(changes.get(board, ()))
+        return changed
+
+change_log = EventScoped("change_log")  # The current event's LeaderboardChangeLog
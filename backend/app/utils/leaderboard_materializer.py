@@ -0,0 +1,182 @@
+"""
+Keeps the leaderboard collection in sync with the teams collection, out of band.
+
+Request handlers only write team documents (stamping `last_updated`); this service
+picks those writes up and re-ranks in batches. It tails a MongoDB change stream on
+`teams` and falls back to polling `last_updated` where change streams are not
+available (standalone mongod). A periodic full rebuild in polling mode guarantees
+the leaderboard cannot drift from `teams`.
+"""
+import asyncio
+from datetime import datetime
+from typing import Any, Awaitable, Dict, List, Optional
+from pymongo.errors import OperationFailure, PyMongoError
+from utils.events import EventScoped
+from utils.leaderboard_updater import rebuild_leaderboard, sync_teams_to_leaderboard, MIRRORED_FIELDS
+
+# Only react to writes that can change the leaderboard
+CHANGE_STREAM_PIPELINE = [{"$match": {"$or": [
+    {"operationType": {"$in": ["insert", "replace", "delete"]}},
+    *[{f"updateDescription.updatedFields.{field}": {"$exists": True}} for field in MIRRORED_FIELDS]
+]}}]
+
+class LeaderboardMaterializer:
+    def __init__(self, poll_interval: float = 1.0, resync_interval: float = 300.0, max_batch: int = 500):
+        self.poll_interval = poll_interval
+        self.resync_interval = resync_interval
+        self.max_batch = max_batch
+        self.mode: Optional[str] = None  # "change_stream" or "polling" once running
+        self._task: Optional[asyncio.Task] = None
+        self._applying: Optional[asyncio.Future] = None  # Batch being written; finished even on stop()
+        self._resume_token = None
+        # Polling position: (last_updated, _id) of the last team applied; _id is None until one is
+        self._high_water: Optional[datetime] = None
+        self._high_water_id: Any = None
+        self.rebuilt = asyncio.Event()  # Set once the startup rebuild is done
+
+    async def start(self, db: Any, defer_rebuild: bool = False):
+        """
+        Rebuild the leaderboard once, then follow team writes in the background.
+        With defer_rebuild the rebuild also runs in the background (wait on `rebuilt`);
+        until it finishes, readers see the leaderboard as persisted by the previous run.
+        """
+        # Taken before the rebuild so writes racing with it are picked up by polling
+        self._high_water = datetime.utcnow()
+
+        if not defer_rebuild:
+            await self._rebuild(db)
+
+        self._task = asyncio.create_task(self._run(db))
+
+    async def _rebuild(self, db: Any):
+        count = await rebuild_leaderboard(db)
+        print(f"✅ Leaderboard rebuilt successfully with {count} teams")
+        self.rebuilt.set()
+
+    async def stop(self, db: Any = None):
+        """
+        Stop following team writes. A batch that is being written is allowed to finish,
+        and in polling mode (given `db`) one last poll picks up writes since the previous one.
+        """
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._applying is not None:
+            await self._applying
+
+        if db is not None and self.mode == "polling":
+            await self._poll_once(db)
+
+    async def _apply(self, write: Awaitable):
+        """Run a leaderboard write shielded from cancellation, so stop() never leaves it half done"""
+        self._applying = asyncio.ensure_future(write)
+        try:
+            await asyncio.shield(self._applying)
+        finally:
+            if self._applying.done():
+                self._applying = None
+
+    async def _run(self, db: Any):
+        if not self.rebuilt.is_set():
+            await self._rebuild(db)
+
+        while True:
+            try:
+                await self._follow_change_stream(db)
+            except OperationFailure as e:
+                if self._resume_token is not None:
+                    # The resume point fell out of the oplog: start over from a full rebuild
+                    self._resume_token = None
+                    await rebuild_leaderboard(db)
+                    continue
+
+                # Change streams need a replica set; poll last_updated instead
+                print(f"Change streams unavailable ({e.code}), polling teams.last_updated")
+                await self._poll(db)
+                return
+            except PyMongoError as e:
+                print(f"Leaderboard change stream interrupted: {e}; resuming")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _follow_change_stream(self, db: Any):
+        async with db.teams.watch(
+            CHANGE_STREAM_PIPELINE,
+            full_document="updateLookup",
+            resume_after=self._resume_token
+        ) as stream:
+            self.mode = "change_stream"
+            while True:
+                # Wait for one change, then drain whatever else is already queued into the same batch
+                changes = [await stream.next()]
+                while len(changes) < self.max_batch:
+                    change = await stream.try_next()
+                    if change is None:
+                        break
+                    changes.append(change)
+
+                await self._apply(self._apply_changes(db, changes))
+                self._resume_token = stream.resume_token
+
+    async def _apply_changes(self, db: Any, changes: List[dict]):
+        teams: Dict[Any, dict] = {}
+        removed = set()
+        for change in changes:
+            team_id = change["documentKey"]["_id"]
+            if change["operationType"] == "delete" or change.get("fullDocument") is None:
+                teams.pop(team_id, None)
+                removed.add(team_id)
+            else:
+                teams[team_id] = change["fullDocument"]
+                removed.discard(team_id)
+
+        await sync_teams_to_leaderboard(db, list(teams.values()), removed)
+
+    async def _poll(self, db: Any):
+        self.mode = "polling"
+        last_resync = asyncio.get_running_loop().time()
+
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                if asyncio.get_running_loop().time() - last_resync >= self.resync_interval:
+                    # Catches deletions and anything written without last_updated
+                    await rebuild_leaderboard(db)
+                    last_resync = asyncio.get_running_loop().time()
+                    continue
+
+                await self._poll_once(db)
+            except PyMongoError as e:
+                print(f"Leaderboard poll failed: {e}")
+
+    def _after_high_water(self) -> dict:
+        """Teams after the polling position in (last_updated, _id) order"""
+        if self._high_water_id is None:
+            return {"last_updated": {"$gte": self._high_water}}
+        return {"$or": [
+            {"last_updated": {"$gt": self._high_water}},
+            {"last_updated": self._high_water, "_id": {"$gt": self._high_water_id}}
+        ]}
+
+    async def _poll_once(self, db: Any):
+        """
+        Apply every team written since the polling position, a batch at a time. Teams are paged
+        by (last_updated, _id), so any number of teams sharing one timestamp (bulk writes) are all applied.
+        """
+        while True:
+            teams = await db.teams.find(self._after_high_water()).sort(
+                [("last_updated", 1), ("_id", 1)]
+            ).limit(self.max_batch).to_list(self.max_batch)
+            if not teams:
+                return
+
+            await self._apply(sync_teams_to_leaderboard(db, teams))
+            self._high_water, self._high_water_id = teams[-1]["last_updated"], teams[-1]["_id"]
+            if len(teams) < self.max_batch:
+                return
+
+materializer = EventScoped("materializer")  # The current event's LeaderboardMaterializer
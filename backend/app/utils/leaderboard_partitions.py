@@ -0,0 +1,180 @@
+"""
+In-memory, region-partitioned leaderboard order.
+
+Each region keeps its ranked teams (stages_unlocked > 0) in a sorted list of rank keys
+(-stages_unlocked, total_time, team_name). A team's regional rank is its position in
+its region's list; the global order is never stored, it is the k-way merge
+(heapq.merge) of the regional lists, produced lazily and only over the positions a
+change can affect. A global position is the sum of the team's positions in each
+region (one bisect per region), so a regional update never needs a global sort.
+
+Teams with no stages unlocked are not in any list; their ranks are 999.
+"""
+import heapq
+import sys
+from bisect import bisect_left
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from utils.events import EventScoped
+
+UNRANKED = 999
+TO_END = sys.maxsize  # Span end meaning "through the last position"
+RankKey = Tuple[int, float, str]
+Span = Tuple[int, int]  # Inclusive range of 0-based positions whose rank changed
+
+
+def rank_key(entry: dict) -> Optional[RankKey]:
+    """Sort key of a leaderboard entry, or None for teams that are not ranked yet"""
+    if entry["stages_unlocked"] <= 0:
+        return None
+    return (-entry["stages_unlocked"], entry["total_time"], entry["team_name"])
+
+
+def _widen(spans: Dict[str, Span], board: str, lo: int, hi: int):
+    if board in spans:
+        old_lo, old_hi = spans[board]
+        lo, hi = min(lo, old_lo), max(hi, old_hi)
+    spans[board] = (lo, hi)
+
+
+class RegionPartition:
+    """Sorted rank keys of one region's ranked teams"""
+
+    def __init__(self, region: str):
+        self.region = region
+        self.keys: List[RankKey] = []
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def position(self, key: RankKey) -> int:
+        """Number of this region's teams ranked ahead of `key`"""
+        return bisect_left(self.keys, key)
+
+    def insert(self, key: RankKey) -> int:
+        index = bisect_left(self.keys, key)
+        self.keys.insert(index, key)
+        return index
+
+    def remove(self, key: RankKey) -> int:
+        index = bisect_left(self.keys, key)
+        del self.keys[index]
+        return index
+
+
+class PartitionedLeaderboard:
+    def __init__(self):
+        self.partitions: Dict[str, RegionPartition] = {}
+        self._placed: Dict[str, Tuple[str, Optional[RankKey]]] = {}  # team_name -> (region, key)
+        self._names: Dict[str, str] = {}  # team_id -> team_name, to follow renames and removals
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return sum(len(partition) for partition in self.partitions.values())
+
+    def partition(self, region: str) -> RegionPartition:
+        if region not in self.partitions:
+            self.partitions[region] = RegionPartition(region)
+        return self.partitions[region]
+
+    def load(self, entries: Iterable[dict]):
+        """Replace the whole order (one sort per region)"""
+        self.partitions = {}
+        self._placed = {}
+        self._names = {}
+        for entry in entries:
+            key = rank_key(entry)
+            self._placed[entry["team_name"]] = (entry["region"], key)
+            if "team_id" in entry:
+                self._names[entry["team_id"]] = entry["team_name"]
+            if key is not None:
+                self.partition(entry["region"]).keys.append(key)
+        for partition in self.partitions.values():
+            partition.keys.sort()
+        self.loaded = True
+
+    def global_position(self, key: RankKey) -> int:
+        """Number of teams ranked ahead of `key` across all regions"""
+        return sum(partition.position(key) for partition in self.partitions.values())
+
+    def merged(self, start: int = 0, stop: Optional[int] = None) -> Iterator[RankKey]:
+        """Global order (positions start..stop-1), merged lazily from the regional partitions"""
+        return islice(heapq.merge(*(partition.keys for partition in self.partitions.values())), start, stop)
+
+    def ranks(self) -> Dict[str, Tuple[int, int]]:
+        """(global_rank, regional_rank) of every team"""
+        ranks = {name: (UNRANKED, UNRANKED) for name in self._placed}
+        regional = {}
+        for partition in self.partitions.values():
+            for index, key in enumerate(partition.keys, start=1):
+                regional[key[2]] = index
+        for index, key in enumerate(self.merged(), start=1):
+            ranks[key[2]] = (index, regional[key[2]])
+        return ranks
+
+    def place(self, entry: dict, spans: Dict[str, Span]) -> bool:
+        """
+        Move a team to its new place (or add it), widening `spans` (board -> positions
+        whose rank changed) for its old and new region and for the global board.
+        A renamed team (same team_id) leaves its old name's place. Returns whether the team moved.
+        """
+        team_id = entry.get("team_id")
+        previous_name = self._names.get(team_id) if team_id is not None else None
+        if previous_name is not None and previous_name != entry["team_name"]:
+            self.remove(previous_name, spans)
+        if team_id is not None:
+            self._names[team_id] = entry["team_name"]
+
+        region, key = entry["region"], rank_key(entry)
+        old_region, old_key = self._placed.get(entry["team_name"], (None, None))
+        self._placed[entry["team_name"]] = (region, key)
+        if (old_region, old_key) == (region, key):
+            return False
+
+        # Positions are counts of teams ranked ahead, before the move and after it
+        old_position = self.global_position(old_key) if old_key is not None else None
+        old_index = self.partition(old_region).remove(old_key) if old_key is not None else None
+        new_index = self.partition(region).insert(key) if key is not None else None
+        new_position = self.global_position(key) if key is not None else None
+
+        # A move within a board only shifts the teams between its old and new place;
+        # a team joining or leaving a board shifts everyone after it
+        if old_key is not None and key is not None and old_region == region:
+            _widen(spans, region, min(old_index, new_index), max(old_index, new_index))
+        else:
+            if old_key is not None:
+                _widen(spans, old_region, old_index, TO_END)
+            if key is not None:
+                _widen(spans, region, new_index, TO_END)
+
+        if old_key is not None and key is not None:
+            _widen(spans, "global", min(old_position, new_position), max(old_position, new_position))
+        elif old_key is not None or key is not None:
+            _widen(spans, "global", old_position if old_key is not None else new_position, TO_END)
+        return True
+
+    def remove(self, team_name: str, spans: Dict[str, Span]):
+        """Take a team off the leaderboard, widening `spans` like place()"""
+        region, key = self._placed.pop(team_name, (None, None))
+        if key is not None:
+            _widen(spans, "global", self.global_position(key), TO_END)
+            _widen(spans, region, self.partition(region).remove(key), TO_END)
+
+    def remove_team(self, team_id: str, spans: Dict[str, Span]):
+        """Take a team off the leaderboard by team_id (a no-op if this process never placed it)"""
+        team_name = self._names.pop(team_id, None)
+        if team_name is not None:
+            self.remove(team_name, spans)
+
+    def names_in(self, board: str, span: Span) -> List[Tuple[str, int]]:
+        """(team_name, rank) for the positions of `span` on a board, in the current order"""
+        lo, hi = span
+        stop = None if hi == TO_END else hi + 1
+        if board == "global":
+            keys = self.merged(lo, stop)
+        else:
+            keys = self.partition(board).keys[lo:stop]
+        return [(key[2], rank) for rank, key in enumerate(keys, start=lo + 1)]
+
+
+partitions = EventScoped("leaderboard_partitions")  # The current event's PartitionedLeaderboard
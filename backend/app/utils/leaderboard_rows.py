@@ -0,0 +1,24 @@
+"""
+Leaderboard row formatting shared by the API and the static snapshot publisher.
+"""
+
+def format_time(seconds: float) -> str:
+    """Format seconds to HH:MM:SS"""
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    secs = int(seconds % 60)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+
+def to_row(team: dict, rank_field: str) -> dict:
+    """
+    Build a leaderboard row as a plain dict, with the same keys, order and types as LeaderboardEntry.
+    Rows are serialized directly (see utils.fast_json) instead of going through the pydantic model.
+    """
+    stages_unlocked = team.get("stages_unlocked", team.get("current_stage", 0))
+    return {
+        "rank": "T" if team[rank_field] == 999 else str(team[rank_field]),
+        "team_name": team["team_name"],
+        "region": team["region"],
+        "stages_unlocked": stages_unlocked,
+        "total_time": "-" if stages_unlocked == 0 else format_time(team["total_time"])
+    }
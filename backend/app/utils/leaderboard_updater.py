@@ -1,96 +1,143 @@
 from datetime import datetime
-from typing import Any
+from typing import Any, Dict, Iterable, List, Tuple
+from pymongo import UpdateOne
+from utils.leaderboard_changes import change_log
+from utils.leaderboard_partitions import partitions, rank_key, UNRANKED
 
-async def update_leaderboard(db: Any, team_id: str, team_name: str, region: str, stages_unlocked: int, total_time: float):
+# Team fields the leaderboard mirrors; a team write that touches none of them never re-ranks
+TEAM_PROJECTION = {"team_name": 1, "region": 1, "stages_unlocked": 1, "current_stage": 1, "total_time": 1}
+MIRRORED_FIELDS = ("team_name", "region", "stages_unlocked", "total_time")
+ENTRY_PROJECTION = {"_id": 0, "team_id": 1, "team_name": 1, "region": 1, "stages_unlocked": 1, "total_time": 1}
+
+
+def entry_from_team(team: dict) -> dict:
+    """Build the leaderboard fields of a team from its team document"""
+    return {
+        "team_id": str(team["_id"]),
+        "team_name": team["team_name"],
+        "region": team["region"],
+        "stages_unlocked": team.get("stages_unlocked", team.get("current_stage", 0)),
+        "total_time": team.get("total_time", 0.0)
+    }
+
+
+async def sync_teams_to_leaderboard(db: Any, teams: List[dict], removed_ids: Iterable[Any] = ()) -> int:
     """
-    Updates leaderboard collection with both global and regional ranks.
-    Called after each successful stage completion (stages 1-4 only).
+    Bring the leaderboard entries of `teams` in line with their team documents,
+    drop the entries of removed teams, and re-rank once for the whole batch.
+    Re-ranking goes through the in-memory partitions (see leaderboard_partitions): only the
+    positions a change can shift are rewritten, in their region and in the merged global order.
+    Every team is placed in the partitions, but only entries whose mirrored fields differ from the
+    stored row are written; if neither the rows nor this process's order changed, nothing is re-ranked.
+    Every row whose rank moved is recorded in the change log as one new version, which is returned.
     """
     now = datetime.utcnow()
+    entries = [entry_from_team(team) for team in teams]
+    removed_ids = [str(team_id) for team_id in removed_ids]
+
+    if not partitions.loaded:
+        partitions.load(await db.leaderboard.find({}, ENTRY_PROJECTION).to_list(None))
+
+    ids = [entry["team_id"] for entry in entries] + removed_ids
+    existing = {
+        doc["team_id"]: doc
+        for doc in await db.leaderboard.find({"team_id": {"$in": ids}}).to_list(None)
+    }
+
+    # 1. Move the teams in the partitions, and upsert entries whose mirrored fields changed.
+    # The partitions are checked against their own placement, not the stored row: another worker
+    # may already have written the row while this process's order still has the team's old place.
+    writes = []
+    touched = []
+    spans = {}
+    for entry in entries:
+        moved = partitions.place(entry, spans)
+        old = existing.get(entry["team_id"])
+        if old and all(old.get(field) == entry[field] for field in MIRRORED_FIELDS):
+            if moved:
+                touched.append(entry)
+            continue
+
+        fields = {**entry, "last_updated": now}
+        if rank_key(entry) is None:
+            fields.update(global_rank=UNRANKED, regional_rank=UNRANKED)
+        writes.append(UpdateOne({"team_id": entry["team_id"]}, {"$set": fields}, upsert=True))
+        touched.append(entry)
+
+    if writes:
+        await db.leaderboard.bulk_write(writes, ordered=False)
+
+    # 2. Remove entries of deleted teams
+    removed = [team_id for team_id in removed_ids if team_id in existing]
+    if removed:
+        await db.leaderboard.delete_many({"team_id": {"$in": removed}})
+    for team_id in removed_ids:
+        partitions.remove_team(team_id, spans)
 
-    # 1. Upsert team entry in leaderboard
-    await db.leaderboard.update_one(
-        {"team_id": team_id},
-        {"$set": {
-            "team_name": team_name,
-            "region": region,
-            "stages_unlocked": stages_unlocked,
-            "total_time": total_time,
-            "last_updated": now
-        }},
-        upsert=True
-    )
+    if not touched and not removed and not spans:
+        return change_log.version
 
-    # 2. Recalculate global ranks (all teams)
-    await recalculate_global_ranks(db)
+    # 3. Re-rank the shifted positions of each touched board, in one bulk write
+    rank_writes = []
+    changed = {"global": {entry["team_name"] for entry in touched}}
+    for board, span in spans.items():
+        rank_field = "global_rank" if board == "global" else "regional_rank"
+        names = changed.setdefault(board, set())
+        for team_name, rank in partitions.names_in(board, span):
+            rank_writes.append(UpdateOne({"team_name": team_name}, {"$set": {rank_field: rank}}))
+            names.add(team_name)
+    for entry in touched:
+        changed.setdefault(entry["region"], set()).add(entry["team_name"])
 
-    # 3. Recalculate regional ranks (just this region)
-    await recalculate_regional_ranks(db, region)
+    if rank_writes:
+        await db.leaderboard.bulk_write(rank_writes, ordered=False)
 
+    return change_log.record(changed)
 
-async def recalculate_global_ranks(db: Any):
+
+async def rebuild_leaderboard(db: Any) -> int:
     """
-    Recalculates global ranks based on stages_unlocked (desc) and total_time (asc).
-    Teams with 0 stages get rank 999 and are sorted alphabetically.
+    Rebuild the whole leaderboard from the teams collection (including teams with 0 stages).
+    Ranks are computed in one pass in memory; only entries that differ are written,
+    and entries of teams that no longer exist are removed.
+    Returns the number of teams on the leaderboard.
     """
-    # Get teams with progress
-    teams_with_progress = await db.leaderboard.find({"stages_unlocked": {"$gt": 0}}).sort([
-        ("stages_unlocked", -1),
-        ("total_time", 1)
-    ]).to_list(None)
-
-    # Get teams with no progress
-    teams_no_progress = await db.leaderboard.find({"stages_unlocked": 0}).sort([
-        ("team_name", 1)
-    ]).to_list(None)
-
-    # Rank teams with progress
-    for rank, team in enumerate(teams_with_progress, start=1):
-        await db.leaderboard.update_one(
-            {"_id": team["_id"]},
-            {"$set": {"global_rank": rank}}
-        )
-
-    # Teams with no progress get rank 999
-    for team in teams_no_progress:
-        await db.leaderboard.update_one(
-            {"_id": team["_id"]},
-            {"$set": {"global_rank": 999}}
-        )
-
-
-async def recalculate_regional_ranks(db: Any, region: str):
+    now = datetime.utcnow()
+    teams = await db.teams.find({}, TEAM_PROJECTION).to_list(None)
+    entries = [entry_from_team(team) for team in teams]
+    ranks = assign_ranks(entries)
+
+    existing = {doc["team_id"]: doc for doc in await db.leaderboard.find().to_list(None)}
+
+    writes = []
+    for entry in entries:
+        entry["global_rank"], entry["regional_rank"] = ranks[entry["team_name"]]
+        old = existing.get(entry["team_id"])
+        if old and all(old.get(field) == value for field, value in entry.items()):
+            continue
+        writes.append(UpdateOne(
+            {"team_id": entry["team_id"]},
+            {"$set": {**entry, "last_updated": now}},
+            upsert=True
+        ))
+
+    if writes:
+        await db.leaderboard.bulk_write(writes, ordered=False)
+
+    orphans = set(existing) - {entry["team_id"] for entry in entries}
+    if orphans:
+        await db.leaderboard.delete_many({"team_id": {"$in": list(orphans)}})
+
+    # Deltas from before the rebuild no longer line up; pollers take a fresh snapshot
+    change_log.reset()
+    return len(entries)
+
+
+def assign_ranks(entries: List[dict]) -> Dict[str, Tuple[int, int]]:
     """
-    Recalculates regional ranks for a specific region.
-    Teams with 0 stages get rank 999 and are sorted alphabetically.
+    Compute (global_rank, regional_rank) for every entry: stages_unlocked (desc), total_time (asc);
+    teams with 0 stages get rank 999. Reloads the partitions from `entries` (one sort per region),
+    so incremental syncs continue from this order. Returns {team_name: (global_rank, regional_rank)}.
     """
-    # Get teams with progress in this region
-    teams_with_progress = await db.leaderboard.find({
-        "region": region,
-        "stages_unlocked": {"$gt": 0}
-    }).sort([
-        ("stages_unlocked", -1),
-        ("total_time", 1)
-    ]).to_list(None)
-
-    # Get teams with no progress in this region
-    teams_no_progress = await db.leaderboard.find({
-        "region": region,
-        "stages_unlocked": 0
-    }).sort([
-        ("team_name", 1)
-    ]).to_list(None)
-
-    # Rank teams with progress
-    for rank, team in enumerate(teams_with_progress, start=1):
-        await db.leaderboard.update_one(
-            {"_id": team["_id"]},
-            {"$set": {"regional_rank": rank}}
-        )
-
-    # Teams with no progress get rank 999
-    for team in teams_no_progress:
-        await db.leaderboard.update_one(
-            {"_id": team["_id"]},
-            {"$set": {"regional_rank": 999}}
-        )
+    partitions.load(entries)
+    return partitions.ranks()
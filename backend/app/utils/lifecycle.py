@@ -0,0 +1,191 @@
+"""
+Process lifecycle: readiness, graceful draining and flushing on shutdown.
+
+States: starting -> ready -> draining -> stopped.
+
+On SIGTERM/SIGINT the process is marked draining right away (readiness starts
+failing and new requests get 503), then the server's own graceful shutdown runs.
+During shutdown, drain() waits for in-flight requests, stops background tasks and
+runs the registered flushers (leaderboard, analytics, ...) within a deadline, so a
+rolling restart doesn't lose buffered work. Only then is the Mongo client closed.
+
+Startup is timed per phase (import, connect, ...), and expensive warmups run as
+tracked background tasks after the process is already serving; both are reported
+by the health endpoints. Warmups marked required hold readiness back until done.
+"""
+import asyncio
+import signal
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from utils.fast_json import dumps
+
+
+class Lifecycle:
+    def __init__(self):
+        self.state = "starting"
+        self.started_at = time.time()
+        self.in_flight = 0
+        self._idle: Optional[asyncio.Event] = None
+        self._flushers: List[Tuple[str, Callable[[], Awaitable]]] = []
+        self._tasks: List[asyncio.Task] = []
+        self.timings: Dict[str, float] = {}  # Startup phase -> seconds
+        self.warmups: Dict[str, dict] = {}  # Warmup name -> {"status", "required", "seconds"}
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready" and not any(
+            warmup["required"] and warmup["status"] != "done" for warmup in self.warmups.values()
+        )
+
+    @property
+    def draining(self) -> bool:
+        return self.state in ("draining", "stopped")
+
+    def mark_ready(self):
+        if self.state == "starting":
+            self.state = "ready"
+
+    def begin_draining(self, reason: str = "shutdown"):
+        if not self.draining:
+            print(f"Draining ({reason}): no longer admitting requests")
+            self.state = "draining"
+
+    def record_phase(self, name: str, seconds: float):
+        self.timings[name] = round(seconds, 4)
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a startup phase"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_phase(name, time.perf_counter() - started)
+
+    def start_warmup(self, name: str, warmup: Awaitable, required: bool = False) -> asyncio.Task:
+        """Run a warmup in the background, tracking its status and duration"""
+        self.warmups[name] = {"status": "running", "required": required, "seconds": None}
+        started = time.perf_counter()
+
+        async def run():
+            try:
+                await warmup
+                self.warmups[name]["status"] = "done"
+            except asyncio.CancelledError:
+                self.warmups[name]["status"] = "cancelled"
+                raise
+            except Exception as e:
+                self.warmups[name]["status"] = f"failed: {e!r}"
+                print(f"Warmup {name} failed: {e!r}")
+            finally:
+                self.warmups[name]["seconds"] = round(time.perf_counter() - started, 3)
+
+        return self.register_task(asyncio.create_task(run()))
+
+    def register_flush(self, name: str, flush: Callable[[], Awaitable]):
+        """Register work to run (in registration order) once requests have drained"""
+        self._flushers.append((name, flush))
+
+    def register_task(self, task: asyncio.Task) -> asyncio.Task:
+        """Register a background task to cancel before flushing"""
+        self._tasks.append(task)
+        return task
+
+    def request_started(self):
+        self.in_flight += 1
+        if self._idle is not None:
+            self._idle.clear()
+
+    def request_finished(self):
+        self.in_flight -= 1
+        if self.in_flight == 0 and self._idle is not None:
+            self._idle.set()
+
+    def install_signal_handlers(self):
+        """
+        Mark the process draining as soon as SIGTERM/SIGINT arrives, then hand the signal
+        to the handler it had before. Uvicorn watches these signals with loop.add_signal_handler,
+        which is fed by the signal wakeup fd and so keeps working alongside this handler;
+        a handler installed with signal.signal (uvicorn's fallback) is the one called here.
+        """
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            previous = signal.getsignal(sig)
+
+            def handler(signum, frame, previous=previous):
+                self.begin_draining(f"received {signal.Signals(signum).name}")
+                if callable(previous):
+                    previous(signum, frame)
+                elif previous == signal.SIG_DFL:
+                    signal.signal(signum, signal.SIG_DFL)
+                    signal.raise_signal(signum)
+
+            try:
+                signal.signal(sig, handler)
+            except ValueError:
+                pass  # Not the main thread: signals are left to the server
+
+    async def drain(self, deadline: float = 20.0):
+        """Wait for in-flight requests, stop background tasks and run flushers, all within `deadline` seconds"""
+        self.begin_draining()
+        end = time.monotonic() + deadline
+
+        # 1. Let in-flight handlers finish
+        if self.in_flight:
+            self._idle = asyncio.Event()
+            try:
+                await asyncio.wait_for(self._idle.wait(), max(end - time.monotonic(), 0))
+            except asyncio.TimeoutError:
+                print(f"Drain deadline reached with {self.in_flight} requests still in flight")
+
+        # 2. Stop background tasks
+        for task in self._tasks:
+            task.cancel()
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=max(end - time.monotonic(), 0.1))
+
+        # 3. Flush buffered work to MongoDB
+        for name, flush in self._flushers:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                print(f"Drain deadline reached, skipped flushing {name}")
+                continue
+            try:
+                await asyncio.wait_for(flush(), remaining)
+            except Exception as e:
+                print(f"Failed to flush {name} during shutdown: {e!r}")
+
+        self.state = "stopped"
+
+
+class LifecycleMiddleware:
+    """Counts in-flight requests and turns new ones away with 503 while draining (health checks excepted)"""
+
+    def __init__(self, app, manager: Lifecycle):
+        self.app = app
+        self.manager = manager
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith("/health"):
+            return await self.app(scope, receive, send)
+
+        if self.manager.draining:
+            body = dumps({"detail": "Server is shutting down, please retry"})
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("ascii")),
+                    (b"retry-after", b"1"),
+                    (b"connection", b"close"),
+                ]
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        self.manager.request_started()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.manager.request_finished()
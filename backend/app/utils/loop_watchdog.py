@@ -0,0 +1,185 @@
+"""
+Event-loop lag watchdog.
+
+A heartbeat task wakes up every `interval` seconds and records how late it was
+(the loop lag). A separate thread watches the heartbeat: when the loop has not
+beaten for longer than `threshold`, something is running synchronously on it, and
+the thread captures that code's stack (sys._current_frames) together with the
+request whose handler was running at the time.
+
+Lag percentiles and the captured stalls are exported by GET /admin/loop. In strict
+mode (HACKATHON_LOOP_WATCHDOG_STRICT=1, meant for CI) a request whose handler
+blocked the loop gets a 500 instead of its response, so tests fail loudly.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Dict, List, Optional
+from utils.fast_json import dumps
+
+# Task currently running on each loop; read from the watcher thread (a plain dict lookup)
+_current_tasks = getattr(asyncio.tasks, "_current_tasks", {})
+
+
+def _percentile(ordered: List[float], q: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return round(ordered[min(int(q * len(ordered)), len(ordered) - 1)], 2)
+
+
+class LoopWatchdog:
+    def __init__(self, threshold: float = 0.1, interval: float = 0.05, window: int = 6000, strict: bool = False):
+        self.threshold = threshold
+        self.interval = interval
+        self.strict = strict
+        self.lag_ms = deque(maxlen=window)  # Recent heartbeat lags (window * interval seconds)
+        self.stalls = deque(maxlen=50)  # Most recent captured stalls
+        self.stall_count = 0
+        self.requests: Dict[asyncio.Task, str] = {}  # In-flight request tasks -> "METHOD path"
+        self.blocked_tasks = set()  # Request tasks caught blocking the loop
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = time.monotonic()
+        self._stall: Optional[dict] = None  # Stall in progress, completed by the next heartbeat
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @classmethod
+    def from_env(cls) -> "LoopWatchdog":
+        return cls(
+            threshold=float(os.environ.get("HACKATHON_LOOP_WATCHDOG_THRESHOLD_MS", "100")) / 1000,
+            strict=os.environ.get("HACKATHON_LOOP_WATCHDOG_STRICT", "").lower() in ("1", "true", "yes")
+        )
+
+    def start(self) -> asyncio.Task:
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        self._task = asyncio.create_task(self._heartbeat())
+        return self._task
+
+    def stop(self):
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+
+    async def _heartbeat(self):
+        try:
+            while True:
+                started = time.monotonic()
+                await asyncio.sleep(self.interval)
+                now = time.monotonic()
+                self.lag_ms.append((now - started - self.interval) * 1000)
+                self._last_beat = now
+
+                stall = self._stall
+                if stall is not None:
+                    stall["duration_ms"] = round((now - stall["_started"]) * 1000, 1)
+                    self._stall = None
+        finally:
+            self._stopped.set()
+
+    def _watch(self):
+        """Watcher thread: capture the loop thread's stack once per stall"""
+        while not self._stopped.wait(self.interval / 2):
+            since_beat = time.monotonic() - self._last_beat
+            if since_beat - self.interval < self.threshold or self._stall is not None:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = traceback.format_stack(frame) if frame is not None else []
+            # The task running on the loop right now is the one blocking it
+            task = _current_tasks.get(self._loop)
+            request = self.requests.get(task)
+            if request is not None:
+                self.blocked_tasks.add(task)
+
+            stall = {
+                "at": time.time(),
+                "_started": self._last_beat + self.interval,
+                "duration_ms": None,  # Filled in when the loop beats again
+                "request": request,
+                "stack": [line.rstrip() for line in stack[-12:]],
+            }
+            self._stall = stall
+            self.stalls.append(stall)
+            self.stall_count += 1
+            print(f"Event loop blocked for over {self.threshold * 1000:.0f} ms"
+                  f"{f' by {request}' if request else ''}:\n{''.join(stack[-6:])}")
+
+    def stats(self) -> dict:
+        ordered = sorted(self.lag_ms)
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "strict": self.strict,
+            "lag_ms": {
+                "samples": len(ordered),
+                "p50": _percentile(ordered, 0.5),
+                "p90": _percentile(ordered, 0.9),
+                "p99": _percentile(ordered, 0.99),
+                "max": round(ordered[-1], 2) if ordered else None
+            },
+            "stall_count": self.stall_count,
+            "recent_stalls": [
+                {key: value for key, value in stall.items() if not key.startswith("_")}
+                for stall in reversed(self.stalls)
+            ]
+        }
+
+    def assert_no_blocking(self):
+        """For tests: raise AssertionError describing every captured stall"""
+        if self.stall_count:
+            details = "\n\n".join(
+                f"{stall['request'] or 'background task'} ({stall['duration_ms']} ms):\n" + "\n".join(stall["stack"])
+                for stall in self.stalls
+            )
+            raise AssertionError(f"Event loop was blocked {self.stall_count} time(s):\n{details}")
+
+
+class LoopWatchdogMiddleware:
+    """Attributes stalls to requests; in strict mode, fails requests whose handler blocked the loop"""
+
+    def __init__(self, app, monitor: LoopWatchdog):
+        self.app = app
+        self.monitor = monitor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        task = asyncio.current_task()
+        self.monitor.requests[task] = f"{scope['method']} {scope['path']}"
+        replaced = False
+
+        async def checked_send(message):
+            nonlocal replaced
+            if replaced:
+                return
+            if message["type"] == "http.response.start" and self.monitor.strict and task in self.monitor.blocked_tasks:
+                replaced = True
+                body = dumps({"detail": "Request handler blocked the event loop (loop watchdog strict mode)"})
+                await send({
+                    "type": "http.response.start",
+                    "status": 500,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"content-length", str(len(body)).encode("ascii")),
+                    ]
+                })
+                await send({"type": "http.response.body", "body": body})
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, receive, checked_send)
+        finally:
+            self.monitor.requests.pop(task, None)
+            self.monitor.blocked_tasks.discard(task)
@@ -0,0 +1,227 @@
+"""
+Regional opening scheduler: prepares for the login surge at each regional start time.
+
+At a region's start time (challenges config, `regional_start_times`) every team of
+the region logs in, starts its timer and downloads the stage 1 materials within the
+same minute. The scheduler reads the upcoming openings from the config (re-read
+periodically, so edits are picked up) and for each one:
+
+  - `lead` seconds before: raises the admission limits of the auth, validation and
+    pages route classes (until `surge` seconds after the opening), opens connections
+    in the MongoDB pool and pre-renders the gated pages (the app's prerender hooks);
+  - `cache_lead` seconds before (within the team cache TTL): loads the region's
+    teams into the team cache, so logins do not each read their team document;
+  - at the start time: tells the region's waiting clients, connected to the push
+    channel (GET /teams/opening/stream, server-sent events) instead of refreshing
+    /teams/login, that the region is open (a `region_open` event). Each client is released after its own
+    random delay (up to `jitter` seconds), spreading the logins out.
+"""
+import asyncio
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Sequence, Set, Tuple
+from pymongo.errors import PyMongoError
+from utils.admission import AdmissionControl
+from utils.events import EventScoped
+from utils.team_cache import team_cache, TEAM_PROJECTION
+
+KEEPALIVE = 15.0  # Seconds between keepalive comments on an idle push stream
+
+PrerenderHook = Tuple[str, Callable[[], Awaitable]]  # (name, hook) run ahead of each opening, e.g. pre-rendering the app's pages
+
+
+# Name of the event telling a client its region has opened. Not "open": EventSource fires its own
+# "open" event when the connection is established.
+REGION_OPEN = "region_open"
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _parse_start(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+class OpeningScheduler:
+    def __init__(self, lead: float = 120.0, cache_lead: float = 10.0, surge: float = 300.0,
+                 surge_factor: float = 2.0, jitter: float = 30.0, pool_warm: int = 20, refresh_interval: float = 60.0,
+                 prerender: Sequence[PrerenderHook] = (), admission: Optional[AdmissionControl] = None):
+        self.lead = lead
+        self.cache_lead = cache_lead
+        self.surge = surge
+        self.surge_factor = surge_factor
+        self.jitter = jitter
+        self.pool_warm = pool_warm
+        self.refresh_interval = refresh_interval
+        self.prerender = list(prerender)
+        self.admission = admission  # The app's admission control, expanded during surges
+        self.openings: Dict[Tuple[str, datetime], str] = {}  # (region, start) -> phase
+        self._tasks: Dict[Tuple[str, datetime], asyncio.Task] = {}
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self.released = 0
+
+    @classmethod
+    def from_env(cls, prerender: Sequence[PrerenderHook] = (), admission: Optional[AdmissionControl] = None) -> "OpeningScheduler":
+        return cls(
+            lead=float(os.environ.get("HACKATHON_OPENING_LEAD", "120")),
+            surge=float(os.environ.get("HACKATHON_OPENING_SURGE", "300")),
+            surge_factor=float(os.environ.get("HACKATHON_OPENING_SURGE_FACTOR", "2")),
+            jitter=float(os.environ.get("HACKATHON_OPENING_JITTER", "30")),
+            prerender=prerender,
+            admission=admission
+        )
+
+    # --- Schedule ---
+
+    async def run(self, db: Any):
+        """Background task: keep one preparation task per upcoming (or just started) opening"""
+        try:
+            while True:
+                try:
+                    await self.refresh(db)
+                except PyMongoError as e:
+                    print(f"Opening scheduler: could not read regional start times: {e}")
+                await asyncio.sleep(self.refresh_interval)
+        finally:
+            for task in self._tasks.values():
+                task.cancel()
+
+    async def refresh(self, db: Any):
+        config = await db.challenges.find_one({"regional_start_times": {"$exists": True}})
+        now = datetime.now(timezone.utc)
+        upcoming = set()
+        for region, value in ((config or {}).get("regional_start_times") or {}).items():
+            start = _parse_start(value)
+            if start + timedelta(seconds=self.surge) > now:
+                upcoming.add((region, start))
+
+        # Openings that were moved or removed from the config
+        for key in [key for key in self._tasks if key not in upcoming]:
+            self._tasks.pop(key).cancel()
+            self.openings.pop(key, None)
+        for key in upcoming - set(self._tasks):
+            self.openings[key] = "scheduled"
+            self._tasks[key] = asyncio.create_task(self._prepare(db, *key))
+
+    async def _sleep_until(self, when: datetime):
+        delay = (when - datetime.now(timezone.utc)).total_seconds()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _prepare(self, db: Any, region: str, start: datetime):
+        key = (region, start)
+        await self._sleep_until(start - timedelta(seconds=self.lead))
+        if self.admission is not None:
+            self.admission.expand(self.surge_factor)
+        try:
+            self.openings[key] = "warming"
+            await self.warm(db)
+            await self._sleep_until(start - timedelta(seconds=self.cache_lead))
+            await self.warm_team_cache(db, region)
+
+            await self._sleep_until(start)
+            self.openings[key] = "open"
+            self.release(region)
+
+            await self._sleep_until(start + timedelta(seconds=self.surge))
+            self.openings[key] = "done"
+        finally:
+            if self.admission is not None:
+                self.admission.restore()
+
+    # --- Warmups ---
+
+    async def warm(self, db: Any):
+        """Open connections in the MongoDB pool (concurrent pings each need one) and run the prerender hooks"""
+        try:
+            await asyncio.gather(*(db.command("ping") for _ in range(self.pool_warm)))
+        except PyMongoError as e:
+            print(f"Opening scheduler: connection pool warmup failed: {e}")
+        for name, hook in self.prerender:
+            try:
+                await hook()
+            except Exception as e:
+                print(f"Opening scheduler: prerender '{name}' failed: {e!r}")
+
+    async def warm_team_cache(self, db: Any, region: str):
+        """Load the region's teams into the team cache (up to its capacity)"""
+        try:
+            cursor = db.teams.find({"region": region}, TEAM_PROJECTION).limit(team_cache.max_entries)
+            async for doc in cursor:
+                team_cache.put(doc)
+        except PyMongoError as e:
+            print(f"Opening scheduler: team cache warmup for {region} failed: {e}")
+
+    # --- Push channel ---
+
+    def release(self, region: str):
+        """Tell the region's waiting clients that it is open, each after a random delay up to `jitter`"""
+        loop = asyncio.get_running_loop()
+        message = _sse(REGION_OPEN, {"region": region})
+        for queue in self._subscribers.get(region, ()):
+            loop.call_later(random.uniform(0, self.jitter), queue.put_nowait, message)
+            self.released += 1
+
+    async def stream(self, region: str, start_time: Optional[datetime],
+                     draining: Callable[[], bool] = lambda: False) -> AsyncIterator[str]:
+        """
+        Server-sent events for a client waiting for `region` to open: `scheduled` right away,
+        then `region_open` (jittered, see release). Ends when the server starts draining; EventSource reconnects.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(region, set()).add(queue)
+        try:
+            yield _sse("scheduled", {"region": region, "start_time": start_time.isoformat() if start_time else None})
+
+            now = datetime.now(timezone.utc)
+            if start_time is None or start_time <= now:
+                # Already open: still spread out clients arriving during the surge
+                in_surge = start_time is not None and (now - start_time).total_seconds() < self.surge
+                if in_surge:
+                    await asyncio.sleep(random.uniform(0, self.jitter))
+                yield _sse(REGION_OPEN, {"region": region})
+                return
+
+            # This client's own release time, used if the scheduler's release never reaches it
+            # (opening added after the last config refresh): jittered like release()
+            fallback_at = start_time + timedelta(seconds=random.uniform(0, self.jitter))
+            while not draining():
+                now = datetime.now(timezone.utc)
+                if now >= fallback_at and not self._release_in_progress(region, start_time, now):
+                    yield _sse(REGION_OPEN, {"region": region})
+                    return
+                timeout = min(KEEPALIVE, (fallback_at - now).total_seconds()) if now < fallback_at else KEEPALIVE
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield message
+                return
+        finally:
+            self._subscribers[region].discard(queue)
+
+    def _release_in_progress(self, region: str, start: datetime, now: datetime) -> bool:
+        """Whether release() ran for this opening and its jittered messages may still be on their way"""
+        return (self.openings.get((region, start)) in ("open", "done")
+                and (now - start).total_seconds() < self.jitter + 1)
+
+    def stats(self) -> dict:
+        return {
+            "openings": [
+                {"region": region, "start_time": start.isoformat(), "phase": phase}
+                for (region, start), phase in sorted(self.openings.items(), key=lambda item: item[0][1])
+            ],
+            "waiting_clients": {region: len(queues) for region, queues in self._subscribers.items()},
+            "released": self.released,
+            "lead_seconds": self.lead,
+            "surge_seconds": self.surge,
+            "surge_factor": self.surge_factor,
+            "jitter_seconds": self.jitter
+        }
+
+
+opening_scheduler = EventScoped("opening_scheduler")  # The current event's OpeningScheduler
@@ -0,0 +1,133 @@
+"""
+Streaming exports of team results for judges.
+Rows come straight off a MongoDB aggregation cursor and are written out in
+small chunks, so memory use stays flat however many teams there are.
+"""
+import csv
+import io
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+from utils.fast_json import dumps
+
+# Exportable fields, in column order. stage_times expands to one column per stage.
+EXPORT_FIELDS = [
+    "team_name",
+    "region",
+    "global_rank",
+    "regional_rank",
+    "stages_unlocked",
+    "total_time",
+    "stage_times",
+    "created_at",
+    "timer_started_at",
+    "last_submission_url",
+    "bitbucket_url",
+]
+STAGES = [f"stage_{n}" for n in range(1, 6)]
+
+CHUNK_SIZE = 64 * 1024  # Bytes buffered before handing a chunk to the response
+CURSOR_BATCH_SIZE = 500
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Parse a comma-separated field list (None means every field). Raises ValueError on unknown fields."""
+    if not fields:
+        return list(EXPORT_FIELDS)
+
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in EXPORT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields {unknown}; choose from {EXPORT_FIELDS}")
+
+    # Keep the canonical column order
+    return [field for field in EXPORT_FIELDS if field in requested]
+
+
+def columns_for(fields: List[str]) -> List[str]:
+    """Flat column names for the selected fields"""
+    columns = []
+    for field in fields:
+        if field == "stage_times":
+            columns += [f"{stage}_time" for stage in STAGES]
+        else:
+            columns.append(field)
+    return columns
+
+
+def build_pipeline(fields: List[str], region: Optional[str] = None, min_stage: Optional[int] = None) -> List[dict]:
+    """Aggregation over teams, joined with the leaderboard for ranks, projected to the selected fields"""
+    match: Dict[str, Any] = {}
+    if region:
+        match["region"] = region
+    if min_stage is not None:
+        match["stages_unlocked"] = {"$gte": min_stage}
+
+    pipeline = [{"$match": match}, {"$sort": {"team_name": 1}}]
+
+    if "global_rank" in fields or "regional_rank" in fields:
+        pipeline += [
+            {"$lookup": {
+                "from": "leaderboard",
+                "localField": "team_name",
+                "foreignField": "team_name",
+                "as": "ranking"
+            }},
+            {"$addFields": {
+                "global_rank": {"$arrayElemAt": ["$ranking.global_rank", 0]},
+                "regional_rank": {"$arrayElemAt": ["$ranking.regional_rank", 0]}
+            }}
+        ]
+
+    pipeline.append({"$project": {"_id": 0, **{field: 1 for field in fields}}})
+    return pipeline
+
+
+def _value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat() + "Z"
+    return value
+
+
+def flatten(doc: dict, fields: List[str]) -> Dict[str, Any]:
+    """Turn an aggregation result into a flat row keyed by columns_for(fields)"""
+    row = {}
+    for field in fields:
+        if field == "stage_times":
+            stage_times = doc.get("stage_times") or {}
+            for stage in STAGES:
+                row[f"{stage}_time"] = stage_times.get(stage)
+        else:
+            row[field] = _value(doc.get(field))
+    return row
+
+
+async def iter_csv(cursor: Any, fields: List[str]) -> AsyncIterator[bytes]:
+    """Yield CSV (header row first) in chunks of about CHUNK_SIZE bytes"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns_for(fields), extrasaction="ignore")
+    writer.writeheader()
+
+    async for doc in cursor:
+        writer.writerow(flatten(doc, fields))
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def iter_ndjson(cursor: Any, fields: List[str]) -> AsyncIterator[bytes]:
+    """Yield one JSON object per line, in chunks of about CHUNK_SIZE bytes"""
+    chunk = bytearray()
+
+    async for doc in cursor:
+        chunk += dumps(flatten(doc, fields))
+        chunk += b"\n"
+        if len(chunk) >= CHUNK_SIZE:
+            yield bytes(chunk)
+            chunk.clear()
+
+    if chunk:
+        yield bytes(chunk)
@@ -0,0 +1,73 @@
+"""
+Signed, expiring URLs for stage assets (PDFs under /pdfs, datasets under /data).
+
+A URL is issued when a team gets access to an asset (login, stage unlock) and carries
+its expiry time and an HMAC of the path and expiry:
+
+    /pdfs/stage2.pdf?expires=1760000000&sig=<base64url(HMAC-SHA256(secret, "/pdfs/stage2.pdf\\n1760000000"))>
+
+Checking one is pure CPU work with the shared secret, no database lookup, so the
+asset mounts (SignedStaticFiles) or any external static server / CDN edge function
+holding HACKATHON_ASSET_SECRET can serve assets independently of the API.
+
+Signing is enabled by setting HACKATHON_ASSET_SECRET (the same value on every worker
+and static server). While it is unset, asset URLs are issued unsigned and the mounts
+stay public, as before.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import time
+from typing import Optional
+from urllib.parse import parse_qs
+from fastapi.responses import PlainTextResponse
+from fastapi.staticfiles import StaticFiles
+
+ASSET_URL_TTL = int(os.environ.get("HACKATHON_ASSET_URL_TTL", str(6 * 3600)))  # Seconds a link stays valid
+
+
+def _secret() -> Optional[bytes]:
+    secret = os.environ.get("HACKATHON_ASSET_SECRET")
+    return secret.encode("utf-8") if secret else None
+
+
+def _signature(secret: bytes, path: str, expires: int) -> str:
+    digest = hmac.new(secret, f"{path}\n{expires}".encode("utf-8"), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+
+def sign_url(path: str, ttl: int = ASSET_URL_TTL, now: Optional[float] = None) -> str:
+    """URL of an asset path (e.g. "/pdfs/stage2.pdf") valid for `ttl` seconds; the plain path if signing is off"""
+    secret = _secret()
+    if secret is None:
+        return path
+    expires = int(now if now is not None else time.time()) + ttl
+    return f"{path}?expires={expires}&sig={_signature(secret, path, expires)}"
+
+
+def verify_url(path: str, expires: Optional[str], sig: Optional[str], now: Optional[float] = None) -> bool:
+    """Whether a signed URL's expiry and signature are valid for `path` (always true while signing is off)"""
+    secret = _secret()
+    if secret is None:
+        return True
+    if not expires or not sig or not expires.isdigit():
+        return False
+    if int(expires) < (now if now is not None else time.time()):
+        return False
+    return hmac.compare_digest(sig.encode("ascii", "replace"), _signature(secret, path, int(expires)).encode("ascii"))
+
+
+class SignedStaticFiles(StaticFiles):
+    """StaticFiles mounted at `prefix` that only serves requests carrying a valid signature (see sign_url)"""
+
+    def __init__(self, *, prefix: str, **kwargs):
+        super().__init__(**kwargs)
+        self.prefix = prefix.rstrip("/")
+
+    async def get_response(self, path: str, scope):
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        signed_path = f"{self.prefix}/{path.replace(os.sep, '/')}"
+        if not verify_url(signed_path, query.get("expires", [None])[0], query.get("sig", [None])[0]):
+            return PlainTextResponse("Link invalid or expired, log in again for a new one", status_code=403)
+        return await super().get_response(path, scope)
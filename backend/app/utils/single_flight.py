@@ -0,0 +1,84 @@
+"""
+Single-flight coalescing of identical concurrent reads.
+
+When many requests need the same data at the same moment (a cold leaderboard after a
+restart, every team of a region hitting the challenge config the second it opens),
+only the first one queries MongoDB; the others await the same in-flight call and get
+its result, or its exception. Nothing is cached: once the call finishes, the next
+request for the key starts a new one.
+
+Each call runs under a timeout (per key, falling back to the group default). A call
+that times out fails every request waiting on it with SharedReadTimeout (an
+asyncio.TimeoutError) and frees the key; the app answers it with a 503 and Retry-After
+(see read_timeout_response), so a slow MongoDB sheds requests instead of failing them with 500. A request that goes away (client disconnect) stops waiting without cancelling
+the shared call the others are waiting on.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+from utils.events import EventScoped
+from utils.fast_json import json_response
+
+T = TypeVar("T")
+
+
+class SharedReadTimeout(asyncio.TimeoutError):
+    """A single-flight call did not finish within its timeout"""
+
+
+async def read_timeout_response(request, exc: SharedReadTimeout):
+    """Exception handler: 503 with Retry-After for a shared read that timed out"""
+    return json_response({"detail": "Service temporarily unavailable, please retry"}, {"Retry-After": "1"}, 503)
+
+
+class SingleFlight:
+    def __init__(self, timeout: float = 5.0):
+        self.timeout = timeout
+        self.calls = 0  # Calls actually made
+        self.shared = 0  # Requests served by another request's call
+        self.errors = 0
+        self.timeouts = 0
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]], timeout: Optional[float] = None) -> T:
+        """Result of `call()`, shared with every concurrent request for the same key"""
+        task = self._in_flight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(self._run(call, timeout or self.timeout))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            self.shared += 1
+        # Shielded: a waiter going away must not cancel the call for the others
+        return await asyncio.shield(task)
+
+    async def _run(self, call: Callable[[], Awaitable[T]], timeout: float) -> T:
+        try:
+            return await asyncio.wait_for(call(), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise SharedReadTimeout(f"shared read timed out after {timeout}s") from None
+        except Exception:
+            self.errors += 1
+            raise
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            task.exception()  # Retrieved here so a call nobody waits on anymore is not reported as unhandled
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._in_flight),
+            "calls": self.calls,
+            "shared": self.shared,
+            "errors": self.errors,
+            "timeouts": self.timeouts
+        }
+
+
+single_flight = EventScoped("single_flight")  # The current event's SingleFlight
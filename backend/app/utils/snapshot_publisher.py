@@ -0,0 +1,129 @@
+"""
+Publishes the leaderboard as static JSON snapshot files.
+
+After every rank change (debounced) the whole leaderboard is written to
+`global.json` and `{region}.json` (plus `.json.gz` variants for static servers
+that serve precompressed files) and a `manifest.json` listing the current version.
+Files are written to a temporary name and atomically renamed into place, so a
+reader never sees a partial file. Any static server or CDN can serve the directory;
+the leaderboard API is then only a fallback.
+"""
+import asyncio
+import gzip
+import os
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from fastapi.staticfiles import StaticFiles
+from utils.events import EventScoped, DEFAULT_EVENT, current_event
+from utils.fast_json import dumps
+from utils.leaderboard_changes import change_log
+from utils.leaderboard_rows import to_row
+
+REGIONS = ["EMEA", "AMRS", "APAC"]
+# Each event publishes to a subdirectory named after the event
+SNAPSHOT_ROOT = os.environ.get(
+    "LEADERBOARD_SNAPSHOT_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "leaderboard_snapshots")
+)
+
+
+def write_atomic(path: str, data: bytes):
+    """Write bytes to `path` via a temporary file in the same directory and os.replace"""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class SnapshotPublisher:
+    def __init__(self, directory: Optional[str] = None, debounce: float = 1.0):
+        self.directory = directory or os.path.join(SNAPSHOT_ROOT, DEFAULT_EVENT)
+        self.debounce = debounce
+        self.published_version: Optional[str] = None
+        self._changed: Optional[asyncio.Event] = None
+
+    def notify(self, version: int):
+        """Change log listener: schedule a publish"""
+        if self._changed is not None:
+            self._changed.set()
+
+    async def run(self, db: Any):
+        """Publish once, then again after every change (at most once per debounce interval)"""
+        self._changed = asyncio.Event()
+        change_log.add_listener(self.notify)
+
+        await self.publish(db)
+        while True:
+            await self._changed.wait()
+            await asyncio.sleep(self.debounce)
+            self._changed.clear()
+            try:
+                await self.publish(db)
+            except Exception as e:
+                print(f"Failed to publish leaderboard snapshot: {e!r}")
+
+    async def publish(self, db: Any):
+        """Read the leaderboard once and write every board's snapshot"""
+        version = change_log.token
+        if version == self.published_version:
+            return
+
+        teams = await db.leaderboard.find(
+            {}, {"_id": 0, "team_name": 1, "region": 1, "stages_unlocked": 1, "current_stage": 1,
+                 "total_time": 1, "global_rank": 1, "regional_rank": 1}
+        ).to_list(None)
+
+        generated_at = datetime.utcnow().isoformat() + "Z"
+        boards: Dict[str, List[dict]] = {
+            "global": [
+                to_row(team, "global_rank")
+                for team in sorted(teams, key=lambda t: (t.get("global_rank", 999), t["team_name"]))
+            ]
+        }
+        for region in REGIONS:
+            regional = [team for team in teams if team["region"] == region]
+            boards[region] = [
+                to_row(team, "regional_rank")
+                for team in sorted(regional, key=lambda t: (t.get("regional_rank", 999), t["team_name"]))
+            ]
+
+        files = {}
+        for board, rows in boards.items():
+            data = dumps({"version": version, "generated_at": generated_at, "rows": rows})
+            files[f"{board}.json"] = data
+            files[f"{board}.json.gz"] = gzip.compress(data, mtime=0)
+
+        # The manifest goes last, so it never points at a version whose files aren't in place yet
+        files["manifest.json"] = dumps({
+            "version": version,
+            "generated_at": generated_at,
+            "boards": {board: f"{board}.json" for board in boards}
+        })
+
+        await asyncio.get_running_loop().run_in_executor(None, self._write_files, files)
+        self.published_version = version
+
+    def _write_files(self, files: Dict[str, bytes]):
+        os.makedirs(self.directory, exist_ok=True)
+        for name, data in files.items():
+            write_atomic(os.path.join(self.directory, name), data)
+
+
+snapshot_publisher = EventScoped("snapshot_publisher")  # The current event's SnapshotPublisher
+
+
+class SnapshotFiles(StaticFiles):
+    """Serves SNAPSHOT_ROOT, resolving /snapshots/{file} inside the current event's subdirectory"""
+
+    def get_path(self, scope) -> str:
+        return os.path.join(current_event().event_id, super().get_path(scope))
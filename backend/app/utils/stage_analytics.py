@@ -0,0 +1,220 @@
+"""
+Incrementally maintained per-stage analytics.
+
+Fed by the stage-unlock and submission code paths instead of scanning
+teams.stage_times: every attempt updates counters and a streaming histogram
+per (stage, region). Every worker keeps the attempts it recorded since its last
+persist and adds them (`$inc`) to one shared document in the `analytics`
+collection, periodically; the write returns the totals of all workers, which
+/stats serves (plus this worker's not yet persisted attempts). The /stats payload
+is cached until the next update.
+
+Failed attempts not yet followed by a success are counted in memory by the worker
+that saw them, so attempts_before_success only includes a team's failures on the
+worker that records its success.
+"""
+import asyncio
+import math
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from pymongo import ReturnDocument
+from utils.fast_json import dumps
+from utils.events import EventScoped
+
+ALL_REGIONS = "ALL"
+DOCUMENT_ID = "stage_totals"  # Totals of all workers, added to with $inc
+
+
+class StreamingHistogram:
+    """
+    Log-bucketed histogram for quantile estimates in constant memory.
+    Bucket boundaries grow by `ratio`, so any quantile is within about (ratio - 1) / 2
+    relative error of the true value (2.5% with the default ratio).
+    """
+
+    def __init__(self, ratio: float = 1.05):
+        self.ratio = ratio
+        self._log_ratio = math.log(ratio)
+        self.count = 0
+        self.buckets: Dict[int, int] = {}
+
+    def add(self, value: float):
+        index = math.floor(math.log(max(value, 1.0)) / self._log_ratio)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated q-quantile (0 < q <= 1), or None when empty"""
+        if not self.count:
+            return None
+
+        target = q * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= target:
+                # Geometric midpoint of the bucket
+                return self.ratio ** (index + 0.5)
+        return self.ratio ** (max(self.buckets) + 0.5)
+
+    def merge(self, other: "StreamingHistogram"):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+
+    @classmethod
+    def from_buckets(cls, buckets: dict) -> "StreamingHistogram":
+        histogram = cls()
+        histogram.buckets = {int(k): v for k, v in buckets.items()}
+        histogram.count = sum(histogram.buckets.values())
+        return histogram
+
+
+class StageStats:
+    """Counters and stage-time histogram for one (stage, region)"""
+
+    def __init__(self):
+        self.attempts = 0
+        self.completions = 0
+        self.attempts_before_success = 0  # Failed attempts summed over all completions
+        self.times = StreamingHistogram()
+
+    def merge(self, other: "StageStats"):
+        self.attempts += other.attempts
+        self.completions += other.completions
+        self.attempts_before_success += other.attempts_before_success
+        self.times.merge(other.times)
+
+    def increments(self, prefix: str) -> Dict[str, int]:
+        """$inc adding these stats to the totals stored under `prefix`"""
+        fields = {
+            f"{prefix}.attempts": self.attempts,
+            f"{prefix}.completions": self.completions,
+            f"{prefix}.attempts_before_success": self.attempts_before_success,
+        }
+        fields.update({f"{prefix}.times.{index}": count for index, count in self.times.buckets.items()})
+        return {field: value for field, value in fields.items() if value}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "StageStats":
+        stats = cls()
+        stats.attempts = data.get("attempts", 0)
+        stats.completions = data.get("completions", 0)
+        stats.attempts_before_success = data.get("attempts_before_success", 0)
+        stats.times = StreamingHistogram.from_buckets(data.get("times", {}))
+        return stats
+
+
+class StageAnalytics:
+    def __init__(self):
+        self._totals: Dict[Tuple[int, str], StageStats] = {}  # All workers' persisted stats, as of the last persist
+        self._unpersisted: Dict[Tuple[int, str], StageStats] = {}  # Recorded here since the last persist
+        # Failed attempts per (team, stage) not yet followed by a success
+        self._pending_failures: Dict[Tuple[str, int], int] = {}
+        self._payload: Optional[bytes] = None
+
+    def _stats_for(self, stage: int, region: str) -> StageStats:
+        key = (stage, region)
+        if key not in self._unpersisted:
+            self._unpersisted[key] = StageStats()
+        return self._unpersisted[key]
+
+    def record_attempt(self, team_name: str, region: str, stage: int, correct: bool, completion_time: Optional[float] = None):
+        """
+        Record one attempt at unlocking `stage`.
+        A correct attempt is a first-time completion and must carry its completion time.
+        """
+        targets = [self._stats_for(stage, region), self._stats_for(stage, ALL_REGIONS)]
+        for stats in targets:
+            stats.attempts += 1
+
+        key = (team_name, stage)
+        if not correct:
+            self._pending_failures[key] = self._pending_failures.get(key, 0) + 1
+        else:
+            failures = self._pending_failures.pop(key, 0)
+            for stats in targets:
+                stats.completions += 1
+                stats.attempts_before_success += failures
+                if completion_time is not None:
+                    stats.times.add(completion_time)
+
+        self._payload = None
+
+    def _combined(self) -> Dict[Tuple[int, str], StageStats]:
+        combined: Dict[Tuple[int, str], StageStats] = {}
+        for source in (self._totals, self._unpersisted):
+            for key, stats in source.items():
+                combined.setdefault(key, StageStats()).merge(stats)
+        return combined
+
+    def summary(self) -> dict:
+        stages = []
+        for (stage, region), stats in sorted(self._combined().items()):
+            stages.append({
+                "stage": stage,
+                "region": region,
+                "attempts": stats.attempts,
+                "completions": stats.completions,
+                "median_time": stats.times.quantile(0.5),
+                "p90_time": stats.times.quantile(0.9),
+                "avg_attempts_before_success": (
+                    stats.attempts_before_success / stats.completions if stats.completions else None
+                )
+            })
+        return {"generated_at": datetime.utcnow().isoformat() + "Z", "stages": stages}
+
+    def payload(self) -> bytes:
+        """The /stats response body, rebuilt only after new attempts were recorded or totals were read"""
+        if self._payload is None:
+            self._payload = dumps(self.summary())
+        return self._payload
+
+    def _load_totals(self, doc: Optional[dict]):
+        self._totals = {
+            (int(stage), region): StageStats.from_dict(data)
+            for stage, regions in ((doc or {}).get("stats") or {}).items()
+            for region, data in regions.items()
+        }
+        self._payload = None
+
+    async def load(self, db: Any):
+        """Read the totals persisted by every worker so far"""
+        self._load_totals(await db.analytics.find_one({"_id": DOCUMENT_ID}))
+
+    async def persist(self, db: Any):
+        """
+        Add the attempts recorded since the last persist to the shared totals and read them back.
+        If the write fails, the attempts are kept for the next persist.
+        """
+        unpersisted, self._unpersisted = self._unpersisted, {}
+        increments = {}
+        for (stage, region), stats in unpersisted.items():
+            increments.update(stats.increments(f"stats.{stage}.{region}"))
+
+        try:
+            if increments:
+                doc = await db.analytics.find_one_and_update(
+                    {"_id": DOCUMENT_ID},
+                    {"$inc": increments, "$set": {"updated_at": datetime.utcnow()}},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+            else:
+                doc = await db.analytics.find_one({"_id": DOCUMENT_ID})
+        except BaseException:
+            for key, stats in unpersisted.items():
+                self._stats_for(*key).merge(stats)
+            raise
+        self._load_totals(doc)
+
+    async def run_persistence(self, db: Any, interval: float = 30.0):
+        """Background loop persisting stats (and picking up other workers' totals) every `interval` seconds"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.persist(db)
+            except Exception as e:
+                print(f"Failed to persist stage analytics: {e}")
+
+analytics = EventScoped("analytics")  # The current event's StageAnalytics
@@ -0,0 +1,135 @@
+"""
+In-process, write-through cache of team state for authenticated hot paths.
+
+Login, timer start, challenge URL visits and final submission all need the same
+few fields of a team document. They are cached per team_name (LRU-bounded, with a
+TTL) and updated in place by the app's own writes through update_team_fields.
+
+With several workers, each worker's cache is kept fresh by a change stream on
+`teams` (run_invalidation). Where change streams are not available the TTL bounds
+staleness, and writes that depend on cached progress are guarded by an
+expected-value filter so a stale entry can never apply a stage twice.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from pymongo.errors import OperationFailure, PyMongoError
+from utils.events import EventScoped
+from utils.write_journal import write_journal
+
+CACHED_FIELDS = (
+    "_id",
+    "team_name",
+    "password_hash",
+    "region",
+    "created_at",
+    "timer_started_at",
+    "stages_unlocked",
+    "current_stage",
+    "total_time",
+)
+TEAM_PROJECTION = {field: 1 for field in CACHED_FIELDS}
+
+
+class TeamCache:
+    def __init__(self, max_entries: int = 10000, ttl: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # team_name -> (expires_at, doc)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, db: Any, team_name: str) -> Optional[dict]:
+        """Cached team state, read from MongoDB on a miss. Returns a copy (or None if no such team)."""
+        entry = self._entries.get(team_name)
+        if entry and entry[0] > time.monotonic():
+            self._entries.move_to_end(team_name)
+            self.hits += 1
+            return dict(entry[1])
+
+        self.misses += 1
+        doc = await db.teams.find_one({"team_name": team_name}, TEAM_PROJECTION)
+        if doc:
+            self.put(doc)
+        else:
+            # Not cached: the team may register a moment later
+            self._entries.pop(team_name, None)
+        return doc
+
+    def put(self, doc: dict):
+        """Cache (the cached fields of) a team document, evicting the least recently used entries"""
+        cached = {field: doc[field] for field in CACHED_FIELDS if field in doc}
+        self._entries[doc["team_name"]] = (time.monotonic() + self.ttl, cached)
+        self._entries.move_to_end(doc["team_name"])
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def update(self, team_name: str, fields: Dict[str, Any]):
+        """Apply a write to a cached entry (fields that are not cached are ignored)"""
+        entry = self._entries.get(team_name)
+        if entry:
+            entry[1].update({key: value for key, value in fields.items() if key in CACHED_FIELDS})
+
+    def invalidate(self, team_name: str):
+        self._entries.pop(team_name, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    async def run_invalidation(self, db: Any):
+        """
+        Follow writes made by other workers through a change stream on `teams`.
+        Cached entries are refreshed from the full document; uncached teams are ignored.
+        Returns (leaving the TTL in charge) when change streams are not available.
+        """
+        while True:
+            try:
+                async with db.teams.watch(full_document="updateLookup") as stream:
+                    async for change in stream:
+                        doc = change.get("fullDocument")
+                        if doc is None:
+                            # Deleted: we only know the _id, so drop whichever entry has it
+                            team_id = change["documentKey"]["_id"]
+                            for team_name, (_, cached) in list(self._entries.items()):
+                                if cached.get("_id") == team_id:
+                                    self.invalidate(team_name)
+                        elif doc["team_name"] in self._entries:
+                            self.put(doc)
+            except OperationFailure as e:
+                print(f"Team cache: change streams unavailable ({e.code}), relying on {self.ttl:.0f}s TTL")
+                return
+            except PyMongoError as e:
+                print(f"Team cache invalidation stream interrupted: {e}; clearing cache and resuming")
+                self.clear()
+                await asyncio.sleep(1.0)
+
+
+team_cache = EventScoped("team_cache")  # The current event's TeamCache
+
+
+async def update_team_fields(db: Any, team_doc: dict, fields: Dict[str, Any], expected: Optional[Dict[str, Any]] = None) -> Optional[bool]:
+    """
+    Write fields of a team document and apply them to the cache (write-through).
+    `expected` adds conditions on the current values; if they no longer hold (the
+    cached state was stale) nothing is written, the entry is dropped and False is returned.
+    When MongoDB is slow the write is journaled instead (see utils.write_journal) and the
+    cache is updated from it. A journaled write with `expected` returns None: whether its
+    conditions hold is only known when it is replayed, so it is still pending.
+    """
+    matched = await write_journal.update_team(db, team_doc["_id"], fields, expected)
+
+    if expected and matched is False:
+        team_cache.invalidate(team_doc["team_name"])
+        return False
+
+    team_cache.update(team_doc["team_name"], fields)
+    if expected and matched is None:
+        return None
+    return True
@@ -0,0 +1,135 @@
+"""
+Bulk team provisioning: parse CSV/JSON team lists, hash passwords in parallel
+and insert all teams with a single unordered insert_many.
+"""
+import asyncio
+import csv
+import io
+import json
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, List, Optional
+from pymongo.errors import BulkWriteError
+from utils.auth import hash_password
+
+VALID_REGIONS = ["EMEA", "AMRS", "APAC"]
+
+# Below this many passwords, starting worker processes costs more than it saves
+PARALLEL_HASH_THRESHOLD = 8
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+def new_team_document(team_name: str, password_hash: str, region: str) -> dict:
+    """Build the document for a freshly registered team (0 stages unlocked, timer not started)"""
+    return {
+        "team_name": team_name,
+        "password_hash": password_hash,
+        "region": region,
+        "created_at": datetime.utcnow(),
+        "timer_started_at": None,  # Will be set when Stage 1 PDF is accessed
+        "stages_unlocked": 0,  # 0 stages unlocked (haven't completed stage 1)
+        "stage_times": {
+            "stage_1": None,
+            "stage_2": None,
+            "stage_3": None,
+            "stage_4": None,
+            "stage_5": None
+        },
+        "total_time": 0.0,
+        "last_submission_url": "",
+        "bitbucket_url": None,
+        "last_updated": datetime.utcnow()  # Picked up by the leaderboard materializer
+    }
+
+
+def parse_teams(content: str, fmt: str) -> List[dict]:
+    """
+    Parse a team list. `fmt` is "csv" (header row with team_name,password,region)
+    or "json" (array of {"team_name", "password", "region"} objects).
+    """
+    if fmt == "csv":
+        return [dict(row) for row in csv.DictReader(io.StringIO(content))]
+
+    if fmt == "json":
+        rows = json.loads(content)
+        if not isinstance(rows, list):
+            raise ValueError("Expected a JSON array of teams")
+        return rows
+
+    raise ValueError(f"Unsupported format: {fmt}")
+
+
+def hash_passwords(passwords: List[str], workers: Optional[int] = None) -> List[str]:
+    """
+    Hash passwords with bcrypt across a process pool (bcrypt is CPU-bound).
+    Small batches are hashed inline.
+    """
+    if len(passwords) < PARALLEL_HASH_THRESHOLD:
+        return [hash_password(password) for password in passwords]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(hash_password, passwords, chunksize=4))
+
+
+def _validate_row(row: Any) -> Optional[str]:
+    """Return an error message for an unusable row, or None if it is valid"""
+    if not isinstance(row, dict):
+        return "Row must be an object with team_name, password and region"
+    if not str(row.get("team_name") or "").strip():
+        return "Missing team_name"
+    if not row.get("password"):
+        return "Missing password"
+    if row.get("region") not in VALID_REGIONS:
+        return f"Region must be one of {VALID_REGIONS}"
+    return None
+
+
+async def provision_teams(db: Any, rows: List[Any], workers: Optional[int] = None) -> dict:
+    """
+    Create many teams at once.
+
+    1. Validate every row (invalid rows are reported, not inserted)
+    2. Hash all passwords in a process pool, off the event loop
+    3. Insert with one unordered insert_many; duplicates fail per row via the unique team_name index
+    The leaderboard materializer then ranks the new teams in batches.
+
+    Returns {"created": int, "errors": [{"row": int, "team_name": str, "error": str}]},
+    with 1-based row numbers matching the input.
+    """
+    errors = []
+    valid = []  # (row number, row)
+    for number, row in enumerate(rows, start=1):
+        error = _validate_row(row)
+        if error:
+            team_name = row.get("team_name") if isinstance(row, dict) else None
+            team_name = str(team_name) if team_name is not None else None  # Reported as given, e.g. 5 -> "5"
+            errors.append({"row": number, "team_name": team_name, "error": error})
+        else:
+            valid.append((number, row))
+
+    if not valid:
+        return {"created": 0, "errors": errors}
+
+    loop = asyncio.get_running_loop()
+    hashes = await loop.run_in_executor(
+        None, hash_passwords, [str(row["password"]) for _, row in valid], workers
+    )
+
+    docs = [
+        new_team_document(str(row["team_name"]).strip(), password_hash, row["region"])
+        for (_, row), password_hash in zip(valid, hashes)
+    ]
+
+    failed = set()
+    try:
+        await db.teams.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        for write_error in e.details.get("writeErrors", []):
+            index = write_error["index"]
+            failed.add(index)
+            message = "Team name already exists" if write_error.get("code") == DUPLICATE_KEY_ERROR else write_error.get("errmsg", "Insert failed")
+            errors.append({"row": valid[index][0], "team_name": docs[index]["team_name"], "error": message})
+
+    errors.sort(key=lambda error: error["row"])
+    return {"created": len(docs) - len(failed), "errors": errors}
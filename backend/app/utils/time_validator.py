@@ -3,6 +3,9 @@ Time validation utilities for regional challenge start times.
 """
 from datetime import datetime, timezone
 from typing import Optional
+from utils.single_flight import single_flight
+
+CONFIG_TIMEOUT = 2.0
 
 async def is_challenge_open(region: str, db) -> tuple[bool, Optional[datetime]]:
     """
@@ -15,8 +18,12 @@ async def is_challenge_open(region: str, db) -> tuple[bool, Optional[datetime]]:
     Returns:
         Tuple of (is_open: bool, start_time: datetime)
     """
-    # Get regional start times configuration
-    config = await db.challenges.find_one({"regional_start_times": {"$exists": True}})
+    # Get regional start times configuration (one query for all requests asking at the same moment)
+    config = await single_flight.do(
+        "challenge_config",
+        lambda: db.challenges.find_one({"regional_start_times": {"$exists": True}}),
+        timeout=CONFIG_TIMEOUT
+    )
 
     if not config or "regional_start_times" not in config:
         # If no config exists, allow access (for development/testing)
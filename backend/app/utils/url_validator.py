@@ -1,5 +1,8 @@
 import re
-from typing import Tuple, Optional
+from typing import Any, Tuple, Optional
+from utils.single_flight import single_flight
+
+CHALLENGE_TIMEOUT = 2.0
 
 def parse_challenge_url(url: str) -> Optional[Tuple[int, str, str, str]]:
     """
@@ -31,3 +34,15 @@ def count_correct_values(p1: str, p2: str, p3: str, challenge: dict) -> int:
         p3 == challenge["correct_p3"]
     ])
     return correct_count
+
+async def find_challenge(db: Any, stage: int) -> Optional[dict]:
+    """
+    Get the challenge document of a stage.
+    Concurrent lookups of the same stage share one query (see utils.single_flight);
+    the document is shared too, so callers must not modify it.
+    """
+    return await single_flight.do(
+        ("challenge", stage),
+        lambda: db.challenges.find_one({"stage": stage}),
+        timeout=CHALLENGE_TIMEOUT
+    )
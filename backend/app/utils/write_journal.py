@@ -0,0 +1,271 @@
+"""
+Local write-ahead journal for team writes while MongoDB is slow or failing over.
+
+Team writes (update_team_fields: stage unlocks, submission URLs, timer starts, final
+submissions) get a short deadline. A write that misses it, or fails with a connection
+error, is appended to a local JSONL journal (fsync'd before the request is answered)
+and the journal enters degraded mode: from then on every team write is journaled
+rather than sent, so none can overtake an earlier one. A background task replays the
+journal to MongoDB in order once it answers again, and leaves degraded mode when the
+journal is empty.
+
+Replay is idempotent. Each team write carries a unique id that is recorded on the team
+document when it is applied (`journal_writes`, the last KEPT_WRITE_IDS ids); a journaled write
+whose id is already there was applied before (by the timed-out original request, or by a
+replay cut short by a restart) and is skipped. Ids are compared by membership, not order, so
+writes of other workers never make a journaled write look applied. Writes whose `expected`
+conditions no longer hold are dropped and counted as conflicts, exactly as they would have
+been inline; callers that pass `expected` are told a journaled write is still pending.
+
+A write that sets `last_updated` is stamped with the time it is applied (inline or on replay),
+not the time of the request, so the leaderboard materializer's polling picks a replayed write up.
+
+Each worker claims its own journal file (journal-{n}.jsonl under HACKATHON_JOURNAL_DIR/{event},
+locked with flock), so a restarted worker picks up and replays what a previous one left behind.
+Journal files no worker holds (left by a slot that no longer exists, e.g. after restarting with
+fewer workers) are adopted at startup: their writes are moved into the claiming worker's journal.
+"""
+import asyncio
+import fcntl
+import glob
+import os
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Optional
+from bson import json_util
+from pymongo.errors import PyMongoError
+from utils.events import EventScoped, DEFAULT_EVENT
+
+JOURNAL_ROOT = os.environ.get(
+    "HACKATHON_JOURNAL_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "write_journal")
+)
+WRITE_TIMEOUT = float(os.environ.get("HACKATHON_JOURNAL_WRITE_TIMEOUT_MS", "500")) / 1000
+REPLAY_TIMEOUT = 5.0
+KEPT_WRITE_IDS = 64  # Ids of applied writes kept per team document; far more than can be pending for one team
+
+
+def _update(record: dict) -> dict:
+    """Update applying a journal record: its fields (last_updated as of now), plus its id among the team's applied writes"""
+    fields = record["fields"]
+    if "last_updated" in fields:
+        fields = {**fields, "last_updated": datetime.utcnow()}
+    return {
+        "$set": fields,
+        "$push": {"journal_writes": {"$each": [record["id"]], "$slice": -KEPT_WRITE_IDS}}
+    }
+
+
+class WriteJournal:
+    def __init__(self, directory: Optional[str] = None, write_timeout: float = WRITE_TIMEOUT, max_backoff: float = 10.0):
+        self.directory = directory or os.path.join(JOURNAL_ROOT, DEFAULT_EVENT)
+        self.write_timeout = write_timeout
+        self.max_backoff = max_backoff
+        self.path: Optional[str] = None
+        self.pending: Deque[dict] = deque()  # Journaled writes not yet replayed, oldest first
+        self.journaled = 0
+        self.replayed = 0
+        self.skipped = 0  # Already applied before replay
+        self.conflicts = 0
+        self.last_error: Optional[str] = None
+        self.degraded_since: Optional[float] = None
+        self._file = None
+        self._lock = asyncio.Lock()  # Orders appends and the rewrite after replay
+        self._wakeup = asyncio.Event()
+
+    @property
+    def degraded(self) -> bool:
+        return bool(self.pending)
+
+    # --- Journal file ---
+
+    def _claim(self):
+        """
+        Open and lock the first journal file no other worker holds; load what it contains,
+        plus the writes of any other journal file nobody holds (see _adopt).
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        slot = 0
+        while True:
+            path = os.path.join(self.directory, f"journal-{slot}.jsonl")
+            f = open(path, "a+b")
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                f.close()
+                slot += 1
+                continue
+            f.seek(0)
+            records = [json_util.loads(line) for line in f.read().splitlines() if line.strip()]
+            for orphan in sorted(glob.glob(os.path.join(self.directory, "journal-*.jsonl"))):
+                if orphan != path:
+                    records.extend(self._adopt(orphan, f))
+            return path, f, records
+
+    def _adopt(self, path: str, into) -> list:
+        """
+        Move the writes of a journal file no worker holds into ours: appended (and fsync'd)
+        here before the file is emptied, so a crash in between replays them twice at worst (idempotent).
+        """
+        with open(path, "r+b") as f:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return []  # Held by a live worker
+            records = [json_util.loads(line) for line in f.read().splitlines() if line.strip()]
+            if records:
+                for record in records:
+                    into.write(json_util.dumps(record).encode("utf-8") + b"\n")
+                into.flush()
+                os.fsync(into.fileno())
+                f.truncate(0)
+                f.flush()
+                os.fsync(f.fileno())
+                print(f"Write journal: adopted {len(records)} write(s) from {path}")
+            return records
+
+    def _append(self, record: dict):
+        self._file.write(json_util.dumps(record).encode("utf-8") + b"\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _rewrite(self, records):
+        """Replace the journal contents with the records still pending (the file stays locked)"""
+        self._file.seek(0)
+        self._file.truncate()
+        for record in records:
+            self._file.write(json_util.dumps(record).encode("utf-8") + b"\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    async def open(self):
+        if self._file is not None:
+            return
+        self.path, self._file, records = await asyncio.to_thread(self._claim)
+        self.pending.extend(records)
+        if records:
+            self.degraded_since = time.time()
+            self._wakeup.set()
+            print(f"Write journal {self.path}: {len(records)} write(s) left to replay")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()  # Releases the lock; anything pending is replayed by the next owner
+            self._file = None
+
+    # --- Writes ---
+
+    async def update_team(self, db: Any, team_id: Any, fields: Dict[str, Any], expected: Optional[Dict[str, Any]] = None) -> Optional[bool]:
+        """
+        Apply `fields` to a team document ($set), guarded by `expected`.
+        Returns whether it matched when written inline, or None when it was journaled.
+        """
+        # The inline attempt records the same id, so if it lands after its deadline the replay skips it
+        record = {"id": uuid.uuid4().hex, "at": time.time(), "team_id": team_id, "fields": fields, "expected": expected or {}}
+        if not self.degraded:
+            try:
+                result = await asyncio.wait_for(
+                    db.teams.update_one({"_id": team_id, **record["expected"]}, _update(record)),
+                    self.write_timeout
+                )
+                return result.matched_count > 0
+            except (asyncio.TimeoutError, PyMongoError) as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+
+        await self.append(record)
+        return None
+
+    async def append(self, record: dict):
+        await self.open()
+        async with self._lock:
+            await asyncio.to_thread(self._append, record)
+            if not self.pending:
+                self.degraded_since = time.time()
+                print(f"MongoDB writes are slow or failing ({self.last_error}); journaling team writes to {self.path}")
+            self.pending.append(record)
+            self.journaled += 1
+        self._wakeup.set()
+
+    # --- Replay ---
+
+    async def _apply(self, db: Any, record: dict):
+        query = {"_id": record["team_id"], **record["expected"], "journal_writes": {"$ne": record["id"]}}
+        result = await asyncio.wait_for(db.teams.update_one(query, _update(record)), REPLAY_TIMEOUT)
+        if result.matched_count:
+            self.replayed += 1
+            return
+
+        applied = await asyncio.wait_for(
+            db.teams.find_one({"_id": record["team_id"], "journal_writes": record["id"]}, {"_id": 1}),
+            REPLAY_TIMEOUT
+        )
+        if applied:
+            self.skipped += 1
+        else:
+            self.conflicts += 1
+            print(f"Write journal: dropped write {record['id']} to team {record['team_id']}, its expected values no longer hold")
+
+    async def replay(self, db: Any) -> int:
+        """Replay pending writes in order until the journal is empty or MongoDB fails. Returns how many were applied."""
+        await self.open()
+        applied = 0
+        try:
+            while self.pending:
+                await self._apply(db, self.pending[0])
+                self.pending.popleft()
+                applied += 1
+        finally:
+            if applied:
+                async with self._lock:
+                    await asyncio.to_thread(self._rewrite, list(self.pending))
+                if not self.pending:
+                    print(f"Write journal replayed after {time.time() - self.degraded_since:.1f}s degraded")
+                    self.degraded_since = None
+                    self.last_error = None
+        return applied
+
+    async def run(self, db: Any):
+        """Background task: replay whenever there is something journaled, backing off while MongoDB is down"""
+        await self.open()
+        backoff = 0.5
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self.pending:
+                try:
+                    await self.replay(db)
+                    backoff = 0.5
+                except (asyncio.TimeoutError, PyMongoError) as e:
+                    self.last_error = f"{type(e).__name__}: {e}"
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, self.max_backoff)
+
+    async def flush(self, db: Any):
+        """On shutdown: replay what MongoDB accepts, keep the rest on disk for the next run"""
+        try:
+            await self.replay(db)
+        except (asyncio.TimeoutError, PyMongoError) as e:
+            print(f"Write journal: {len(self.pending)} write(s) left in {self.path} ({type(e).__name__}: {e})")
+        finally:
+            self.close()
+
+    def stats(self) -> dict:
+        oldest = self.pending[0]["at"] if self.pending else None
+        return {
+            "degraded": self.degraded,
+            "degraded_seconds": round(time.time() - self.degraded_since, 1) if self.degraded_since else None,
+            "pending": len(self.pending),
+            "oldest_pending_age_seconds": round(time.time() - oldest, 1) if oldest else None,
+            "journaled": self.journaled,
+            "replayed": self.replayed,
+            "skipped": self.skipped,
+            "conflicts": self.conflicts,
+            "last_error": self.last_error,
+            "write_timeout_ms": self.write_timeout * 1000,
+            "path": self.path
+        }
+
+
+write_journal = EventScoped("write_journal")  # The current event's WriteJournal
@@ -0,0 +1,188 @@
+"""
+Snapshot an event's database to a single compressed file, and restore it.
+
+A snapshot is gzip-compressed NDJSON: a header line (format version, event, time,
+index definitions), then one line per document of each collection (teams,
+challenges including the regional start-time config, leaderboard, analytics),
+and a footer line with the document count of each collection. Documents are
+MongoDB Extended JSON (canonical), so ObjectIds, dates and number types survive
+the round trip. Collections are read with streaming cursors, so memory stays flat
+however large the event.
+
+Restore bulk-loads the documents in batches, then creates the indexes (building
+them once over the loaded data is much faster than maintaining them insert by
+insert). The leaderboard is restored with its ranks, so the app serves it right
+away instead of waiting for a rebuild.
+
+Usage:
+    python event_snapshot.py snapshot acme.ndjson.gz --event acme-2025
+    python event_snapshot.py restore acme.ndjson.gz --event acme-staging   # into an empty event
+    python event_snapshot.py restore acme.ndjson.gz --event acme-2025 --drop  # replace its data
+"""
+from motor.motor_asyncio import AsyncIOMotorClient
+from bson import json_util
+from bson.json_util import CANONICAL_JSON_OPTIONS
+from datetime import datetime
+from pymongo import IndexModel
+import argparse
+import asyncio
+import gzip
+import os
+import sys
+import time
+
+# Reuse the app's index definitions (the app is run from backend/app)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "app"))
+
+from database import ensure_indexes  # noqa: E402
+from utils.events import database_name, DEFAULT_EVENT  # noqa: E402
+
+FORMAT = "hackathon-event-snapshot"
+VERSION = 1
+COLLECTIONS = ["challenges", "teams", "leaderboard", "analytics"]
+BATCH_SIZE = 1000
+INDEX_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+def encode(document: dict) -> bytes:
+    return json_util.dumps(document, json_options=CANONICAL_JSON_OPTIONS).encode("utf-8") + b"\n"
+
+async def index_definitions(db, name: str) -> list:
+    """Secondary indexes of a collection as [{"keys": [[field, direction], ...], "name": ..., options}]"""
+    indexes = []
+    for index_name, info in (await db[name].index_information()).items():
+        if index_name == "_id_":
+            continue
+        index = {"keys": [list(key) for key in info["key"]], "name": index_name}
+        index.update({option: info[option] for option in INDEX_OPTIONS if option in info})
+        indexes.append(index)
+    return indexes
+
+async def snapshot(db, path: str, event: str):
+    started = time.perf_counter()
+    header = {
+        "format": FORMAT,
+        "version": VERSION,
+        "event": event,
+        "created_at": datetime.utcnow(),
+        "collections": COLLECTIONS,
+        "indexes": {name: await index_definitions(db, name) for name in COLLECTIONS}
+    }
+
+    counts = {}
+    # Written to a temporary name first, so an interrupted snapshot never looks complete
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wb", compresslevel=6) as out:
+        out.write(encode(header))
+        for name in COLLECTIONS:
+            counts[name] = 0
+            lines = []
+            async for document in db[name].find({}, batch_size=BATCH_SIZE):
+                lines.append(encode({"c": name, "d": document}))
+                counts[name] += 1
+                if len(lines) >= BATCH_SIZE:
+                    out.write(b"".join(lines))
+                    lines = []
+            out.write(b"".join(lines))
+            print(f"   ✅ {name}: {counts[name]} documents")
+        out.write(encode({"end": True, "counts": counts}))
+    os.replace(tmp_path, path)
+
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    print(f"📦 Snapshot of event '{event}' written to {path} ({size_mb:.1f} MB, {time.perf_counter() - started:.1f}s)")
+
+def read_header(path: str) -> dict:
+    """Check that a file is a complete snapshot this tool can read, and return its header"""
+    with gzip.open(path, "rb") as f:
+        header = json_util.loads(f.readline())
+        if header.get("format") != FORMAT:
+            raise ValueError(f"{path} is not an event snapshot")
+        if header.get("version", 0) > VERSION:
+            raise ValueError(f"{path} is snapshot format version {header['version']}; this tool reads up to {VERSION}")
+
+        # Fast pass over the raw lines (no decoding): the footer must be there and match
+        documents, last = 0, b""
+        for line in f:
+            documents += 1
+            last = line
+    footer = json_util.loads(last) if last else {}
+    if not footer.get("end"):
+        raise ValueError(f"{path} is truncated (no footer)")
+    if sum(footer["counts"].values()) != documents - 1:
+        raise ValueError(f"{path} is inconsistent: the footer lists {footer['counts']}, the file has {documents - 1} documents")
+    return header
+
+def read_documents(path: str):
+    """Yield the (collection, document) pairs of a snapshot, in file order"""
+    with gzip.open(path, "rb") as f:
+        f.readline()  # Header
+        for line in f:
+            record = json_util.loads(line)
+            if record.get("end"):
+                return
+            yield record["c"], record["d"]
+
+async def restore(db, path: str, drop: bool):
+    started = time.perf_counter()
+    # Validated before anything is dropped, so a bad file leaves the target untouched
+    header = read_header(path)
+
+    existing = [name for name in header["collections"] if await db[name].estimated_document_count()]
+    if existing and not drop:
+        raise SystemExit(f"❌ Target already has data in {', '.join(existing)}; use --drop to replace it")
+    for name in header["collections"]:
+        await db[name].drop()
+
+    counts = {name: 0 for name in header["collections"]}
+    batch, batch_collection = [], None
+    for name, document in read_documents(path):
+        if batch and (name != batch_collection or len(batch) >= BATCH_SIZE):
+            await db[batch_collection].insert_many(batch, ordered=False)
+            batch = []
+        batch_collection = name
+        batch.append(document)
+        counts[name] += 1
+    if batch:
+        await db[batch_collection].insert_many(batch, ordered=False)
+
+    # Indexes are built once over the loaded data: the snapshot's own, then any the app needs that it lacks
+    for name, indexes in header["indexes"].items():
+        if indexes:
+            await db[name].create_indexes([
+                IndexModel([tuple(key) for key in index["keys"]], name=index["name"],
+                           **{option: index[option] for option in INDEX_OPTIONS if option in index})
+                for index in indexes
+            ])
+    await ensure_indexes(db)
+
+    for name, count in counts.items():
+        print(f"   ✅ {name}: {count} documents")
+    print(f"♻️  Restored snapshot of event '{header['event']}' taken {header['created_at']:%Y-%m-%d %H:%M:%S} UTC "
+          f"in {time.perf_counter() - started:.1f}s")
+
+async def run(args):
+    client = AsyncIOMotorClient(args.mongo_url)
+    db = client[database_name(args.event)]
+    try:
+        if args.command == "snapshot":
+            await snapshot(db, args.file, args.event)
+        else:
+            await restore(db, args.file, args.drop)
+    finally:
+        client.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot an event's database to a compressed file, or restore one")
+    parser.add_argument("command", choices=["snapshot", "restore"])
+    parser.add_argument("file", help="Snapshot file (gzip-compressed NDJSON, e.g. acme.ndjson.gz)")
+    parser.add_argument("--event", default=DEFAULT_EVENT, help="Event to snapshot, or to restore into (each event has its own database)")
+    parser.add_argument("--drop", action="store_true", help="Restore: replace the event's existing data")
+    parser.add_argument("--mongo-url", default=os.environ.get("HACKATHON_MONGO_URL", "mongodb://localhost:27017"))
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run(args))
+    except (ValueError, EOFError, gzip.BadGzipFile) as e:
+        raise SystemExit(f"❌ {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+Micro-benchmarks for the ranking, parsing and validation primitives.
+
+Fast and deterministic (seeded data, no network): URL parsing and answer checking,
+leaderboard time formatting, and the leaderboard rank computation of
+utils.leaderboard_updater (full rebuild and incremental syncs) at several team counts,
+run against an in-memory fake of the MongoDB collections. Each benchmark reports the
+median time per call over several repeats.
+
+Results are saved as JSON; `compare` re-runs the benchmarks (or reads --current) and
+exits non-zero when any benchmark got slower than the baseline by more than --threshold.
+Baselines are machine-specific: record one before changing ranking code and compare on
+the same machine.
+
+Usage:
+    python microbench.py run --save microbench_baseline.json
+    python microbench.py compare --baseline microbench_baseline.json --threshold 0.10
+    python microbench.py run --sizes 100,1000 --filter rank   # a subset
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app")
+sys.path.insert(0, APP_DIR)
+REGIONS = ["EMEA", "AMRS", "APAC"]
+DEFAULT_SIZES = "100,1000,10000,100000"
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "microbench_baseline.json")
+
+
+# --- In-memory fake of the collections used by the leaderboard updater ---
+
+class FakeCursor:
+    def __init__(self, docs: List[dict]):
+        self.docs = docs
+
+    async def to_list(self, length: Optional[int]) -> List[dict]:
+        return self.docs if length is None else self.docs[:length]
+
+
+class FakeCollection:
+    """Just enough of a motor collection for leaderboard_updater: equality / $in filters, projections, bulk UpdateOne"""
+
+    def __init__(self, docs: List[dict] = ()):
+        self.docs: Dict[str, dict] = {}  # team_id (or _id) -> document
+        self.by_name: Dict[str, dict] = {}  # team_name -> document
+        for doc in docs:
+            doc = dict(doc)
+            self.docs[doc.get("team_id", str(doc.get("_id")))] = doc
+            self.by_name[doc["team_name"]] = doc
+
+    def _match(self, doc: dict, query: dict) -> bool:
+        for field, condition in query.items():
+            if isinstance(condition, dict) and "$in" in condition:
+                if doc.get(field) not in condition["$in"]:
+                    return False
+            elif doc.get(field) != condition:
+                return False
+        return True
+
+    def _select(self, query: dict) -> List[dict]:
+        if set(query) == {"team_id"} and isinstance(query["team_id"], dict):
+            return [self.docs[key] for key in query["team_id"]["$in"] if key in self.docs]
+        if set(query) == {"team_id"}:
+            return [self.docs[query["team_id"]]] if query["team_id"] in self.docs else []
+        return [doc for doc in self.docs.values() if self._match(doc, query)]
+
+    def find(self, query: Optional[dict] = None, projection: Optional[dict] = None) -> FakeCursor:
+        docs = self._select(query or {})
+        if projection:
+            # Like MongoDB, _id is included unless excluded explicitly
+            fields = [field for field, keep in {"_id": 1, **projection}.items() if keep]
+            docs = [{field: doc[field] for field in fields if field in doc} for doc in docs]
+        else:
+            docs = [dict(doc) for doc in docs]
+        return FakeCursor(docs)
+
+    async def bulk_write(self, operations: list, ordered: bool = True):
+        for op in operations:
+            # pymongo keeps an UpdateOne's arguments in these attributes
+            query, update, upsert = op._filter, op._doc, op._upsert
+            if "team_id" in query:
+                doc = self.docs.get(query["team_id"])
+            else:
+                doc = self.by_name.get(query["team_name"])
+            if doc is None:
+                if not upsert:
+                    continue
+                doc = self.docs[query["team_id"]] = dict(query)
+            doc.update(update["$set"])
+            self.by_name[doc["team_name"]] = doc
+
+    async def delete_many(self, query: dict):
+        for doc in self._select(query):
+            del self.docs[doc["team_id"]]
+            self.by_name.pop(doc["team_name"], None)
+
+
+class FakeDatabase:
+    def __init__(self, teams: List[dict]):
+        self.teams = FakeCollection(teams)
+        self.leaderboard = FakeCollection()
+
+
+def make_teams(count: int, seed: int = 42) -> List[dict]:
+    """Synthetic team documents with a realistic spread of progress (about one in seven has not started)"""
+    rng = random.Random(seed)
+    teams = []
+    for i in range(count):
+        stages = rng.choice([0, 1, 1, 2, 2, 3, 4])
+        teams.append({
+            "_id": f"team{i:06d}",
+            "team_name": f"team-{i:06d}",
+            "region": REGIONS[i % len(REGIONS)],
+            "stages_unlocked": stages,
+            "total_time": round(sum(rng.uniform(600, 5400) for _ in range(stages)), 3)
+        })
+    return teams
+
+
+# --- Timing ---
+
+def measure(func: Callable[[], object], repeat: int, min_time: float) -> dict:
+    """Median and best time per call (ns) over `repeat` rounds of an auto-sized number of calls"""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or loops >= 1_000_000:
+            break
+        loops *= 10 if elapsed < min_time / 10 else 2
+
+    rounds = [elapsed / loops]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        rounds.append((time.perf_counter() - started) / loops)
+    return {
+        "ns_per_op": round(statistics.median(rounds) * 1e9, 1),
+        "best_ns": round(min(rounds) * 1e9, 1),
+        "loops": loops,
+        "repeat": repeat
+    }
+
+
+# --- Benchmarks ---
+
+def primitive_benchmarks() -> Dict[str, Callable[[], object]]:
+    from utils.url_validator import parse_challenge_url, count_correct_values
+    from utils.leaderboard_rows import format_time, to_row
+
+    challenge = {"correct_p1": "4", "correct_p2": "5", "correct_p3": "6"}
+    team = {"team_name": "team-000001", "region": "EMEA", "stages_unlocked": 3, "total_time": 8123.4, "global_rank": 17}
+    return {
+        "parse_challenge_url/valid": lambda: parse_challenge_url("ERFT_stage3_p1-4_p2-5_p3-6"),
+        "parse_challenge_url/invalid": lambda: parse_challenge_url("ERFT_stage3_p1-4_p2-5"),
+        "count_correct_values/all_correct": lambda: count_correct_values("4", "5", "6", challenge),
+        "count_correct_values/none_correct": lambda: count_correct_values("1", "2", "3", challenge),
+        "format_time": lambda: format_time(98765.4),
+        "to_row": lambda: to_row(team, "global_rank"),
+    }
+
+
+def rank_benchmarks(size: int, loop: asyncio.AbstractEventLoop) -> Dict[str, Callable[[], object]]:
+    from utils.leaderboard_updater import assign_ranks, entry_from_team, rebuild_leaderboard, sync_teams_to_leaderboard
+
+    teams = make_teams(size)
+    db = FakeDatabase(teams)
+    loop.run_until_complete(rebuild_leaderboard(db))
+    entries = [entry_from_team(team) for team in teams]
+    rng = random.Random(size)
+
+    def unlock(batch: int):
+        # Deterministic stream of stage unlocks; teams that finished start over so the board keeps moving
+        changed = []
+        for team in rng.sample(teams, batch):
+            team["stages_unlocked"] = team["stages_unlocked"] % 4 + 1
+            team["total_time"] = round(team["total_time"] + rng.uniform(600, 5400), 3)
+            changed.append(dict(team))
+        return loop.run_until_complete(sync_teams_to_leaderboard(db, changed))
+
+    return {
+        f"rank/assign_ranks/{size}": lambda: assign_ranks(entries),
+        f"rank/rebuild_leaderboard/{size}": lambda: loop.run_until_complete(rebuild_leaderboard(db)),
+        f"rank/sync_one_unlock/{size}": lambda: unlock(1),
+        f"rank/sync_50_unlocks/{size}": lambda: unlock(min(50, size)),
+    }
+
+
+def run(args) -> dict:
+    from utils.events import EventContext, _current_event
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    results = {}
+
+    def bench(name: str, func: Callable[[], object]):
+        if args.filter and args.filter not in name:
+            return
+        results[name] = measure(func, args.repeat, args.min_time)
+        print(f"  {name:<42} {results[name]['ns_per_op']:>16,.1f} ns/op")
+
+    for name, func in primitive_benchmarks().items():
+        bench(name, func)
+
+    for size in [int(size) for size in args.sizes.split(",") if size]:
+        # Each size gets fresh leaderboard state (partitions, change log) in its own event context
+        context = EventContext(f"microbench-{size}")
+        token = context.enter()
+        try:
+            for name, func in rank_benchmarks(size, loop).items():
+                bench(name, func)
+        finally:
+            _current_event.reset(token)
+
+    loop.close()
+    return {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat() + "Z",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine()
+        },
+        "results": results
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """Print the per-benchmark change and return the names that regressed beyond `threshold`"""
+    regressions = []
+    print(f"\n  {'benchmark':<42} {'baseline':>14} {'current':>14} {'change':>9}")
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"  {name:<42} {'-':>14} {result['ns_per_op']:>14,.1f}      new")
+            continue
+        change = result["ns_per_op"] / before["ns_per_op"] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"  {name:<42} {before['ns_per_op']:>14,.1f} {result['ns_per_op']:>14,.1f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for ranking, parsing and validation primitives")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for name in ("run", "compare"):
+        command = commands.add_parser(name)
+        command.add_argument("--sizes", default=DEFAULT_SIZES, help=f"Team counts for the rank benchmarks (default: {DEFAULT_SIZES})")
+        command.add_argument("--repeat", type=int, default=5, help="Rounds per benchmark; the median is reported (default: 5)")
+        command.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per round (default: 0.2)")
+        command.add_argument("--filter", help="Only run benchmarks whose name contains this")
+    commands.choices["run"].add_argument("--save", metavar="PATH", help="Write the results to this JSON file")
+    commands.choices["compare"].add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON (default: microbench_baseline.json)")
+    commands.choices["compare"].add_argument("--current", metavar="PATH", help="Compare this results file instead of running the benchmarks")
+    commands.choices["compare"].add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown before failing (default: 0.10 = 10%%)")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        results = run(args)
+        if args.save:
+            with open(args.save, "w") as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+                f.write("\n")
+            print(f"\nSaved {len(results['results'])} results to {args.save}")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if args.current:
+        with open(args.current) as f:
+            current = json.load(f)
+    else:
+        current = run(args)
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) more than {args.threshold:.0%} slower than the baseline: {', '.join(regressions)}")
+        sys.exit(1)
+    print(f"\nNo benchmark more than {args.threshold:.0%} slower than the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Bulk-create teams from a CSV or JSON file.
+CSV needs a header row: team_name,password,region
+JSON is an array of {"team_name": ..., "password": ..., "region": ...} objects.
+
+Usage: python provision_teams.py teams.csv [--workers 8] [--event acme-2025]
+"""
+from motor.motor_asyncio import AsyncIOMotorClient
+import argparse
+import asyncio
+import os
+import sys
+
+# Reuse the app's provisioning code (the app is run from backend/app)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "app"))
+
+from database import ensure_indexes  # noqa: E402
+from utils.team_provisioning import parse_teams, provision_teams  # noqa: E402
+from utils.events import database_name, DEFAULT_EVENT  # noqa: E402
+
+async def provision(path: str, fmt: str, workers: int, event: str = DEFAULT_EVENT):
+    with open(path, "r", encoding="utf-8") as f:
+        rows = parse_teams(f.read(), fmt)
+
+    client = AsyncIOMotorClient("mongodb://localhost:27017")
+    db = client[database_name(event)]
+
+    # Duplicate team names are rejected by the unique team_name index, which a new event's database doesn't have yet
+    await ensure_indexes(db)
+
+    print(f"👥 Provisioning {len(rows)} teams from {path}...")
+    result = await provision_teams(db, rows, workers=workers)
+
+    print(f"   ✅ Created {result['created']} teams")
+    for error in result["errors"]:
+        print(f"   ❌ Row {error['row']} ({error['team_name']}): {error['error']}")
+
+    client.close()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-create hackathon teams from CSV or JSON")
+    parser.add_argument("file", help="Path to a .csv or .json team list")
+    parser.add_argument("--format", choices=["csv", "json"], help="Input format (default: from file extension)")
+    parser.add_argument("--workers", type=int, default=None, help="Password hashing processes (default: CPU count)")
+    parser.add_argument("--event", default=DEFAULT_EVENT, help="Event to add the teams to (each event has its own database)")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.file.lower().endswith(".csv") else "json")
+    result = asyncio.run(provision(args.file, fmt, args.workers, args.event))
+
+    # Non-zero exit when some rows were rejected, so scripted imports notice
+    sys.exit(1 if result["errors"] else 0)
+
+if __name__ == "__main__":
+    main()
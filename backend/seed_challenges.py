@@ -1,31 +1,41 @@
 """
 Seed script to populate MongoDB with all demo data.
 Run this to initialize the database with challenges, sample teams, and leaderboard entries.
+
+Seeding is idempotent: challenges, the regional config, teams and leaderboard entries are
+upserted by their natural keys (stage, team_name, team_id), so re-running it resets the demo
+data without duplicating anything. Writes are batched, passwords are hashed in parallel
+(each distinct password once) and ranks are computed in a single pass.
+
+Usage:
+    python seed_challenges.py               # challenges + sample teams
+    python seed_challenges.py --teams 10000 # also generate 10k synthetic teams for benchmarking
+    python seed_challenges.py --teams 2000 --distinct-passwords  # one password per synthetic team (benchmarks hashing)
+    python seed_challenges.py --reset       # wipe the collections first
 """
 from motor.motor_asyncio import AsyncIOMotorClient
-import bcrypt
+from pymongo import UpdateOne
 from datetime import datetime, timedelta
+import argparse
 import asyncio
+import os
+import random
+import sys
+import time
 
-def hash_password(password: str) -> str:
-    """Hash password using bcrypt directly"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+# Reuse the app's index definitions, hashing and ranking (the app is run from backend/app)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "app"))
 
-async def seed_database():
-    # Connect to MongoDB
-    client = AsyncIOMotorClient("mongodb://localhost:27017")
-    db = client.hackathon_db
+from database import ensure_indexes  # noqa: E402
+from utils.team_provisioning import hash_passwords  # noqa: E402
+from utils.leaderboard_updater import rebuild_leaderboard  # noqa: E402
+from utils.events import database_name, DEFAULT_EVENT  # noqa: E402
 
-    print("=" * 60)
-    print("🌱 SEEDING HACKATHON DATABASE")
-    print("=" * 60)
-
-    # ============================================================
-    # 1. SEED CHALLENGES
-    # ============================================================
-    print("\n📋 Step 1: Seeding Challenges...")
-    await db.challenges.delete_many({})
+REGIONS = ["EMEA", "AMRS", "APAC"]
+DEMO_PASSWORD = "demo123"
 
+def challenge_data():
+    """Regional start time config and the five stage challenges"""
     # Regional start times configuration
     # Note: Answers from Stage N are used to build the URL for Stage N+1
     regional_config = {
@@ -102,27 +112,15 @@ async def seed_database():
         }
     ]
 
-    # Insert regional config first
-    await db.challenges.insert_one(regional_config)
-
-    # Insert challenges
-    result = await db.challenges.insert_many(challenges)
-    print(f"   ✅ Seeded {len(result.inserted_ids)} challenges")
-    print(f"   ✅ Configured regional start times for EMEA, AMRS, APAC")
-
-    # ============================================================
-    # 2. SEED SAMPLE TEAMS
-    # ============================================================
-    print("\n👥 Step 2: Seeding Sample Teams...")
-    await db.teams.delete_many({})
-
-    base_time = datetime.utcnow()
+    return regional_config, challenges
 
+def sample_team_data(base_time: datetime):
+    """Hand-written demo teams covering every stage in every region"""
     sample_teams = [
         # EMEA Teams
         {
             "team_name": "CodeMasters_EMEA",
-            "password_hash": hash_password("demo123"),
+            "password": "demo123",
             "region": "EMEA",
             "created_at": base_time - timedelta(hours=5),
             "timer_started_at": base_time - timedelta(hours=5),  # Timer started when they accessed PDF
@@ -140,7 +138,7 @@ async def seed_database():
         },
         {
             "team_name": "FraudBusters_EU",
-            "password_hash": hash_password("demo123"),
+            "password": "demo123",
             "region": "EMEA",
             "created_at": base_time - timedelta(hours=4),
             "timer_started_at": base_time - timedelta(hours=4),  # Timer started when they accessed PDF
@@ -158,7 +156,7 @@ async def seed_database():
         },
         {
             "team_name": "DataNinjas_London",
-            "password_hash": hash_password("demo123"),
+            "password": "demo123",
             "region": "EMEA",
             "created_at": base_time - timedelta(hours=3),
             "timer_started_at": base_time - timedelta(hours=3),  # Timer started when they accessed PDF
@@ -176,7 +174,7 @@ async def seed_database():
         },
         {
             "team_name": "NewTeam_EMEA",
-            "password_hash": hash_password("demo123"),
+            "password": "demo123",
             "region": "EMEA",
             "created_at": base_time - timedelta(hours=1),
             "timer_started_at": None,  # Haven't accessed PDF yet
@@ -195,7 +193,7 @@ async def seed_database():
         # AMRS Teams
         {
             "team_name": "ByteForce_NYC",
-            "password_hash": hash_password("demo123"),
+            "password": "demo123",
             "region": "AMRS",
             "created_at": base_time - timedelta(hours=4, minutes=30),
             "timer_started_at": base_time - timedelta(hours=4, minutes=30),  # Timer started when they accessed PDF
@@ -213,7 +211,7 @@ async def seed_database():
         },
         {
             "team_name": "AlgoWarriors_SF",
-            "password_hash": hash_password("demo123"),
+            "password": "demo123",
             "region": "AMRS",
             "created_at": base_time - timedelta(hours=3, minutes=45),
             "timer_started_at": base_time - timedelta(hours=3, minutes=45),  # Timer started when they accessed PDF
@@ -231,7 +229,7 @@ async def seed_database():
         },
         {
             "team_name": "HackSquad_Boston",
-            "password_hash": hash_password("demo123"),
+            "password": "demo123",
             "region": "AMRS",
             "created_at": base_time - timedelta(hours=2),
             "timer_started_at": None,  # Haven't accessed PDF yet
@@ -250,7 +248,7 @@ async def seed_database():
         # APAC Teams
         {
             "team_name": "TechTitans_Mumbai",
-            "password_hash": hash_password("demo123"),
+            "password": "demo123",
             "region": "APAC",
             "created_at": base_time - timedelta(hours=6),
             "timer_started_at": base_time - timedelta(hours=6),  # Timer started when they accessed PDF
@@ -268,7 +266,7 @@ async def seed_database():
         },
         {
             "team_name": "CodeSamurai_Chennai",
-            "password_hash": hash_password("demo123"),
+            "password": "demo123",
             "region": "APAC",
             "created_at": base_time - timedelta(hours=5, minutes=15),
             "timer_started_at": base_time - timedelta(hours=5, minutes=15),  # Timer started when they accessed PDF
@@ -286,7 +284,7 @@ async def seed_database():
         },
         {
             "team_name": "DevDragons",
-            "password_hash": hash_password("demo123"),
+            "password": "demo123",
             "region": "APAC",
             "created_at": base_time - timedelta(hours=2, minutes=30),
             "timer_started_at": base_time - timedelta(hours=2, minutes=30),  # Timer started when they accessed PDF
@@ -304,86 +302,87 @@ async def seed_database():
         }
     ]
 
-    result = await db.teams.insert_many(sample_teams)
-    print(f"   ✅ Seeded {len(result.inserted_ids)} sample teams")
-    print(f"      Password for all demo teams: demo123")
-
-    # ============================================================
-    # 3. BUILD LEADERBOARD
-    # ============================================================
-    print("\n🏆 Step 3: Building Leaderboard...")
-    await db.leaderboard.delete_many({})
-
-    # Get ALL teams (including those with 0 stages unlocked)
-    all_teams = await db.teams.find().to_list(None)
-
-    leaderboard_entries = []
-    for team in all_teams:
-        leaderboard_entries.append({
-            "team_id": str(team["_id"]),
-            "team_name": team["team_name"],
-            "region": team["region"],
-            "stages_unlocked": team["stages_unlocked"],
-            "total_time": team["total_time"],
-            "global_rank": 0,  # Will be calculated
-            "regional_rank": 0,  # Will be calculated
-            "last_updated": datetime.utcnow()
+    return sample_teams
+
+def synthetic_password(i: int) -> str:
+    """Password of synthetic team `i` when seeded with distinct passwords"""
+    return f"load-{i:05d}"
+
+def synthetic_teams(count: int, base_time: datetime, seed: int = 42, distinct_passwords: bool = False):
+    """
+    Generate `count` deterministic synthetic teams with random progress, for benchmarking.
+    By default they share the demo password, so it is hashed once no matter how many teams there are;
+    with distinct_passwords each team gets its own (synthetic_password), and seeding measures hashing.
+    """
+    rng = random.Random(seed)
+    teams = []
+    for i in range(count):
+        stages_unlocked = rng.randint(0, 4)
+        stage_times = {f"stage_{n}": None for n in range(1, 6)}
+        for n in range(1, stages_unlocked + 1):
+            stage_times[f"stage_{n}"] = float(rng.randint(300, 1800))
+        started = base_time - timedelta(minutes=rng.randint(30, 600))
+
+        teams.append({
+            "team_name": f"LoadTeam_{i:05d}",
+            "password": synthetic_password(i) if distinct_passwords else DEMO_PASSWORD,
+            "region": REGIONS[i % len(REGIONS)],
+            "created_at": started,
+            "timer_started_at": started if stages_unlocked > 0 else None,
+            "stages_unlocked": stages_unlocked,
+            "stage_times": stage_times,
+            "total_time": sum(t for t in stage_times.values() if t is not None),
+            "last_submission_url": f"ERFT_stage{stages_unlocked + 1}_p1-x_p2-y_p3-z" if stages_unlocked > 0 else "",
+            "bitbucket_url": None
         })
+    return teams
 
-    if leaderboard_entries:
-        await db.leaderboard.insert_many(leaderboard_entries)
-
-    # Calculate global ranks
-    # Teams with 0 stages: tied, sorted alphabetically
-    # Teams with progress: sorted by stages DESC, then time ASC
-    teams_with_progress = [e for e in leaderboard_entries if e["stages_unlocked"] > 0]
-    teams_no_progress = [e for e in leaderboard_entries if e["stages_unlocked"] == 0]
-
-    sorted_global = sorted(teams_with_progress,
-                          key=lambda x: (-x["stages_unlocked"], x["total_time"]))
-    sorted_no_progress = sorted(teams_no_progress, key=lambda x: x["team_name"])
-
-    # Rank teams with progress
-    for rank, entry in enumerate(sorted_global, start=1):
-        await db.leaderboard.update_one(
-            {"team_id": entry["team_id"]},
-            {"$set": {"global_rank": rank}}
-        )
-
-    # Teams with no progress get rank 999 (will sort to bottom)
-    for entry in sorted_no_progress:
-        await db.leaderboard.update_one(
-            {"team_id": entry["team_id"]},
-            {"$set": {"global_rank": 999}}
-        )
-
-    # Calculate regional ranks
-    for region in ["EMEA", "AMRS", "APAC"]:
-        regional_teams_progress = [e for e in teams_with_progress if e["region"] == region]
-        regional_teams_no_progress = [e for e in teams_no_progress if e["region"] == region]
-
-        sorted_regional = sorted(regional_teams_progress,
-                               key=lambda x: (-x["stages_unlocked"], x["total_time"]))
-        sorted_regional_no_progress = sorted(regional_teams_no_progress,
-                                           key=lambda x: x["team_name"])
-
-        for rank, entry in enumerate(sorted_regional, start=1):
-            await db.leaderboard.update_one(
-                {"team_id": entry["team_id"]},
-                {"$set": {"regional_rank": rank}}
-            )
-
-        for entry in sorted_regional_no_progress:
-            await db.leaderboard.update_one(
-                {"team_id": entry["team_id"]},
-                {"$set": {"regional_rank": 999}}
-            )
-
-    print(f"   ✅ Built leaderboard with {len(leaderboard_entries)} entries (including teams with 0 stages)")
+async def seed_challenges(db):
+    """Upsert the regional config (by its key) and each challenge (by stage)"""
+    regional_config, challenges = challenge_data()
 
-    # ============================================================
-    # 4. SUMMARY
-    # ============================================================
+    await db.challenges.update_one(
+        {"regional_start_times": {"$exists": True}},
+        {"$set": regional_config},
+        upsert=True
+    )
+
+    result = await db.challenges.bulk_write([
+        UpdateOne({"stage": challenge["stage"]}, {"$set": challenge}, upsert=True)
+        for challenge in challenges
+    ], ordered=False)
+
+    print(f"   ✅ Seeded {len(challenges)} challenges ({result.upserted_count} new)")
+    print(f"   ✅ Configured regional start times for EMEA, AMRS, APAC")
+
+async def seed_teams(db, teams, workers=None):
+    """
+    Upsert teams by team_name in one bulk write.
+    Each distinct password is bcrypt-hashed once, in parallel across processes.
+    """
+    passwords = sorted({team["password"] for team in teams})
+    hashes = dict(zip(passwords, hash_passwords(passwords, workers)))
+
+    now = datetime.utcnow()
+    writes = []
+    for team in teams:
+        doc = {key: value for key, value in team.items() if key != "password"}
+        doc["password_hash"] = hashes[team["password"]]
+        doc["last_updated"] = now
+        writes.append(UpdateOne({"team_name": doc["team_name"]}, {"$set": doc}, upsert=True))
+
+    result = await db.teams.bulk_write(writes, ordered=False)
+    print(f"   ✅ Seeded {len(teams)} teams ({result.upserted_count} new, {len(passwords)} distinct passwords hashed)")
+
+async def build_leaderboard(db):
+    """
+    Rebuild the leaderboard from ALL teams (including those with 0 stages unlocked).
+    Ranks are computed in one pass in memory and written with a single bulk upsert.
+    """
+    count = await rebuild_leaderboard(db)
+    print(f"   ✅ Built leaderboard with {count} entries (including teams with 0 stages)")
+
+async def print_summary(db, sample_teams):
     print("\n" + "=" * 60)
     print("📊 DATABASE SEEDING SUMMARY")
     print("=" * 60)
@@ -395,7 +394,7 @@ async def seed_database():
         print(f"     URL: ERFT_stage{challenge['stage']}_p1-{challenge['correct_p1']}_p2-{challenge['correct_p2']}_p3-{challenge['correct_p3']}")
 
     print("\n👥 Sample Teams (password: demo123):")
-    for region in ["EMEA", "AMRS", "APAC"]:
+    for region in REGIONS:
         region_teams = [t for t in sample_teams if t["region"] == region]
         print(f"\n   {region}:")
         for team in region_teams:
@@ -406,8 +405,57 @@ async def seed_database():
     for team in top_teams:
         print(f"   {team['global_rank']}. {team['team_name']} ({team['region']}) - {team['stages_unlocked']}/4 unlocked, Time: {team['total_time']}s")
 
+async def seed_database(synthetic_count: int = 0, reset: bool = False, workers=None, event: str = DEFAULT_EVENT,
+                        distinct_passwords: bool = False):
+    # Connect to MongoDB
+    client = AsyncIOMotorClient("mongodb://localhost:27017")
+    db = client[database_name(event)]
+    started = time.perf_counter()
+
+    print("=" * 60)
+    print(f"🌱 SEEDING HACKATHON DATABASE ({db.name})")
+    print("=" * 60)
+
+    if reset:
+        print("\n🧹 Resetting collections...")
+        await db.challenges.delete_many({})
+        await db.teams.delete_many({})
+        await db.leaderboard.delete_many({})
+
+    # Indexes first: upserts by team_name / team_id rely on them
+    await ensure_indexes(db)
+
+    # ============================================================
+    # 1. SEED CHALLENGES
+    # ============================================================
+    print("\n📋 Step 1: Seeding Challenges...")
+    await seed_challenges(db)
+
+    # ============================================================
+    # 2. SEED TEAMS
+    # ============================================================
+    print("\n👥 Step 2: Seeding Teams...")
+    base_time = datetime.utcnow()
+    sample_teams = sample_team_data(base_time)
+    teams = sample_teams + synthetic_teams(synthetic_count, base_time, distinct_passwords=distinct_passwords)
+    await seed_teams(db, teams, workers)
+    print(f"      Password for all demo teams: {DEMO_PASSWORD}")
+    if synthetic_count and distinct_passwords:
+        print(f"      Synthetic teams: LoadTeam_00000 / {synthetic_password(0)}, LoadTeam_00001 / {synthetic_password(1)}, ...")
+
+    # ============================================================
+    # 3. BUILD LEADERBOARD
+    # ============================================================
+    print("\n🏆 Step 3: Building Leaderboard...")
+    await build_leaderboard(db)
+
+    # ============================================================
+    # 4. SUMMARY
+    # ============================================================
+    await print_summary(db, sample_teams)
+
     print("\n" + "=" * 60)
-    print("✅ DATABASE SEEDING COMPLETE!")
+    print(f"✅ DATABASE SEEDING COMPLETE! ({time.perf_counter() - started:.1f}s)")
     print("=" * 60)
     print("\n📝 Quick Start:")
     print("   1. Start Backend: cd backend/app && uvicorn main:app --reload")
@@ -418,5 +466,17 @@ async def seed_database():
 
     client.close()
 
+def main():
+    parser = argparse.ArgumentParser(description="Seed the hackathon database")
+    parser.add_argument("--teams", type=int, default=0, metavar="N", help="Also generate N synthetic teams for benchmarking")
+    parser.add_argument("--reset", action="store_true", help="Delete existing challenges, teams and leaderboard first")
+    parser.add_argument("--workers", type=int, default=None, help="Password hashing processes (default: CPU count)")
+    parser.add_argument("--event", default=DEFAULT_EVENT, help="Event to seed (each event has its own database)")
+    parser.add_argument("--distinct-passwords", action="store_true",
+                        help="Give each synthetic team its own password, so every one is hashed (default: the demo password)")
+    args = parser.parse_args()
+
+    asyncio.run(seed_database(args.teams, args.reset, args.workers, args.event, args.distinct_passwords))
+
 if __name__ == "__main__":
-    asyncio.run(seed_database())
+    main()
@@ -0,0 +1,369 @@
+"""
+Long-running soak test: drives mixed traffic through the app in-process for hours
+and fails if memory keeps growing or the event loop stalls.
+
+The app runs in this process (driven directly over ASGI, startup and shutdown
+included) against a dedicated event, `soak` by default, so its own database
+(`hackathon_soak`) is seeded with synthetic teams and the real event data is untouched.
+Requires a running MongoDB, like the app itself.
+
+After a warmup (caches fill, the leaderboard is built) a baseline is taken. Every
+sample interval the test then records RSS, a tracemalloc snapshot compared to the
+baseline, event-loop lag percentiles and the sizes of the app's in-process
+structures (team cache, events, admission queues). It fails when, by the end:
+  - RSS grew more than --max-rss-growth-mb over the baseline, or
+  - a single allocation site grew more than --max-site-growth-mb, or
+  - p99 event-loop lag exceeded --max-lag-ms, or
+  - with --fail-on-stall, the app's loop watchdog caught any blocking call.
+
+Usage:
+    python soak_test.py --duration 14400             # 4 hours, defaults otherwise
+    python soak_test.py --duration 600 --teams 2000 --concurrency 64 --sample-interval 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from typing import List, Optional, Tuple
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app")
+sys.path.insert(0, APP_DIR)
+REGIONS = ["EMEA", "AMRS", "APAC"]
+PASSWORD = "demo123"
+
+# Stage URL values that unlock the next stage (see seed_challenges.challenge_data)
+CORRECT_VALUES = {2: ("1", "2", "3"), 3: ("4", "5", "6"), 4: ("7", "8", "9"), 5: ("10", "11", "12")}
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process, in MB"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Not Linux: peak RSS is the best available (KB on Linux, bytes on macOS)
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class AsgiClient:
+    """Minimal in-process ASGI driver: lifespan plus one-shot HTTP requests"""
+
+    def __init__(self, app, host: str = "soak.local"):
+        self.app = app
+        self.host = host
+        self._lifespan_task: Optional[asyncio.Task] = None
+        self._lifespan_in: Optional[asyncio.Queue] = None
+        self._lifespan_out: Optional[asyncio.Queue] = None
+
+    async def _lifespan(self, event: str):
+        await self._lifespan_in.put({"type": f"lifespan.{event}"})
+        message = await self._lifespan_out.get()
+        if message["type"] != f"lifespan.{event}.complete":
+            raise RuntimeError(f"App {event} failed: {message.get('message', message['type'])}")
+
+    async def start(self):
+        self._lifespan_in, self._lifespan_out = asyncio.Queue(), asyncio.Queue()
+        scope = {"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}
+        self._lifespan_task = asyncio.create_task(self.app(scope, self._lifespan_in.get, self._lifespan_out.put))
+        await self._lifespan("startup")
+
+    async def stop(self):
+        await self._lifespan("shutdown")
+        await self._lifespan_task
+
+    async def request(self, method: str, path: str, query: str = "", json_body=None) -> Tuple[int, bytes]:
+        body = json.dumps(json_body).encode("utf-8") if json_body is not None else b""
+        headers = [(b"host", self.host.encode("ascii"))]
+        if json_body is not None:
+            headers += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode("ascii"))]
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode("utf-8"),
+            "query_string": query.encode("utf-8"),
+            "root_path": "",
+            "headers": headers,
+            "client": ("127.0.0.1", 0),
+            "server": (self.host, 80),
+        }
+        pending = [{"type": "http.request", "body": body, "more_body": False}]
+        never = asyncio.Event()
+
+        async def receive():
+            if pending:
+                return pending.pop()
+            await never.wait()  # The client never disconnects
+
+        status = 0
+        chunks = []
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        return status, b"".join(chunks)
+
+
+class TrafficMix:
+    """Weighted request scenarios, shaped like a live event (mostly leaderboard reads and stage URL visits)"""
+
+    def __init__(self, client: AsgiClient, prefix: str, team_count: int, seed: int = 7):
+        self.client = client
+        self.prefix = prefix
+        self.team_count = team_count
+        self.rng = random.Random(seed)
+        self.version = 0
+        self.requests = 0
+        self.errors = 0
+        self.scenarios = [
+            (self.leaderboard_page, 20),
+            (self.leaderboard_changes, 20),
+            (self.snapshot, 15),
+            (self.stage_url, 15),
+            (self.team_around, 10),
+            (self.html_page, 8),
+            (self.login, 5),
+            (self.start_timer, 2),
+            (self.health, 5),
+        ]
+        self._choices = [scenario for scenario, _ in self.scenarios]
+        self._weights = [weight for _, weight in self.scenarios]
+
+    def team(self) -> dict:
+        i = self.rng.randrange(self.team_count)
+        return {"team_name": f"LoadTeam_{i:05d}", "password": PASSWORD, "region": REGIONS[i % len(REGIONS)]}
+
+    async def get(self, path: str, query: str = "") -> Tuple[int, bytes]:
+        return await self.client.request("GET", self.prefix + path, query)
+
+    async def run_one(self):
+        scenario = self.rng.choices(self._choices, self._weights)[0]
+        self.requests += 1
+        try:
+            status = await scenario()
+            if status >= 500 and status != 503:  # 503 is load shedding, not a failure
+                self.errors += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"   ⚠️  {scenario.__name__}: {e!r}")
+
+    async def leaderboard_page(self) -> int:
+        board = self.rng.choice(["global", *REGIONS])
+        path = "/leaderboard/global" if board == "global" else f"/leaderboard/regional/{board}"
+        status, _ = await self.get(path, f"limit={self.rng.choice([50, 100, 500])}")
+        return status
+
+    async def leaderboard_changes(self) -> int:
+        status, body = await self.get("/leaderboard/changes", f"since={self.version}")
+        if status == 200:
+            self.version = json.loads(body)["version"]
+        return status
+
+    async def snapshot(self) -> int:
+        status, _ = await self.get(f"/snapshots/{self.rng.choice(['global', *REGIONS])}.json")
+        return 200 if status == 404 else status  # Not published yet right after startup
+
+    async def stage_url(self) -> int:
+        team = self.team()
+        stage = self.rng.randint(2, 5)
+        values = CORRECT_VALUES[stage] if self.rng.random() < 0.5 else ("x", "y", "z")
+        path = f"/ERFT_stage{stage}_p1-{values[0]}_p2-{values[1]}_p3-{values[2]}"
+        status, _ = await self.get(path, f"team={team['team_name']}&pwd={PASSWORD}")
+        return status
+
+    async def team_around(self) -> int:
+        status, _ = await self.get(f"/leaderboard/team/{self.team()['team_name']}/around", "k=10")
+        return status
+
+    async def html_page(self) -> int:
+        status, _ = await self.get(self.rng.choice(["/login", "/register", "/leaderboard"]))
+        return status
+
+    async def login(self) -> int:
+        status, _ = await self.client.request("POST", self.prefix + "/teams/login", json_body=self.team())
+        return status
+
+    async def start_timer(self) -> int:
+        status, _ = await self.client.request("POST", self.prefix + "/teams/start-timer", json_body=self.team())
+        return status
+
+    async def health(self) -> int:
+        status, _ = await self.client.request("GET", "/health/live")
+        return status
+
+
+class LoopLagMonitor:
+    """Samples event-loop lag: how late a short sleep wakes up"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.samples: List[float] = []
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append((loop.time() - started - self.interval) * 1000)
+
+    def take(self) -> List[float]:
+        samples, self.samples = self.samples, []
+        return samples
+
+
+def app_structures(app) -> dict:
+    """Sizes of the app's in-process caches and queues, to show they stay bounded"""
+    return {
+        "events": {event_id: {"team_cache": stats["team_cache"]["entries"]} for event_id, stats in app.state.events.stats()["active"].items()},
+        "admission_queued": sum(stats["queued"] for stats in app.state.admission.stats().values()),
+        "in_flight": app.state.lifecycle.in_flight,
+    }
+
+
+async def soak(args) -> bool:
+    from seed_challenges import seed_database
+    from main import create_app
+
+    app = create_app()
+    watchdog = app.state.watchdog
+
+    if not args.no_seed:
+        await seed_database(args.teams, reset=True, event=args.event)
+
+    client = AsgiClient(app)
+    await client.start()
+    traffic = TrafficMix(client, f"/e/{args.event}", args.teams)
+    lag = LoopLagMonitor()
+    lag_task = asyncio.create_task(lag.run())
+
+    started = time.monotonic()
+    deadline = started + args.duration
+
+    async def worker():
+        while time.monotonic() < deadline:
+            await traffic.run_one()
+            if args.think_time:
+                await asyncio.sleep(traffic.rng.uniform(0, 2 * args.think_time))
+
+    workers = [asyncio.create_task(worker()) for _ in range(args.concurrency)]
+
+    # Warmup: let caches, buffers and the leaderboard reach their working size
+    await asyncio.sleep(min(args.warmup, args.duration))
+    tracemalloc.start(args.frames)
+    baseline = tracemalloc.take_snapshot()
+    baseline_rss = rss_mb()
+    lag.take()
+    print(f"\n📏 Baseline after {args.warmup:.0f}s warmup: RSS {baseline_rss:.1f} MB, {traffic.requests} requests so far")
+
+    max_lag = 0.0
+    rss_growth = 0.0
+    site_growth: List[Tuple[str, float]] = []
+
+    while time.monotonic() < deadline:
+        await asyncio.sleep(min(args.sample_interval, max(deadline - time.monotonic(), 0)))
+
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ])
+        growth = [stat for stat in snapshot.compare_to(baseline, "lineno") if stat.size_diff > 0][:args.top]
+        site_growth = [(str(stat.traceback), stat.size_diff / (1024 * 1024)) for stat in growth]
+        rss_growth = rss_mb() - baseline_rss
+
+        samples = lag.take()
+        p99 = percentile(samples, 0.99)
+        max_lag = max(max_lag, p99)
+
+        elapsed = time.monotonic() - started
+        print(
+            f"[{elapsed:7.0f}s] requests {traffic.requests:>8} errors {traffic.errors:>5} | "
+            f"RSS {baseline_rss + rss_growth:7.1f} MB ({rss_growth:+.1f}) | "
+            f"lag p50 {percentile(samples, 0.5):6.1f} p99 {p99:6.1f} max {max(samples, default=0):6.1f} ms | "
+            f"{json.dumps(app_structures(app))}"
+        )
+        for site, mb in site_growth[:3]:
+            print(f"          +{mb:.2f} MB  {site}")
+
+    await asyncio.gather(*workers)
+    lag_task.cancel()
+    tracemalloc.stop()
+    await client.stop()
+
+    failures = []
+    if rss_growth > args.max_rss_growth_mb:
+        failures.append(f"RSS grew {rss_growth:.1f} MB (limit {args.max_rss_growth_mb} MB)")
+    for site, mb in site_growth:
+        if mb > args.max_site_growth_mb:
+            failures.append(f"{site} grew {mb:.1f} MB (limit {args.max_site_growth_mb} MB)")
+    if max_lag > args.max_lag_ms:
+        failures.append(f"p99 event-loop lag reached {max_lag:.0f} ms (limit {args.max_lag_ms} ms)")
+    if args.fail_on_stall:
+        try:
+            watchdog.assert_no_blocking()
+        except AssertionError as e:
+            failures.append(str(e))
+
+    print("\n" + "=" * 60)
+    print(f"{traffic.requests} requests, {traffic.errors} errors in {time.monotonic() - started:.0f}s")
+    if failures:
+        print("❌ SOAK TEST FAILED")
+        for failure in failures:
+            print(f"   - {failure}")
+    else:
+        print("✅ SOAK TEST PASSED: memory and event-loop lag stayed within bounds")
+    print("=" * 60)
+    return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak-test the app in-process and detect memory growth")
+    parser.add_argument("--duration", type=float, default=3600, help="Seconds of traffic (default: 3600)")
+    parser.add_argument("--warmup", type=float, default=120, help="Seconds before the baseline is taken (default: 120)")
+    parser.add_argument("--sample-interval", type=float, default=60, help="Seconds between samples (default: 60)")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent simulated clients (default: 32)")
+    parser.add_argument("--think-time", type=float, default=0.05, help="Mean pause between a client's requests in seconds")
+    parser.add_argument("--teams", type=int, default=1000, help="Synthetic teams to seed (default: 1000)")
+    parser.add_argument("--event", default="soak", help="Event (and database) to run against (default: soak)")
+    parser.add_argument("--no-seed", action="store_true", help="Use the event's existing data")
+    parser.add_argument("--frames", type=int, default=1, help="Traceback depth recorded by tracemalloc")
+    parser.add_argument("--top", type=int, default=10, help="Allocation sites compared against the limits")
+    parser.add_argument("--max-rss-growth-mb", type=float, default=64)
+    parser.add_argument("--max-site-growth-mb", type=float, default=16)
+    parser.add_argument("--max-lag-ms", type=float, default=250)
+    parser.add_argument("--fail-on-stall", action="store_true", help="Fail if the loop watchdog catches a blocking call")
+    args = parser.parse_args()
+
+    # The app must accept the soak event
+    allowed = [e for e in os.environ.get("HACKATHON_EVENTS", "").split(",") if e]
+    os.environ["HACKATHON_EVENTS"] = ",".join(allowed + [args.event])
+
+    sys.exit(0 if asyncio.run(soak(args)) else 1)
+
+
+if __name__ == "__main__":
+    main()
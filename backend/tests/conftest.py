@@ -0,0 +1,8 @@
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The app is run from backend/app, which its modules import from; backend/ holds the scripts (microbench fakes)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "app"))
+sys.path.insert(0, BACKEND_DIR)
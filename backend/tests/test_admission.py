@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+from asgi import call
+from utils.admission import AdmissionControl, AdmissionMiddleware, RouteClass, classify_path, default_route_classes
+
+# Every route of the app (paths as seen after the /e/{event} prefix is stripped) and its class
+ROUTES = [
+    ("/health", None),
+    ("/health/live", None),
+    ("/health/ready", None),
+    ("/teams/opening/stream", None),
+    ("/ERFT_stage2_p1-4_p2-5_p3-6", "validation"),
+    ("/api/challenges/validate", "validation"),
+    ("/api/submit", "validation"),
+    ("/teams/create", "auth"),
+    ("/teams/login", "auth"),
+    ("/teams/start-timer", "auth"),
+    ("/api/session/bootstrap", "auth"),
+    ("/leaderboard/global", "leaderboard"),
+    ("/leaderboard/regional/EMEA", "leaderboard"),
+    ("/leaderboard/changes", "leaderboard"),
+    ("/leaderboard/team/team-1/around", "leaderboard"),
+    ("/admin/teams/bulk", "admin"),
+    ("/admin/admission", "admin"),
+    ("/admin/export/results.csv", "admin"),
+    ("/stats", "admin"),
+    ("/", "pages"),
+    ("/register", "pages"),
+    ("/login", "pages"),
+    ("/leaderboard", "pages"),
+    ("/submit", "pages"),
+    ("/js/login.js", "pages"),
+    ("/snapshots/global.json", "pages"),
+]
+
+
+@pytest.mark.parametrize("path,expected", ROUTES)
+def test_classify_path(path, expected):
+    assert classify_path(path) == expected
+
+
+def test_every_class_is_defined():
+    classes = default_route_classes()
+    assert {expected for _, expected in ROUTES if expected} == set(classes)
+
+
+class GatedApp:
+    """ASGI app whose requests stay in flight until `gate` is set"""
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+
+    async def __call__(self, scope, receive, send):
+        await self.gate.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+
+def admission_app(classes):
+    inner = GatedApp()
+    control = AdmissionControl(classes, retry_after=7)
+    app = AdmissionMiddleware(inner, control, classify=lambda path: path.strip("/"))
+    return app, inner, control
+
+
+def test_saturated_class_queues_then_sheds_with_retry_after():
+    async def scenario():
+        app, inner, control = admission_app({"a": RouteClass("a", limit=1, max_queue=1, queue_timeout=5.0)})
+        first = asyncio.create_task(call(app, "GET", "/a"))
+        queued = asyncio.create_task(call(app, "GET", "/a"))
+        await asyncio.sleep(0.01)
+        assert control.stats()["a"]["active"] == 1 and control.stats()["a"]["queued"] == 1
+
+        status, headers, _ = await call(app, "GET", "/a")  # Queue full
+        assert status == 503
+        assert (b"retry-after", b"7") in headers
+
+        inner.gate.set()
+        assert [response[0] for response in await asyncio.gather(first, queued)] == [200, 200]
+        assert control.stats()["a"] == {"limit": 1, "active": 0, "queued": 0, "admitted": 2, "rejected": 1}
+
+    asyncio.run(scenario())
+
+
+def test_queued_request_is_shed_after_queue_timeout():
+    async def scenario():
+        app, inner, control = admission_app({"a": RouteClass("a", limit=1, max_queue=8, queue_timeout=0.05)})
+        first = asyncio.create_task(call(app, "GET", "/a"))
+        await asyncio.sleep(0.01)
+
+        status, _, _ = await call(app, "GET", "/a")
+        assert status == 503
+        assert control.stats()["a"]["queued"] == 0
+
+        inner.gate.set()
+        assert (await first)[0] == 200
+
+    asyncio.run(scenario())
+
+
+def test_low_priority_class_is_shed_while_busy():
+    async def scenario():
+        app, inner, control = admission_app({
+            "a": RouteClass("a", limit=8, max_queue=8, queue_timeout=1.0),
+            "low": RouteClass("low", limit=8, max_queue=8, queue_timeout=1.0, shed_above=1),
+        })
+        busy = asyncio.create_task(call(app, "GET", "/a"))
+        await asyncio.sleep(0.01)
+
+        assert (await call(app, "GET", "/low"))[0] == 503  # In-flight requests (1) at shed_above
+        inner.gate.set()
+        await busy
+        assert (await call(app, "GET", "/low"))[0] == 200
+
+    asyncio.run(scenario())
+
+
+def test_overlapping_expansions_apply_once_and_restore_with_the_last():
+    async def scenario():
+        app, inner, control = admission_app({"auth": RouteClass("auth", limit=1, max_queue=8, queue_timeout=5.0)})
+        first = asyncio.create_task(call(app, "GET", "/auth"))
+        queued = asyncio.create_task(call(app, "GET", "/auth"))
+        await asyncio.sleep(0.01)
+
+        control.expand(2.0)  # One regional opening...
+        control.expand(2.0)  # ...overlapping another
+        assert control.classes["auth"].limit == 2
+        assert control.stats()["auth"]["queued"] == 0  # The raised limit admitted the queued request
+
+        control.restore()
+        assert control.classes["auth"].limit == 2
+        control.restore()
+        assert control.classes["auth"].limit == 1
+        control.restore()  # Unbalanced restore is harmless
+        assert control.classes["auth"].limit == 1
+
+        inner.gate.set()
+        assert [response[0] for response in await asyncio.gather(first, queued)] == [200, 200]
+        assert control.classes["auth"].active == 0
+
+    asyncio.run(scenario())
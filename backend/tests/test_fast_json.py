@@ -0,0 +1,55 @@
+import asyncio
+from typing import List
+import pytest
+from fastapi import FastAPI
+from asgi import call
+from models import LeaderboardEntry
+from utils import fast_json
+from utils.leaderboard_rows import to_row
+
+TEAMS = [
+    {"team_name": "Alpha", "region": "EMEA", "stages_unlocked": 4, "total_time": 9876.5, "global_rank": 1, "regional_rank": 1},
+    {"team_name": "Bravo", "region": "AMRS", "stages_unlocked": 2, "total_time": 3599.999, "global_rank": 2, "regional_rank": 1},
+    {"team_name": "Zéro Équipe", "region": "EMEA", "stages_unlocked": 0, "total_time": 0.0, "global_rank": 999, "regional_rank": 999},
+    {"team_name": "東京チーム 🚀", "region": "APAC", "stages_unlocked": 1, "total_time": 61.0, "global_rank": 3, "regional_rank": 1},
+    {"team_name": 'Quote "and" \\ slash', "region": "AMRS", "current_stage": 3, "total_time": 100000.25, "global_rank": 4, "regional_rank": 2},
+]
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def serializer(request, monkeypatch):
+    if request.param == "orjson":
+        if fast_json.orjson is None:
+            pytest.skip("orjson not installed")
+    else:
+        monkeypatch.setattr(fast_json, "orjson", None)
+    return request.param
+
+
+def pydantic_body(rows: List[dict]) -> bytes:
+    """Body FastAPI sends for these rows through response_model=List[LeaderboardEntry] and JSONResponse"""
+    app = FastAPI()
+
+    @app.get("/rows", response_model=List[LeaderboardEntry])
+    async def rows_endpoint():
+        return rows
+
+    status, _, body = asyncio.run(call(app, "GET", "/rows"))
+    assert status == 200
+    return body
+
+
+@pytest.mark.parametrize("rank_field", ["global_rank", "regional_rank"])
+def test_json_response_matches_pydantic_path(serializer, rank_field):
+    rows = [to_row(team, rank_field) for team in TEAMS]
+    assert fast_json.json_response(rows).body == pydantic_body(rows)
+
+
+def test_unranked_and_zero_stage_rows(serializer):
+    row = to_row(TEAMS[2], "global_rank")
+    assert row["rank"] == "T" and row["total_time"] == "-"
+    assert fast_json.json_response([row]).body == pydantic_body([row])
+
+
+def test_empty_list(serializer):
+    assert fast_json.json_response([]).body == pydantic_body([])
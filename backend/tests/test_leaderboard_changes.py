@@ -0,0 +1,37 @@
+from utils.leaderboard_changes import LeaderboardChangeLog
+
+
+def test_deltas_since_own_tokens():
+    log = LeaderboardChangeLog()
+    start = log.token
+    log.record({"global": ["a"], "EMEA": ["a"]})
+    middle = log.token
+    log.record({"global": ["b"]})
+
+    assert log.changed_since(start, "global") == {"a", "b"}
+    assert log.changed_since(middle, "global") == {"b"}
+    assert log.changed_since(middle, "EMEA") == set()
+    assert log.changed_since(log.token, "global") == set()
+
+
+def test_token_of_another_process_needs_a_full_page():
+    ours, theirs = LeaderboardChangeLog(), LeaderboardChangeLog()
+    for log in (ours, theirs):
+        log.record({"global": ["a"]})
+        log.record({"global": ["b"]})
+
+    # Same version number, in range for this log, but counted by another worker
+    assert theirs.token.split("-")[1] == "2"
+    assert ours.changed_since(theirs.token, "global") is None
+
+
+def test_malformed_and_expired_tokens_need_a_full_page():
+    log = LeaderboardChangeLog(max_versions=2)
+    old = log.token
+    for name in "abc":
+        log.record({"global": [name]})
+
+    assert log.changed_since(old, "global") is None
+    assert log.changed_since("0", "global") is None
+    assert log.changed_since(f"{log.epoch}-x", "global") is None
+    assert log.changed_since(f"{log.epoch}-99", "global") is None
@@ -0,0 +1,75 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import utils.leaderboard_materializer as leaderboard_materializer
+from utils.leaderboard_materializer import LeaderboardMaterializer
+
+
+def matches(doc: dict, query: dict) -> bool:
+    if "$or" in query:
+        return any(matches(doc, branch) for branch in query["$or"])
+    for field, condition in query.items():
+        value = doc[field]
+        if isinstance(condition, dict):
+            if "$gt" in condition and not value > condition["$gt"]:
+                return False
+            if "$gte" in condition and not value >= condition["$gte"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, keys):
+        self.docs = sorted(self.docs, key=lambda doc: tuple(doc[field] for field, _ in keys))
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length):
+        return self.docs[:length]
+
+
+class Teams:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query):
+        return Cursor([dict(doc) for doc in self.docs if matches(doc, query)])
+
+
+class Database:
+    def __init__(self, docs):
+        self.teams = Teams(docs)
+
+
+def test_poll_applies_every_team_sharing_one_timestamp(monkeypatch):
+    applied = []
+
+    async def sync(db, teams):
+        applied.extend(team["_id"] for team in teams)
+
+    monkeypatch.setattr(leaderboard_materializer, "sync_teams_to_leaderboard", sync)
+
+    start = datetime(2025, 1, 1)
+    bulk = start + timedelta(seconds=1)  # One timestamp for a whole bulk write
+    docs = [{"_id": f"team{i:04d}", "last_updated": bulk} for i in range(1200)]
+    db = Database(docs)
+
+    materializer = LeaderboardMaterializer(max_batch=500)
+    materializer._high_water = start
+    asyncio.run(materializer._poll_once(db))
+    assert sorted(applied) == sorted(doc["_id"] for doc in docs)
+
+    # Nothing is applied twice; later writes (even at the same timestamp, with a higher _id) are
+    applied.clear()
+    docs.append({"_id": "team9999", "last_updated": bulk})
+    docs.append({"_id": "team0000b", "last_updated": bulk + timedelta(seconds=1)})
+    asyncio.run(materializer._poll_once(db))
+    assert applied == ["team9999", "team0000b"]
@@ -0,0 +1,72 @@
+import asyncio
+from microbench import FakeDatabase, make_teams
+from utils.events import EventContext, _current_event
+from utils.leaderboard_partitions import PartitionedLeaderboard
+from utils.leaderboard_updater import entry_from_team, rebuild_leaderboard, sync_teams_to_leaderboard
+
+
+def run_in(context: EventContext, coroutine):
+    """Run a coroutine as a worker serving `context` (its own in-memory partitions)"""
+    token = context.enter()
+    try:
+        return asyncio.run(coroutine)
+    finally:
+        _current_event.reset(token)
+
+
+def expected_ranks(db: FakeDatabase) -> dict:
+    order = PartitionedLeaderboard()
+    order.load([entry_from_team(team) for team in db.teams.docs.values()])
+    return order.ranks()
+
+
+def stored_ranks(db: FakeDatabase) -> dict:
+    return {doc["team_name"]: (doc["global_rank"], doc["regional_rank"]) for doc in db.leaderboard.docs.values()}
+
+
+def test_sync_places_rows_already_written_by_another_worker():
+    teams = make_teams(60)
+    db = FakeDatabase(teams)
+    worker_a, worker_b = EventContext("worker-a"), EventContext("worker-b")
+    run_in(worker_a, rebuild_leaderboard(db))
+    run_in(worker_b, sync_teams_to_leaderboard(db, []))  # Loads B's partitions from the stored rows
+
+    def change(index: int, **fields) -> dict:
+        team = db.teams.docs[teams[index]["_id"]]
+        team.update(fields)
+        return dict(team)
+
+    # Worker A writes a stage unlock and a rename; worker B then syncs the same team documents,
+    # whose rows already match, and a change of its own
+    moved = change(5, stages_unlocked=4, total_time=100.0)
+    renamed = change(9, team_name="renamed-team")
+    run_in(worker_a, sync_teams_to_leaderboard(db, [moved, renamed]))
+    run_in(worker_b, sync_teams_to_leaderboard(db, [moved, renamed]))
+    run_in(worker_b, sync_teams_to_leaderboard(db, [change(20, stages_unlocked=4, total_time=50.0)]))
+
+    expected = expected_ranks(db)
+    token = worker_b.enter()
+    try:
+        assert worker_b.leaderboard_partitions.ranks() == expected
+    finally:
+        _current_event.reset(token)
+    assert stored_ranks(db) == expected
+
+
+def test_removed_team_leaves_partitions_even_if_row_is_already_gone():
+    teams = make_teams(20)
+    db = FakeDatabase(teams)
+    worker_a, worker_b = EventContext("worker-a"), EventContext("worker-b")
+    run_in(worker_a, rebuild_leaderboard(db))
+    run_in(worker_b, sync_teams_to_leaderboard(db, []))
+
+    gone = teams[3]["_id"]
+    del db.teams.docs[gone]
+    run_in(worker_a, sync_teams_to_leaderboard(db, [], removed_ids=[gone]))
+    run_in(worker_b, sync_teams_to_leaderboard(db, [], removed_ids=[gone]))
+
+    token = worker_b.enter()
+    try:
+        assert worker_b.leaderboard_partitions.ranks() == expected_ranks(db)
+    finally:
+        _current_event.reset(token)
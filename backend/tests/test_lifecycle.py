@@ -0,0 +1,45 @@
+import asyncio
+import signal
+
+import pytest
+
+from utils.lifecycle import Lifecycle
+
+
+@pytest.fixture(autouse=True)
+def restore_signal_handlers():
+    saved = {sig: signal.getsignal(sig) for sig in (signal.SIGTERM, signal.SIGINT)}
+    yield
+    for sig, handler in saved.items():
+        signal.signal(sig, handler)
+
+
+def test_signal_marks_draining_and_reaches_the_previous_handler():
+    received = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: received.append(signum))
+
+    lifecycle = Lifecycle()
+    lifecycle.install_signal_handlers()
+    signal.raise_signal(signal.SIGTERM)
+
+    assert lifecycle.draining
+    assert received == [signal.SIGTERM]
+
+
+def test_signal_still_reaches_a_loop_signal_handler():
+    # How uvicorn listens: loop.add_signal_handler, before the app's startup installs ours
+    async def main():
+        loop = asyncio.get_running_loop()
+        received = asyncio.Event()
+        loop.add_signal_handler(signal.SIGTERM, received.set)
+        try:
+            lifecycle = Lifecycle()
+            lifecycle.install_signal_handlers()
+            signal.raise_signal(signal.SIGTERM)
+
+            assert lifecycle.draining
+            await asyncio.wait_for(received.wait(), 1)
+        finally:
+            loop.remove_signal_handler(signal.SIGTERM)
+
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi import FastAPI
+
+from asgi import call
+from utils.loop_watchdog import LoopWatchdog, LoopWatchdogMiddleware
+
+
+def build_app(monitor: LoopWatchdog) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/blocking")
+    async def block_the_loop():
+        time.sleep(0.5)  # Synchronous call inside an async handler
+        return {"ok": True}
+
+    @app.get("/fine")
+    async def yield_to_the_loop():
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    app.add_middleware(LoopWatchdogMiddleware, monitor=monitor)
+    return app
+
+
+def run(monitor: LoopWatchdog, path: str):
+    async def main():
+        monitor.start()
+        try:
+            await asyncio.sleep(monitor.interval * 2)  # First heartbeats
+            response = await call(build_app(monitor), "GET", path)
+            await asyncio.sleep(monitor.interval * 2)  # Heartbeat completing the stall
+            return response
+        finally:
+            monitor.stop()
+
+    return asyncio.run(main())
+
+
+def test_strict_mode_fails_blocking_handler():
+    monitor = LoopWatchdog(threshold=0.1, interval=0.02, strict=True)
+    status, _, body = run(monitor, "/blocking")
+
+    assert status == 500
+    assert "blocked the event loop" in json.loads(body)["detail"]
+
+    assert monitor.stall_count == 1
+    stall = monitor.stats()["recent_stalls"][0]
+    assert stall["request"] == "GET /blocking"
+    assert stall["duration_ms"] >= 100
+    assert any("block_the_loop" in line for line in stall["stack"])
+
+    with pytest.raises(AssertionError, match="GET /blocking") as raised:
+        monitor.assert_no_blocking()
+    assert "time.sleep" in str(raised.value)
+
+
+def test_non_strict_mode_only_reports():
+    monitor = LoopWatchdog(threshold=0.1, interval=0.02)
+    status, _, body = run(monitor, "/blocking")
+
+    assert status == 200 and json.loads(body) == {"ok": True}
+    assert monitor.stall_count == 1
+    with pytest.raises(AssertionError):
+        monitor.assert_no_blocking()
+
+
+def test_handler_yielding_to_the_loop_passes():
+    monitor = LoopWatchdog(threshold=0.1, interval=0.02, strict=True)
+    status, _, _ = run(monitor, "/fine")
+
+    assert status == 200
+    monitor.assert_no_blocking()
@@ -0,0 +1,38 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from utils.opening_scheduler import OpeningScheduler, REGION_OPEN
+
+
+async def wait_for_opening(scheduler: OpeningScheduler, start_time: datetime) -> float:
+    """Seconds after `start_time` at which a waiting client is told its region is open"""
+    async for message in scheduler.stream("EMEA", start_time):
+        if message.startswith(f"event: {REGION_OPEN}"):
+            return (datetime.now(timezone.utc) - start_time).total_seconds()
+
+
+def test_missed_release_is_still_spread_over_the_jitter():
+    async def scenario():
+        scheduler = OpeningScheduler(jitter=0.5)
+        start_time = datetime.now(timezone.utc) + timedelta(seconds=0.1)
+        # No release() for this opening: every client falls back to its own jittered time
+        return await asyncio.gather(*(wait_for_opening(scheduler, start_time) for _ in range(30)))
+
+    delays = asyncio.run(scenario())
+    assert min(delays) >= 0
+    assert max(delays) <= 0.5 + 0.1
+    assert max(delays) - min(delays) > 0.2  # Spread out, not released together
+
+
+def test_release_reaches_waiting_clients():
+    async def scenario():
+        scheduler = OpeningScheduler(jitter=0.2)
+        start_time = datetime.now(timezone.utc) + timedelta(seconds=0.1)
+        clients = [asyncio.create_task(wait_for_opening(scheduler, start_time)) for _ in range(10)]
+        await asyncio.sleep(0.1)
+        scheduler.openings[("EMEA", start_time)] = "open"
+        scheduler.release("EMEA")
+        return await asyncio.gather(*clients)
+
+    delays = asyncio.run(scenario())
+    assert all(0 <= delay <= 0.2 + 0.1 for delay in delays)
@@ -0,0 +1,49 @@
+import asyncio
+
+from fastapi import FastAPI
+
+import utils.time_validator as time_validator
+import utils.url_validator as url_validator
+from asgi import call
+from utils.single_flight import SharedReadTimeout, read_timeout_response
+
+
+class SlowChallenges:
+    async def find_one(self, query):
+        await asyncio.sleep(1)
+        return None
+
+
+class SlowDatabase:
+    challenges = SlowChallenges()
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.add_exception_handler(SharedReadTimeout, read_timeout_response)
+
+    @app.get("/open")
+    async def challenge_open():
+        is_open, _ = await time_validator.is_challenge_open("EMEA", SlowDatabase())
+        return {"open": is_open}
+
+    @app.get("/challenge")
+    async def challenge():
+        return await url_validator.find_challenge(SlowDatabase(), 1)
+
+    return app
+
+
+def test_slow_shared_reads_are_shed_with_503(monkeypatch):
+    monkeypatch.setattr(time_validator, "CONFIG_TIMEOUT", 0.05)
+    monkeypatch.setattr(url_validator, "CHALLENGE_TIMEOUT", 0.05)
+    app = build_app()
+
+    for path in ("/open", "/challenge"):
+        status, headers, _ = asyncio.run(call(app, "GET", path))
+        assert status == 503
+        assert (b"retry-after", b"1") in headers
+
+
+def test_shared_read_timeout_is_still_a_timeout_error():
+    assert issubclass(SharedReadTimeout, asyncio.TimeoutError)
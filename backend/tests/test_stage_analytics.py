@@ -0,0 +1,85 @@
+import asyncio
+
+from utils.stage_analytics import StageAnalytics, ALL_REGIONS
+
+
+class FakeAnalytics:
+    """One document, with the $inc / $set updates and find_one_and_update StageAnalytics uses"""
+
+    def __init__(self):
+        self.doc = None
+        self.fail_next = False
+
+    async def find_one(self, query):
+        return self.doc
+
+    async def find_one_and_update(self, query, update, upsert, return_document):
+        if self.fail_next:
+            self.fail_next = False
+            raise ConnectionError("write failed")
+        doc = self.doc or {"_id": query["_id"]}
+        for path, value in update["$inc"].items():
+            *parents, field = path.split(".")
+            target = doc
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[field] = target.get(field, 0) + value
+        doc.update(update["$set"])
+        self.doc = doc
+        return doc
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.analytics = FakeAnalytics()
+
+
+def attempts(analytics: StageAnalytics, stage: int = 1, region: str = ALL_REGIONS) -> dict:
+    return next(row for row in analytics.summary()["stages"] if row["stage"] == stage and row["region"] == region)
+
+
+def test_workers_add_to_shared_totals():
+    async def scenario():
+        db = FakeDatabase()
+        worker_a, worker_b = StageAnalytics(), StageAnalytics()
+        worker_a.record_attempt("team-1", "EMEA", 1, False)
+        worker_a.record_attempt("team-1", "EMEA", 1, True, 600.0)
+        worker_b.record_attempt("team-2", "AMRS", 1, True, 900.0)
+
+        await worker_a.persist(db)
+        await worker_b.persist(db)
+        await worker_a.persist(db)  # Picks up worker B's attempts
+
+        for worker in (worker_a, worker_b):
+            row = attempts(worker)
+            assert (row["attempts"], row["completions"], row["avg_attempts_before_success"]) == (3, 2, 0.5)
+
+        # A restarted worker reads the totals without adding them again
+        restarted = StageAnalytics()
+        await restarted.load(db)
+        restarted.record_attempt("team-3", "APAC", 1, False)
+        await restarted.persist(db)
+        assert attempts(restarted)["attempts"] == 4
+        assert db.analytics.doc["stats"]["1"]["ALL"]["attempts"] == 4
+
+    asyncio.run(scenario())
+
+
+def test_failed_persist_keeps_the_attempts():
+    async def scenario():
+        db = FakeDatabase()
+        analytics = StageAnalytics()
+        analytics.record_attempt("team-1", "EMEA", 2, True, 300.0)
+
+        db.analytics.fail_next = True
+        try:
+            await analytics.persist(db)
+        except ConnectionError:
+            pass
+        assert attempts(analytics, 2)["completions"] == 1
+
+        await analytics.persist(db)
+        assert db.analytics.doc["stats"]["2"]["EMEA"]["completions"] == 1
+        assert attempts(analytics, 2)["completions"] == 1
+
+    asyncio.run(scenario())
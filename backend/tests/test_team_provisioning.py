@@ -0,0 +1,18 @@
+import asyncio
+
+from models import BulkProvisionResult
+from utils.team_provisioning import provision_teams
+
+
+def test_invalid_rows_are_reported_per_row():
+    rows = [
+        {"team_name": 5, "password": "secret123", "region": "MARS"},
+        {"team_name": "team-2", "password": "secret123", "region": "MARS"},
+        "not an object",
+    ]
+    result = asyncio.run(provision_teams(None, rows))
+
+    assert result["created"] == 0
+    assert [(error["row"], error["team_name"]) for error in result["errors"]] == [(1, "5"), (2, "team-2"), (3, None)]
+    # What /admin/teams/bulk returns must pass its response model
+    BulkProvisionResult(**result)
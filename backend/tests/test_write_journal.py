@@ -0,0 +1,155 @@
+import asyncio
+from datetime import datetime, timedelta
+from pymongo.errors import AutoReconnect
+from utils.events import EventContext, _current_event
+from utils.team_cache import update_team_fields
+from utils.write_journal import WriteJournal
+
+
+class Result:
+    def __init__(self, matched_count: int):
+        self.matched_count = matched_count
+
+
+class FakeTeams:
+    """Team documents with the query and update operators the journal uses; can fail the next writes"""
+
+    def __init__(self, docs):
+        self.docs = {doc["_id"]: doc for doc in docs}
+        self.fail_next = 0  # Writes to fail with AutoReconnect before they are applied
+        self.lose_ack_next = 0  # Writes to apply, then fail as if the acknowledgement was lost
+
+    def _match(self, doc: dict, query: dict) -> bool:
+        for field, condition in query.items():
+            value = doc.get(field)
+            if isinstance(condition, dict) and "$ne" in condition:
+                if condition["$ne"] in (value or []):
+                    return False
+            elif isinstance(value, list):
+                if condition not in value:
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    async def update_one(self, query: dict, update: dict):
+        if self.fail_next:
+            self.fail_next -= 1
+            raise AutoReconnect("connection lost")
+        doc = self.docs.get(query["_id"])
+        matched = doc is not None and self._match(doc, query)
+        if matched:
+            doc.update(update["$set"])
+            push = update["$push"]["journal_writes"]
+            doc["journal_writes"] = (doc.get("journal_writes", []) + push["$each"])[push["$slice"]:]
+        if self.lose_ack_next:
+            self.lose_ack_next -= 1
+            raise AutoReconnect("acknowledgement lost")
+        return Result(1 if matched else 0)
+
+    async def find_one(self, query: dict, projection=None):
+        doc = self.docs.get(query["_id"])
+        return doc if doc is not None and self._match(doc, query) else None
+
+
+class FakeDatabase:
+    def __init__(self, docs):
+        self.teams = FakeTeams(docs)
+
+
+def test_journaled_write_is_not_skipped_after_another_workers_write(tmp_path):
+    async def scenario():
+        db = FakeDatabase([{"_id": "t1", "team_name": "team-1", "stages_unlocked": 1}])
+        worker_a = WriteJournal(str(tmp_path / "a"))
+        worker_b = WriteJournal(str(tmp_path / "b"))
+
+        db.teams.fail_next = 1
+        assert await worker_a.update_team(db, "t1", {"stages_unlocked": 2}, {"stages_unlocked": 1}) is None
+        # Another worker writes the same team inline before worker A replays
+        assert await worker_b.update_team(db, "t1", {"last_submission_url": "ERFT_stage2"}) is True
+
+        assert await worker_a.replay(db) == 1
+        assert (worker_a.replayed, worker_a.skipped, worker_a.conflicts) == (1, 0, 0)
+        assert db.teams.docs["t1"]["stages_unlocked"] == 2
+        worker_a.close()
+        worker_b.close()
+
+    asyncio.run(scenario())
+
+
+def test_write_that_landed_late_is_skipped_on_replay(tmp_path):
+    async def scenario():
+        db = FakeDatabase([{"_id": "t1", "team_name": "team-1", "total_time": 10.0}])
+        journal = WriteJournal(str(tmp_path))
+
+        db.teams.lose_ack_next = 1  # The inline write is applied but its acknowledgement is lost
+        assert await journal.update_team(db, "t1", {"total_time": 20.0}) is None
+        assert await journal.replay(db) == 1
+        assert (journal.replayed, journal.skipped) == (0, 1)
+        assert len(db.teams.docs["t1"]["journal_writes"]) == 1
+        journal.close()
+
+    asyncio.run(scenario())
+
+
+def test_guarded_journaled_write_is_reported_pending(tmp_path):
+    async def scenario():
+        team = {"_id": "t1", "team_name": "team-1", "timer_started_at": None}
+        db = FakeDatabase([dict(team)])
+        context = EventContext("journal-test")
+        context.write_journal = WriteJournal(str(tmp_path))
+        token = context.enter()
+        try:
+            db.teams.fail_next = 1
+            assert await update_team_fields(db, team, {"timer_started_at": 1}, expected={"timer_started_at": None}) is None
+            # Unguarded writes cannot conflict, so a journaled one counts as applied
+            assert await update_team_fields(db, team, {"last_submission_url": "x"}) is True
+        finally:
+            _current_event.reset(token)
+            context.write_journal.close()
+
+    asyncio.run(scenario())
+
+
+def test_replayed_write_is_stamped_when_applied(tmp_path):
+    async def scenario():
+        db = FakeDatabase([{"_id": "t1", "team_name": "team-1", "stages_unlocked": 1}])
+        journal = WriteJournal(str(tmp_path))
+        requested = datetime.utcnow() - timedelta(minutes=5)  # Journaled a while ago
+
+        db.teams.fail_next = 1
+        await journal.update_team(db, "t1", {"stages_unlocked": 2, "last_updated": requested})
+        await journal.replay(db)
+        assert db.teams.docs["t1"]["last_updated"] > requested + timedelta(minutes=4)
+        journal.close()
+
+    asyncio.run(scenario())
+
+
+def test_journal_of_a_slot_no_worker_holds_is_adopted(tmp_path):
+    async def scenario():
+        db = FakeDatabase([{"_id": "t1", "team_name": "team-1", "total_time": 10.0}])
+        # Three workers journaled writes; after a restart with one worker only slot 0 is claimed
+        workers = [WriteJournal(str(tmp_path)) for _ in range(3)]
+        db.teams.fail_next = 3
+        for i, worker in enumerate(workers):
+            await worker.update_team(db, "t1", {"total_time": 10.0 + i})
+        for worker in workers:
+            worker.close()
+
+        journal = WriteJournal(str(tmp_path))
+        await journal.open()
+        assert journal.path.endswith("journal-0.jsonl")
+        assert len(journal.pending) == 3
+        assert (tmp_path / "journal-2.jsonl").read_bytes() == b""
+
+        assert await journal.replay(db) == 3
+        journal.close()
+
+        # Adopted writes were moved, not copied: nothing is left for the next run
+        again = WriteJournal(str(tmp_path))
+        await again.open()
+        assert not again.pending
+        again.close()
+
+    asyncio.run(scenario())
@@ -1,4 +1,6 @@
-const API_URL = 'http://localhost:8000';
+// Pages opened under /e/{event}/ keep their API calls scoped to that event
+const EVENT_PREFIX = (window.location.pathname.match(/^\/e\/[a-z0-9-]+/) || [''])[0];
+const API_URL = 'http://localhost:8000' + EVENT_PREFIX;
 
 document.getElementById('submissionForm').addEventListener('submit', async (e) => {
     e.preventDefault();
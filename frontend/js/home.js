@@ -1,4 +1,14 @@
-const API_URL = 'http://localhost:8000';
+// Pages opened under /e/{event}/ keep their API calls scoped to that event
+const EVENT_PREFIX = (window.location.pathname.match(/^\/e\/[a-z0-9-]+/) || [''])[0];
+const API_URL = 'http://localhost:8000' + EVENT_PREFIX;
+
+// Signed, expiring asset URLs issued with the team's login/registration (path -> URL)
+let assetUrls = {};
+let timerStarted = false;  // Stage 1 materials already downloaded, no need to start the timer again
+
+function assetUrl(path) {
+    return API_URL + (assetUrls[path] || path);
+}
 
 // Handle form submission
 document.getElementById('teamForm').addEventListener('submit', async (e) => {
@@ -37,6 +47,7 @@ async function handleRegister() {
         const data = await response.json();
 
         if (response.ok) {
+            assetUrls = data.asset_urls || {};
             let message = `✅ Team "${data.team_name}" registered successfully for ${data.region}!<br><br>`;
 
             if (data.challenge_open) {
@@ -59,8 +70,9 @@ async function handleRegister() {
                     ⏰ <strong>Challenge not yet open in ${data.region}</strong><br><br>
                     The next challenge opens at:<br>
                     <strong style="color: #667eea; font-size: 18px;">${data.start_time}</strong><br><br>
-                    You're registered! Check back after the start time to download next stage PDF.
+                    You're registered! This page will tell you when the challenge opens.
                 `;
+                waitForOpening(API_URL, data.region, () => showOpenedSession(teamName, password));
             }
 
             message += `<br><a href="/leaderboard" style="color: #667eea; font-weight: 600;">View Leaderboards</a>`;
@@ -83,11 +95,62 @@ async function handleRegister() {
     }
 }
 
+// Once the region opens: fetch the session (asset links, timer state) in one request and show the downloads
+async function showOpenedSession(teamName, password) {
+    const messageDiv = document.getElementById('message');
+    try {
+        const response = await fetch(`${API_URL}/api/session/bootstrap`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ team_name: teamName, password: password })
+        });
+        const data = await response.json();
+
+        if (response.ok && data.challenge_open) {
+            assetUrls = data.asset_urls || {};
+            timerStarted = data.timer_started;
+            messageDiv.innerHTML = `
+                <div class="message success">
+                    📄 <strong>The challenge is now open in ${data.region}!</strong><br>
+                    Download Stage 1 materials to begin:<br><br>
+                    <a href="#" onclick="downloadStageFile('pdf', 1, '${teamName}', '${password}'); return false;" style="color: #155724; font-weight: 600; text-decoration: underline;">
+                        📄 Click here to download Stage 1 requirements (PDF)
+                    </a><br><br>
+                    <a href="#" onclick="downloadStageFile('csv', 1, '${teamName}', '${password}'); return false;" style="color: #155724; font-weight: 600; text-decoration: underline;">
+                        📊 Click here to download Dataset (CSV)
+                    </a><br><br>
+                    <small style="color: #666;">⏱️ Your timer will start when you download either file</small><br>
+                </div>
+            `;
+            return;
+        }
+    } catch (error) {
+        console.error('Error:', error);
+    }
+    messageDiv.innerHTML = `
+        <div class="message success">
+            📄 <strong>The challenge is now open!</strong><br><br>
+            <a href="/login" style="color: #155724; font-weight: 600; text-decoration: underline;">Log in</a> to download the Stage 1 materials.
+        </div>
+    `;
+}
+
 // Download Stage file (PDF or CSV) and start timer (only for Stage 1)
+// Open a stage file: the PDF of any stage, or the Stage 1 dataset (CSV)
+function openStageFile(fileType, stage) {
+    if (stage === 1 && fileType === 'csv') {
+        window.open(assetUrl('/data/hackathon_fraud_payment.csv'), '_blank');
+    } else {
+        window.open(assetUrl(`/pdfs/stage${stage}.pdf`), '_blank');
+    }
+}
+
 async function downloadStageFile(fileType, stage, teamName, password) {
     try {
-        // Only start timer for Stage 1 materials (first download)
-        if (stage === 1) {
+        // Only start timer for Stage 1 materials (first download); once started, just download
+        if (stage === 1 && !timerStarted) {
             const response = await fetch(`${API_URL}/teams/start-timer`, {
                 method: 'POST',
                 headers: {
@@ -96,28 +159,17 @@ async function downloadStageFile(fileType, stage, teamName, password) {
                 body: JSON.stringify({ team_name: teamName, password: password, region: "EMEA" })
             });
 
-            if (response.ok) {
-                // Timer started successfully, now download the file
-                if (fileType === 'pdf') {
-                    window.open(`${API_URL}/pdfs/stage${stage}.pdf`, '_blank');
-                } else if (fileType === 'csv') {
-                    window.open(`${API_URL}/data/hackathon_fraud_payment.csv`, '_blank');
-                }
-            } else {
+            if (!response.ok) {
                 alert('Failed to start timer. Please try again.');
+                return;
             }
-        } else {
-            // For other stages, just download the PDF
-            window.open(`${API_URL}/pdfs/stage${stage}.pdf`, '_blank');
+            timerStarted = true;
         }
+        openStageFile(fileType, stage);
     } catch (error) {
         console.error('Error:', error);
         // Still allow download even if there's an error
-        if (fileType === 'pdf') {
-            window.open(`${API_URL}/pdfs/stage${stage}.pdf`, '_blank');
-        } else if (fileType === 'csv') {
-            window.open(`${API_URL}/data/hackathon_fraud_payment.csv`, '_blank');
-        }
+        openStageFile(fileType, stage);
     }
 }
 
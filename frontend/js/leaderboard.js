@@ -1,6 +1,19 @@
-const API_URL = 'http://localhost:8000';
+// Pages opened under /e/{event}/ keep their API calls scoped to that event
+const EVENT_PREFIX = (window.location.pathname.match(/^\/e\/[a-z0-9-]+/) || [''])[0];
+const API_URL = 'http://localhost:8000' + EVENT_PREFIX;
 let currentRegion = 'global';
 let refreshInterval;
+let nextCursor = null;
+let leaderboardVersion = null;
+
+// Static snapshots published by the server (/snapshots/{board}.json); the API is the fallback
+const SNAPSHOT_PAGE_SIZE = 100;
+let snapshotMode = false;
+let snapshotRows = [];
+let snapshotShown = 0;
+
+// Rows currently shown, keyed by team name: { team, tr }
+let rowsByTeam = new Map();
 
 // Load leaderboard on page load
 window.addEventListener('DOMContentLoaded', () => {
@@ -23,37 +36,22 @@ async function loadLeaderboard(region) {
     });
 
     const messageDiv = document.getElementById('message');
-    const tbody = document.getElementById('leaderboard-body');
     messageDiv.innerHTML = '';
 
-    try {
-        const endpoint = region === 'global'
-            ? '/leaderboard/global'
-            : `/leaderboard/regional/${region}`;
+    if (await loadSnapshot(region)) {
+        startAutoRefresh();
+        return;
+    }
+    snapshotMode = false;
 
-        const response = await fetch(`${API_URL}${endpoint}`);
+    try {
+        const response = await fetch(`${API_URL}${leaderboardEndpoint(region)}`);
         const data = await response.json();
 
         if (response.ok) {
-            if (data.length === 0) {
-                tbody.innerHTML = `
-                    <tr>
-                        <td colspan="5" style="text-align: center; padding: 30px; color: #666;">
-                            No teams have completed any stages yet.
-                        </td>
-                    </tr>
-                `;
-            } else {
-                tbody.innerHTML = data.map(team => `
-                    <tr>
-                        <td><strong>${team.rank}</strong></td>
-                        <td>${team.team_name}</td>
-                        <td>${team.region}</td>
-                        <td>${team.stages_unlocked}/4</td>
-                        <td>${team.total_time}</td>
-                    </tr>
-                `).join('');
-            }
+            setNextCursor(response.headers.get('X-Next-Cursor'));
+            leaderboardVersion = response.headers.get('X-Leaderboard-Version');
+            renderTable(data);
 
             // Start auto-refresh (every 1 minute)
             startAutoRefresh();
@@ -73,6 +71,245 @@ async function loadLeaderboard(region) {
     }
 }
 
+// Fetch only the rows that changed since the last poll and patch them into the table
+async function refreshLeaderboard() {
+    if (snapshotMode) {
+        return refreshSnapshot();
+    }
+    if (leaderboardVersion === null) {
+        return loadLeaderboard(currentRegion);
+    }
+
+    const region = currentRegion;
+    let endpoint = `/leaderboard/changes?since=${leaderboardVersion}`;
+    if (region !== 'global') {
+        endpoint += `&region=${region}`;
+    }
+
+    try {
+        const response = await fetch(`${API_URL}${endpoint}`);
+        const data = await response.json();
+
+        // Ignore answers for a tab the user has since switched away from
+        if (!response.ok || region !== currentRegion) {
+            return;
+        }
+
+        leaderboardVersion = data.version;
+        if (data.full) {
+            setNextCursor(response.headers.get('X-Next-Cursor'));
+            renderTable(data.rows);
+        } else {
+            applyPatch(data.rows);
+        }
+    } catch (error) {
+        console.error('Error refreshing leaderboard:', error);
+    }
+}
+
+async function fetchSnapshot(region) {
+    // no-cache: always revalidate, an unchanged file comes back as a cheap 304
+    const response = await fetch(`${API_URL}/snapshots/${region}.json`, { cache: 'no-cache' });
+    if (!response.ok) {
+        throw new Error(`Snapshot unavailable (${response.status})`);
+    }
+    return response.json();
+}
+
+// Show the first page of the published snapshot; false if there is none to read
+async function loadSnapshot(region) {
+    try {
+        const data = await fetchSnapshot(region);
+        if (region !== currentRegion) {
+            return true;
+        }
+
+        snapshotMode = true;
+        snapshotRows = data.rows;
+        snapshotShown = Math.min(SNAPSHOT_PAGE_SIZE, snapshotRows.length);
+        leaderboardVersion = data.version;
+        renderTable(snapshotRows.slice(0, snapshotShown));
+        setNextCursor(snapshotShown < snapshotRows.length ? String(snapshotShown) : null);
+        return true;
+    } catch (error) {
+        return false;
+    }
+}
+
+// Re-read the snapshot and patch in only the rows that differ from the previous one
+async function refreshSnapshot() {
+    const region = currentRegion;
+
+    try {
+        const data = await fetchSnapshot(region);
+        if (region !== currentRegion || data.version === leaderboardVersion) {
+            return;
+        }
+
+        const previous = new Map(snapshotRows.map(team => [team.team_name, team]));
+        const changed = data.rows.filter(team => {
+            const old = previous.get(team.team_name);
+            return !old || old.rank !== team.rank || old.stages_unlocked !== team.stages_unlocked ||
+                old.total_time !== team.total_time;
+        });
+
+        snapshotRows = data.rows;
+        leaderboardVersion = data.version;
+        snapshotShown = Math.min(Math.max(snapshotShown, rowsByTeam.size), snapshotRows.length);
+        setNextCursor(snapshotShown < snapshotRows.length ? String(snapshotShown) : null);
+        applyPatch(changed);
+    } catch (error) {
+        // Snapshots went away: fall back to the API
+        snapshotMode = false;
+        leaderboardVersion = null;
+        refreshLeaderboard();
+    }
+}
+
+function leaderboardEndpoint(region) {
+    return region === 'global'
+        ? '/leaderboard/global'
+        : `/leaderboard/regional/${region}`;
+}
+
+function rowCells(team) {
+    return `
+        <td><strong>${team.rank}</strong></td>
+        <td>${team.team_name}</td>
+        <td>${team.region}</td>
+        <td>${team.stages_unlocked}/4</td>
+        <td>${team.total_time}</td>
+    `;
+}
+
+// Order rows the same way the API does: rank (tied "T" rows last), then team name
+function compareRows(a, b) {
+    const rankA = a.rank === 'T' ? 999 : Number(a.rank);
+    const rankB = b.rank === 'T' ? 999 : Number(b.rank);
+    if (rankA !== rankB) {
+        return rankA - rankB;
+    }
+    return a.team_name < b.team_name ? -1 : (a.team_name > b.team_name ? 1 : 0);
+}
+
+function showEmptyMessage() {
+    document.getElementById('leaderboard-body').innerHTML = `
+        <tr>
+            <td colspan="5" style="text-align: center; padding: 30px; color: #666;">
+                No teams have completed any stages yet.
+            </td>
+        </tr>
+    `;
+}
+
+// Replace the whole table (initial load, tab switch or full snapshot)
+function renderTable(teams) {
+    const tbody = document.getElementById('leaderboard-body');
+    rowsByTeam = new Map();
+
+    if (teams.length === 0) {
+        showEmptyMessage();
+        return;
+    }
+
+    tbody.innerHTML = '';
+    appendRows(teams);
+}
+
+function appendRows(teams) {
+    const tbody = document.getElementById('leaderboard-body');
+    teams.forEach(team => {
+        if (rowsByTeam.has(team.team_name)) {
+            return;
+        }
+        const tr = document.createElement('tr');
+        tr.innerHTML = rowCells(team);
+        tbody.appendChild(tr);
+        rowsByTeam.set(team.team_name, { team, tr });
+    });
+}
+
+// Update changed rows in place and move them to their new position
+function applyPatch(teams) {
+    if (teams.length === 0) {
+        return;
+    }
+
+    const tbody = document.getElementById('leaderboard-body');
+    if (rowsByTeam.size === 0) {
+        tbody.innerHTML = '';
+    }
+    const loadedCount = rowsByTeam.size;
+
+    teams.forEach(team => {
+        const existing = rowsByTeam.get(team.team_name);
+        if (existing) {
+            existing.team = team;
+            existing.tr.innerHTML = rowCells(team);
+        } else {
+            const tr = document.createElement('tr');
+            tr.innerHTML = rowCells(team);
+            rowsByTeam.set(team.team_name, { team, tr });
+        }
+    });
+
+    let ordered = Array.from(rowsByTeam.values()).sort((a, b) => compareRows(a.team, b.team));
+
+    // Only part of the board is loaded: keep the window the same size,
+    // rows that moved past its end will come back through "Load more"
+    if (nextCursor && ordered.length > loadedCount) {
+        ordered.slice(loadedCount).forEach(row => {
+            row.tr.remove();
+            rowsByTeam.delete(row.team.team_name);
+        });
+        ordered = ordered.slice(0, loadedCount);
+    }
+
+    // Move only the rows that are out of place
+    let previous = null;
+    ordered.forEach(row => {
+        const expected = previous ? previous.nextSibling : tbody.firstChild;
+        if (expected !== row.tr) {
+            tbody.insertBefore(row.tr, expected);
+        }
+        previous = row.tr;
+    });
+}
+
+function setNextCursor(cursor) {
+    nextCursor = cursor;
+    document.getElementById('load-more').style.display = cursor ? 'inline-block' : 'none';
+}
+
+// Append the next page of the current leaderboard
+async function loadMore() {
+    if (!nextCursor) {
+        return;
+    }
+
+    if (snapshotMode) {
+        const end = Math.min(snapshotShown + SNAPSHOT_PAGE_SIZE, snapshotRows.length);
+        appendRows(snapshotRows.slice(snapshotShown, end));
+        snapshotShown = end;
+        setNextCursor(snapshotShown < snapshotRows.length ? String(snapshotShown) : null);
+        return;
+    }
+
+    const endpoint = leaderboardEndpoint(currentRegion);
+
+    try {
+        const response = await fetch(`${API_URL}${endpoint}?cursor=${encodeURIComponent(nextCursor)}`);
+        const data = await response.json();
+
+        if (response.ok) {
+            setNextCursor(response.headers.get('X-Next-Cursor'));
+            appendRows(data);
+        }
+    } catch (error) {
+        console.error('Error loading more teams:', error);
+    }
+}
+
 function startAutoRefresh() {
     // Clear any existing interval
     if (refreshInterval) {
@@ -81,7 +318,7 @@ function startAutoRefresh() {
 
     // Refresh every 60 seconds (1 minute)
     refreshInterval = setInterval(() => {
-        loadLeaderboard(currentRegion);
+        refreshLeaderboard();
     }, 60000);
 }
 
@@ -1,4 +1,20 @@
-const API_URL = 'http://localhost:8000';
+// Pages opened under /e/{event}/ keep their API calls scoped to that event
+const EVENT_PREFIX = (window.location.pathname.match(/^\/e\/[a-z0-9-]+/) || [''])[0];
+const API_URL = 'http://localhost:8000' + EVENT_PREFIX;
+
+// Signed, expiring asset URLs issued with the team's login/registration (path -> URL)
+let assetUrls = {};
+let timerStarted = false;  // Stage 1 materials already downloaded, no need to start the timer again
+
+function assetUrl(path) {
+    return API_URL + (assetUrls[path] || path);
+}
+
+// Rank of a team in a leaderboard window (rows around the team)
+function rankOf(rows, teamName) {
+    const row = (rows || []).find(r => r.team_name === teamName);
+    return row ? row.rank : null;
+}
 
 // Handle form submission
 document.getElementById('loginForm').addEventListener('submit', async (e) => {
@@ -25,12 +41,13 @@ async function handleLogin() {
     }
 
     try {
-        const response = await fetch(`${API_URL}/teams/login`, {
+        // One request for progress, time gate, asset links and leaderboard position
+        const response = await fetch(`${API_URL}/api/session/bootstrap`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ team_name: teamName, password: password, region: "EMEA" })  // Region ignored for login
+            body: JSON.stringify({ team_name: teamName, password: password })
         });
 
         const data = await response.json();
@@ -38,9 +55,16 @@ async function handleLogin() {
         if (response.ok) {
             // Store login data in sessionStorage
             sessionStorage.setItem('teamLoginData', JSON.stringify(data));
+            assetUrls = data.asset_urls || {};
+            timerStarted = data.timer_started;
 
             let message = `✅ Welcome back, ${data.team_name}!<br><br>`;
-            message += `📊 <strong>Your Progress:</strong> ${data.current_stage}/4 stages unlocked<br><br>`;
+            message += `📊 <strong>Your Progress:</strong> ${data.current_stage}/4 stages unlocked<br>`;
+            const globalRank = rankOf(data.global_window, data.team_name);
+            if (data.current_stage > 0 && globalRank) {
+                message += `🏆 <strong>Rank:</strong> ${globalRank} global, ${rankOf(data.regional_window, data.team_name)} in ${data.region}<br>`;
+            }
+            message += `<br>`;
 
             if (data.challenge_open) {
                 // Determine which stage PDF to show based on current_stage (stages_unlocked)
@@ -66,7 +90,7 @@ async function handleLogin() {
                     message += `
                         🎉 <strong>Congratulations! All 4 stages completed!</strong><br><br>
                         Download Stage 5 PDF for accessibility requirements:<br>
-                        <a href="${API_URL}/pdfs/stage5.pdf" target="_blank" style="color: #155724; font-weight: 600; text-decoration: underline;">
+                        <a href="${assetUrl('/pdfs/stage5.pdf')}" target="_blank" style="color: #155724; font-weight: 600; text-decoration: underline;">
                             Click here to download Stage 5 PDF
                         </a><br><br>
                         After reviewing usability and accessibility requirements:<br>
@@ -87,7 +111,7 @@ async function handleLogin() {
                         You've unlocked ${data.current_stage}/4 stages.<br><br>
                         📄 <strong>Current Challenge:</strong> Stage ${currentPDFStage}<br>
                         Download the PDF to continue:<br>
-                        <a href="${API_URL}/pdfs/stage${currentPDFStage}.pdf" target="_blank" style="color: #155724; font-weight: 600; text-decoration: underline;">
+                        <a href="${assetUrl(`/pdfs/stage${currentPDFStage}.pdf`)}" target="_blank" style="color: #155724; font-weight: 600; text-decoration: underline;">
                             Click here to download Stage ${currentPDFStage} requirements
                         </a><br><br>
                         <small style="color: #666;">
@@ -101,8 +125,9 @@ async function handleLogin() {
                     ⏰ <strong>Challenge not yet open in ${data.region}</strong><br><br>
                     The next challenge opens at:<br>
                     <strong style="color: #667eea; font-size: 18px;">${data.start_time}</strong><br><br>
-                    Check back after the start time to download next stage PDF.
+                    This page will update by itself when the challenge opens.
                 `;
+                waitForOpening(API_URL, data.region, handleLogin);
             }
 
             message += `<br><a href="/leaderboard" style="color: #667eea; font-weight: 600;">View Leaderboards</a>`;
@@ -125,10 +150,19 @@ async function handleLogin() {
 }
 
 // Download Stage file (PDF or CSV) and start timer (only for Stage 1)
+// Open a stage file: the PDF of any stage, or the Stage 1 dataset (CSV)
+function openStageFile(fileType, stage) {
+    if (stage === 1 && fileType === 'csv') {
+        window.open(assetUrl('/data/hackathon_fraud_payment.csv'), '_blank');
+    } else {
+        window.open(assetUrl(`/pdfs/stage${stage}.pdf`), '_blank');
+    }
+}
+
 async function downloadStageFile(fileType, stage, teamName, password) {
     try {
-        // Only start timer for Stage 1 materials (first download)
-        if (stage === 1) {
+        // Only start timer for Stage 1 materials (first download); once started, just download
+        if (stage === 1 && !timerStarted) {
             const response = await fetch(`${API_URL}/teams/start-timer`, {
                 method: 'POST',
                 headers: {
@@ -137,27 +171,16 @@ async function downloadStageFile(fileType, stage, teamName, password) {
                 body: JSON.stringify({ team_name: teamName, password: password, region: "EMEA" })
             });
 
-            if (response.ok) {
-                // Timer started successfully, now download the file
-                if (fileType === 'pdf') {
-                    window.open(`${API_URL}/pdfs/stage${stage}.pdf`, '_blank');
-                } else if (fileType === 'csv') {
-                    window.open(`${API_URL}/data/hackathon_fraud_payment.csv`, '_blank');
-                }
-            } else {
+            if (!response.ok) {
                 alert('Failed to start timer. Please try again.');
+                return;
             }
-        } else {
-            // For other stages, just download the PDF
-            window.open(`${API_URL}/pdfs/stage${stage}.pdf`, '_blank');
+            timerStarted = true;
         }
+        openStageFile(fileType, stage);
     } catch (error) {
         console.error('Error:', error);
         // Still allow download even if there's an error
-        if (fileType === 'pdf') {
-            window.open(`${API_URL}/pdfs/stage${stage}.pdf`, '_blank');
-        } else if (fileType === 'csv') {
-            window.open(`${API_URL}/data/hackathon_fraud_payment.csv`, '_blank');
-        }
+        openStageFile(fileType, stage);
     }
 }
@@ -0,0 +1,16 @@
+// Waiting for a region to open (login and registration pages): the server pushes a
+// "region_open" event, staggered per client, over server-sent events, so there is no need
+// to keep refreshing. (Not "open": EventSource fires that itself once connected.)
+let openingSource = null;
+
+function waitForOpening(apiUrl, region, onOpen) {
+    if (openingSource) {
+        openingSource.close();
+    }
+    openingSource = new EventSource(`${apiUrl}/teams/opening/stream?region=${encodeURIComponent(region)}`);
+    openingSource.addEventListener('region_open', () => {
+        openingSource.close();
+        openingSource = null;
+        onOpen();
+    });
+}